@@ -1,7 +1,7 @@
 # Path: core/admin.py
 
 from django.contrib import admin
-from .models import Service, Page, Category, Tag, Article 
+from .models import Service, Page, Category, Tag, Article, RelatedArticleJob, SitemapJob, ThumbnailJob
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
@@ -90,4 +90,42 @@ class ArticleAdmin(admin.ModelAdmin):
         """
         if not hasattr(obj, 'author') or not obj.author:
             obj.author = request.user
-        super().save_model(request, obj, form, change)
\ No newline at end of file
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(ThumbnailJob)
+class ThumbnailJobAdmin(admin.ModelAdmin):
+    """Очередь генерации миниатюр: только просмотр и удаление."""
+    list_display = ('__str__', 'created_at', 'attempts', 'last_error')
+    list_filter = ('model_label',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RelatedArticleJob)
+class RelatedArticleJobAdmin(admin.ModelAdmin):
+    """Очередь пересчета похожих статей: только просмотр и удаление."""
+    list_display = ('__str__', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SitemapJob)
+class SitemapJobAdmin(admin.ModelAdmin):
+    """Очередь пересборки карты сайта: только просмотр и удаление."""
+    list_display = ('__str__', 'created_at')
+    list_filter = ('section',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
-    verbose_name = 'Основное приложение'
\ No newline at end of file
+    verbose_name = 'Основное приложение'
+
+    def ready(self):
+        # Подключаем обработчики сигналов (поисковый индекс и т.д.) и системные проверки
+        from . import checks, signals  # noqa: F401
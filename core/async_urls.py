@@ -0,0 +1,7 @@
+# Path: core/async_urls.py
+
+# Те же маршруты, что в core/urls.py, но с async-views (для ASGI)
+from . import async_views
+from .urls import build_urlpatterns
+
+urlpatterns = build_urlpatterns(async_views)
@@ -0,0 +1,80 @@
+# Path: core/async_views.py
+
+"""
+Async-варианты публичных views для ASGI (маршруты core/async_urls.py,
+включаются настройкой ASYNC_VIEWS).
+
+Под ASGI синхронная view выполняется в потоке через sync_to_async, даже
+когда ответ уже лежит в кеше. Здесь на event loop без потоков обрабатывается
+то, что не трогает базу: поиск в кеше страниц и "живой" поиск по индексу в
+памяти (core.autocomplete). Запросы к SQLite (дата для Last-Modified) и
+рендер шаблонов выполняются в потоке: async ORM Django для SQLite и так
+работает через sync_to_async, а шаблоны обращаются к ленивым QuerySet из
+контекста. Кеш страниц, 304 и объединение запросов — те же декораторы,
+что и у синхронных views: они сами поддерживают async-view.
+"""
+
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+
+from . import autocomplete, conditional, views
+from .conditional import conditional_page
+from .page_cache import cache_public_page
+from .single_flight import coalesce_requests
+
+
+def async_public_page(sync_view, last_modified_func, *namespaces, coalesce=False):
+    """
+    Async-вариант view из core.views, обернутой в cache_public_page и
+    conditional_page (и coalesce_requests при coalesce=True) с теми же
+    last_modified_func и namespaces. Тело view берется без декораторов и
+    выполняется в потоке только при промахе кеша и без ответа 304.
+    """
+    view_func = sync_to_async(inspect.unwrap(sync_view))
+    if coalesce:
+        view_func = coalesce_requests(*namespaces)(view_func)
+    view_func = conditional_page(last_modified_func, *namespaces)(view_func)
+    return cache_public_page(*namespaces)(view_func)
+
+
+# --- Основные Views ---
+
+home_view = async_public_page(views.home_view, conditional.services_last_modified, 'services')
+service_detail_view = async_public_page(views.service_detail_view, conditional.service_last_modified, 'services')
+page_view = async_public_page(views.page_view, conditional.page_last_modified, 'pages')
+
+# --- Views для Статей ---
+
+article_list_view = async_public_page(
+    views.article_list_view, conditional.articles_last_modified, *views.ARTICLE_NAMESPACES, coalesce=True
+)
+article_detail_view = async_public_page(
+    views.article_detail_view, conditional.article_last_modified, *views.ARTICLE_NAMESPACES
+)
+article_category_view = async_public_page(
+    views.article_category_view, conditional.category_last_modified, *views.ARTICLE_NAMESPACES, coalesce=True
+)
+article_tag_view = async_public_page(
+    views.article_tag_view, conditional.tag_last_modified, *views.ARTICLE_NAMESPACES, coalesce=True
+)
+
+# --- API Views ---
+
+@coalesce_requests(*autocomplete.VERSION_NAMESPACES)
+async def article_search_api_view(request):
+    """
+    API v1: "живой" поиск целиком на event loop: индекс в памяти и async-кеш
+    версий. В базу поиск идет, только если индекс устарел.
+    """
+    query = request.GET.get('q', '')
+    results = []
+
+    if len(query) > 2:
+        results = await autocomplete.index.asearch(query, limit=5)
+
+    return JsonResponse({
+        'count': len(results),
+        'results': results,
+    })
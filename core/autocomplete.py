@@ -0,0 +1,200 @@
+# Path: core/autocomplete.py
+
+"""
+Индекс для "живого" поиска статей в памяти процесса.
+
+Хранит отсортированный массив ключей (слово, тип, id статьи) по словам
+заголовков и названиям тегов опубликованных статей. Поиск по началу слов
+делается двоичным поиском без обращения к базе. Индекс строится из базы при
+первом запросе и обновляется сигналами моделей; другие процессы узнают
+об изменениях по версиям из core.cache_versions и перестраивают индекс.
+"""
+
+import re
+import threading
+from bisect import bisect_left, insort
+
+from . import cache_versions
+
+# Пространства имен версий, от которых зависит индекс
+VERSION_NAMESPACES = ('articles', 'tags', 'replica')
+
+# Типы ключей: совпадение в заголовке важнее совпадения в теге
+TITLE, TAG = 0, 1
+
+EXCERPT_LENGTH = 70
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _normalize(text):
+    return text.lower().replace('ё', 'е')
+
+
+def _words(text):
+    return _WORD_RE.findall(_normalize(text))
+
+
+def _short_excerpt(excerpt):
+    return excerpt[:EXCERPT_LENGTH] + '...' if len(excerpt) > EXCERPT_LENGTH else excerpt
+
+
+class AutocompleteIndex:
+    """Префиксный индекс по заголовкам и тегам опубликованных статей."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}  # id статьи -> данные для ответа API и ключи индекса
+        self._keys = []  # отсортированный список (слово, тип, id статьи)
+        self._version = None
+
+    # --- Построение и обновление ---
+
+    def _articles(self):
+        from .models import Article
+
+        return (
+            Article.objects.published()
+            .only('title', 'slug', 'excerpt', 'published_date')
+            .prefetch_related('tags')
+        )
+
+    def _make_entry(self, article, tag_names):
+        keys = {(word, TITLE, article.pk) for word in _words(article.title)}
+        for name in tag_names:
+            keys.update((word, TAG, article.pk) for word in _words(name))
+        return {
+            'title': article.title,
+            'title_key': _normalize(article.title),
+            'url': article.get_absolute_url(),
+            'excerpt': _short_excerpt(article.excerpt),
+            'published': article.published_date,
+            'keys': keys,
+        }
+
+    def _install(self, articles, version):
+        entries = {}
+        for article in articles:
+            entries[article.pk] = self._make_entry(article, [tag.name for tag in article.tags.all()])
+        keys = sorted(key for entry in entries.values() for key in entry['keys'])
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self._version = version
+
+    def rebuild(self):
+        """Полностью перестраивает индекс из базы данных."""
+        self._install(self._articles(), cache_versions.get_versions(*VERSION_NAMESPACES))
+
+    async def arebuild(self):
+        """Async-вариант rebuild: статьи читаются через async ORM."""
+        version = await cache_versions.aget_versions(*VERSION_NAMESPACES)
+        self._install([article async for article in self._articles()], version)
+
+    def _remove(self, article_id):
+        entry = self._entries.pop(article_id, None)
+        if entry is None:
+            return
+        for key in entry['keys']:
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def update_article(self, article):
+        """Добавляет, обновляет или удаляет статью в индексе по ее текущему состоянию."""
+        with self._lock:
+            if self._version is None:
+                return  # Индекс еще не построен: построится при первом запросе
+            self._remove(article.pk)
+            if article.is_published:
+                entry = self._make_entry(article, article.tags.values_list('name', flat=True))
+                self._entries[article.pk] = entry
+                for key in entry['keys']:
+                    insort(self._keys, key)
+            self._version = cache_versions.get_versions(*VERSION_NAMESPACES)
+
+    def remove_article(self, article_id):
+        with self._lock:
+            if self._version is None:
+                return
+            self._remove(article_id)
+            self._version = cache_versions.get_versions(*VERSION_NAMESPACES)
+
+    def invalidate(self):
+        """Помечает индекс устаревшим (например, после переименования тега)."""
+        with self._lock:
+            self._version = None
+
+    def _ensure_fresh(self):
+        # Холодный старт или изменения в другом процессе: перестраиваем из базы
+        if self._version != cache_versions.get_versions(*VERSION_NAMESPACES):
+            self.rebuild()
+
+    # --- Поиск ---
+
+    def _prefix_matches(self, word):
+        """Множества id статей, у которых есть слово, начинающееся с word (в заголовке и в тегах)."""
+        title_ids, tag_ids = set(), set()
+        position = bisect_left(self._keys, (word,))
+        keys = self._keys
+        while position < len(keys) and keys[position][0].startswith(word):
+            _, kind, article_id = keys[position]
+            (title_ids if kind == TITLE else tag_ids).add(article_id)
+            position += 1
+        return title_ids, tag_ids
+
+    def search(self, query, limit=5):
+        """
+        Возвращает до limit статей, у которых каждое слово запроса совпадает
+        с началом какого-либо слова заголовка или тега.
+        """
+        words = _words(query)
+        if not words:
+            return []
+        self._ensure_fresh()
+        return self._search(query, words, limit)
+
+    async def asearch(self, query, limit=5):
+        """
+        Async-вариант search для core.async_views: свежесть индекса проверяется
+        через async-кеш, а сам поиск идет в памяти прямо на event loop.
+        """
+        words = _words(query)
+        if not words:
+            return []
+        if self._version != await cache_versions.aget_versions(*VERSION_NAMESPACES):
+            await self.arebuild()
+        return self._search(query, words, limit)
+
+    def _search(self, query, words, limit):
+        with self._lock:
+            candidates = title_candidates = None
+            for word in words:
+                title_ids, tag_ids = self._prefix_matches(word)
+                matched = title_ids | tag_ids
+                candidates = matched if candidates is None else candidates & matched
+                title_candidates = title_ids if title_candidates is None else title_candidates & title_ids
+                if not candidates:
+                    return []
+
+            query_key = _normalize(query).strip()
+            entries = self._entries
+
+            def rank(article_id):
+                entry = entries[article_id]
+                if entry['title_key'].startswith(query_key):
+                    weight = 0
+                elif article_id in title_candidates:
+                    weight = 1
+                else:
+                    weight = 2
+                return weight, -entry['published'].timestamp()
+
+            best = sorted(candidates, key=rank)[:limit]
+            return [
+                {'title': entries[pk]['title'], 'url': entries[pk]['url'], 'excerpt': entries[pk]['excerpt']}
+                for pk in best
+            ]
+
+
+index = AutocompleteIndex()
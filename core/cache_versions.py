@@ -0,0 +1,152 @@
+# Path: core/cache_versions.py
+
+"""
+Номера версий для инвалидации кешей.
+
+Каждое пространство имен ('articles', 'tags', ...) имеет свой номер версии,
+который увеличивается при изменении соответствующих моделей. Кеши и индексы
+запоминают номер, с которым были построены, и считаются устаревшими, как только
+он поменялся. Номера хранятся в кеше Django по умолчанию, поэтому при общем
+бэкенде (файлы, Redis) изменения видны всем процессам. Рядом с номером
+хранится момент последнего увеличения (get_changed): в отличие от дат
+объектов он только растет, в том числе при удалении и переименовании.
+
+Сигналы моделей увеличивают версии только после коммита транзакции
+(bump_on_commit): иначе параллельный запрос мог бы прочитать еще старые
+строки и сохранить страницу уже под новой версией.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+KEY_PREFIX = 'version'
+CHANGED_PREFIX = 'changed'
+
+
+def _key(namespace):
+    return f'{KEY_PREFIX}:{namespace}'
+
+
+def _changed_key(namespace):
+    return f'{CHANGED_PREFIX}:{namespace}'
+
+
+def _initial_version():
+    # Начальное значение зависит от времени: если ключ вытеснили из кеша,
+    # новая версия не совпадет ни с одной из старых.
+    return int(time.time() * 1000)
+
+
+def get_version(namespace):
+    """Текущий номер версии пространства имен."""
+    version = cache.get(_key(namespace))
+    if version is None:
+        cache.add(_key(namespace), _initial_version(), timeout=None)
+        version = cache.get(_key(namespace))
+    return version
+
+
+def get_versions(*namespaces):
+    """Кортеж версий нескольких пространств имен (одним запросом к кешу)."""
+    keys = [_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    return tuple(
+        found[key] if key in found else get_version(namespace)
+        for key, namespace in zip(keys, namespaces)
+    )
+
+
+def is_in_memory(alias=DEFAULT_CACHE_ALIAS):
+    """
+    Кеш в памяти процесса отвечает без ввода-вывода, и async-коду выгоднее
+    читать его напрямую: async API встроенных бэкендов Django — это
+    sync_to_async, то есть переход в поток на каждый вызов.
+    """
+    return isinstance(caches[alias], LocMemCache)
+
+
+async def aget_version(namespace):
+    """Async-вариант get_version (для core.async_views)."""
+    version = await cache.aget(_key(namespace))
+    if version is None:
+        await cache.aadd(_key(namespace), _initial_version(), timeout=None)
+        version = await cache.aget(_key(namespace))
+    return version
+
+
+async def aget_versions(*namespaces):
+    """Async-вариант get_versions."""
+    if is_in_memory():
+        return get_versions(*namespaces)
+    keys = [_key(namespace) for namespace in namespaces]
+    found = await cache.aget_many(keys)
+    return tuple([
+        found[key] if key in found else await aget_version(namespace)
+        for key, namespace in zip(keys, namespaces)
+    ])
+
+
+def bump_version(*namespaces):
+    """Увеличивает версии, делая устаревшими все связанные с ними кеши."""
+    for namespace in namespaces:
+        try:
+            cache.incr(_key(namespace))
+        except ValueError:
+            cache.set(_key(namespace), _initial_version(), timeout=None)
+    # Last-Modified передается с точностью до секунды: каждое изменение
+    # сдвигает момент хотя бы на секунду, иначе правка в ту же секунду, что
+    # и предыдущая, дала бы клиенту с If-Modified-Since ответ 304
+    now = time.time()
+    changed = cache.get_many([_changed_key(namespace) for namespace in namespaces])
+    cache.set_many({
+        _changed_key(namespace): max(now, changed.get(_changed_key(namespace), 0) + 1)
+        for namespace in namespaces
+    }, timeout=None)
+
+
+def get_changed(*namespaces):
+    """
+    Момент последнего увеличения версий пространств имен (datetime в UTC).
+    Если ключа нет (холодный кеш, вытеснение), моментом считается текущее
+    время: дата может сдвинуться вперед, но не назад.
+    """
+    keys = [_changed_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    now = time.time()
+    if missing:
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        found.update(cache.get_many(missing))
+    return datetime.fromtimestamp(max(found.values(), default=now), tz=timezone.utc)
+
+
+# Пространства имен, измененные в текущей транзакции. Как и в
+# core.sitemap_files, пачка живет, пока ее колбэк зарегистрирован в
+# транзакции: после отката следующее изменение начинает новую пачку.
+_pending = threading.local()
+
+
+class _Batch(set):
+    def __call__(self):
+        # Выполненная пачка больше не принимает изменений
+        if getattr(_pending, 'batch', None) is self:
+            _pending.batch = None
+        bump_version(*sorted(self))
+
+
+def bump_on_commit(*namespaces):
+    """Увеличивает версии после коммита текущей транзакции, по разу на пространство имен."""
+    batch = getattr(_pending, 'batch', None)
+    connection = transaction.get_connection()
+    if batch is not None and any(entry[1] is batch for entry in connection.run_on_commit):
+        batch.update(namespaces)
+        return
+    batch = _pending.batch = _Batch(namespaces)
+    # Вне транзакции колбэк выполняется сразу
+    transaction.on_commit(batch)
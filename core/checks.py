@@ -0,0 +1,40 @@
+# Path: core/checks.py
+
+"""
+Системные проверки настроек (manage.py check, запуск сервера).
+
+Версии кешей (core.cache_versions) хранятся в кеше по умолчанию. Если это
+память процесса (LocMemCache), правка в админке сбрасывает кеши только в
+том воркере, который ее обработал, а остальные отдают старые страницы до
+истечения PAGE_CACHE_TIMEOUT.
+"""
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.checks import Error, Tags, Warning, register
+
+from . import cache_versions
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    messages = []
+    if not cache_versions.is_in_memory(DEFAULT_CACHE_ALIAS):
+        return messages
+    if settings.PAGE_CACHE_ENABLED:
+        messages.append(Error(
+            "Кеш страниц включен, а версии кешей хранятся в памяти процесса (locmem): "
+            "другие воркеры не увидят изменений и будут отдавать устаревшие страницы.",
+            hint="Задайте CACHE_BACKEND=file или redis, либо PAGE_CACHE_ENABLED=0. "
+                 "Если процесс всегда один, проверку можно отключить в SILENCED_SYSTEM_CHECKS.",
+            id='core.E001',
+        ))
+    elif not settings.DEBUG:
+        messages.append(Warning(
+            "Версии кешей хранятся в памяти процесса (locmem): при нескольких воркерах "
+            "фрагменты шаблонов, число страниц в пагинации и индекс живого поиска "
+            "обновляются только в воркере, который обработал изменение.",
+            hint="Задайте CACHE_BACKEND=file или redis.",
+            id='core.W001',
+        ))
+    return messages
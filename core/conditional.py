@@ -0,0 +1,136 @@
+# Path: core/conditional.py
+
+"""
+Условные GET-запросы (ETag / Last-Modified) для публичных страниц.
+
+До рендеринга шаблона выполняется один дешевый запрос: максимальная
+updated_date объектов, из которых собрана страница. Если клиент прислал
+If-None-Match / If-Modified-Since и ничего не поменялось, сразу отдается
+304 без рендеринга.
+
+Удаление или снятие с публикации самой свежей статьи сдвигает максимум
+updated_date назад, а переименование категории его не меняет. Поэтому
+ETag учитывает версии моделей (core.cache_versions), а Last-Modified не
+бывает раньше последнего увеличения этих версий (cache_versions.get_changed):
+клиент, который присылает только If-Modified-Since, тоже получит новую страницу.
+"""
+
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Count, Max, Q
+from django.views.decorators.http import condition
+
+from . import cache_versions
+from .models import Article, Page, RelatedArticle, Service
+from .page_cache import COMMON_NAMESPACES, request_key
+
+
+def versioned_last_modified(last_modified_func, *namespaces):
+    """
+    Оборачивает last_modified_func: дата не раньше последнего изменения
+    моделей namespaces (и общих COMMON_NAMESPACES), поэтому только растет.
+    """
+    @wraps(last_modified_func)
+    def get_last_modified(request, *args, **kwargs):
+        last_modified = last_modified_func(request, *args, **kwargs)
+        if last_modified is None:
+            return None
+        return max(last_modified, cache_versions.get_changed(*COMMON_NAMESPACES, *namespaces))
+    return get_last_modified
+
+
+def conditional_page(last_modified_func, *namespaces):
+    """
+    Декоратор view (синхронной или async): добавляет Last-Modified и сильный
+    ETag и отвечает 304, если страница не менялась. last_modified_func(request,
+    *args, **kwargs) возвращает дату последнего изменения или None (объект
+    не найден).
+    """
+    last_modified_func = versioned_last_modified(last_modified_func, *namespaces)
+    all_namespaces = (*COMMON_NAMESPACES, *namespaces)
+
+    def get_last_modified(request, *args, **kwargs):
+        # condition() вызывает обе функции, поэтому запоминаем результат на запросе
+        if not hasattr(request, '_last_modified'):
+            request._last_modified = last_modified_func(request, *args, **kwargs)
+        return request._last_modified
+
+    def get_etag(request, *args, **kwargs):
+        last_modified = get_last_modified(request, *args, **kwargs)
+        if last_modified is None:
+            return None
+        versions = getattr(request, '_etag_versions', None) or cache_versions.get_versions(*all_namespaces)
+        return make_etag(request, last_modified, versions)
+
+    aget_last_modified = sync_to_async(last_modified_func)
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=get_etag, last_modified_func=get_last_modified)(view_func)
+        if not iscoroutinefunction(view_func):
+            return conditional_view
+
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # condition() вызывает функции синхронно, а на event loop нельзя
+            # обращаться к базе: дата (в потоке) и версии получаются заранее
+            request._last_modified = await aget_last_modified(request, *args, **kwargs)
+            request._etag_versions = await cache_versions.aget_versions(*all_namespaces)
+            return await conditional_view(request, *args, **kwargs)
+        return async_wrapper
+
+    return decorator
+
+
+def make_etag(request, last_modified, versions):
+    raw = f'{request_key(request)}|{last_modified.isoformat()}|{versions}'
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+# --- Даты последнего изменения для конкретных страниц ---
+
+def services_last_modified(request, *args, **kwargs):
+    return Service.objects.aggregate(last=Max('updated_date'))['last']
+
+
+def service_last_modified(request, service_slug):
+    return Service.objects.filter(slug=service_slug).values_list('updated_date', flat=True).first()
+
+
+def page_last_modified(request, page_slug):
+    return (
+        Page.objects.filter(slug=page_slug, is_published=True)
+        .values_list('updated_date', flat=True)
+        .first()
+    )
+
+
+def article_list_last_modified(request, **filters):
+    """Для списков: самая свежая статья среди показанных (с учетом фильтра)."""
+    return Article.objects.published().filter(**filters).aggregate(last=Max('updated_date'))['last']
+
+
+def articles_last_modified(request):
+    return article_list_last_modified(request)
+
+
+def category_last_modified(request, category_slug):
+    return article_list_last_modified(request, category__slug=category_slug)
+
+
+def tag_last_modified(request, tag_slug):
+    return article_list_last_modified(request, tags__slug=tag_slug)
+
+
+def article_last_modified(request, post_slug):
+    """Статья и ее похожие статьи (RelatedArticle) — одним запросом."""
+    related_ids = RelatedArticle.objects.filter(article__slug=post_slug).values('related_id')
+    result = Article.objects.published().filter(
+        Q(slug=post_slug) | Q(pk__in=related_ids)
+    ).aggregate(
+        last=Max('updated_date'),
+        found=Count('pk', filter=Q(slug=post_slug)),
+    )
+    return result['last'] if result['found'] else None
+
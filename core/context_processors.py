@@ -3,6 +3,16 @@
 from django.conf import settings
 from django.contrib.sites.models import Site
 
+from . import cache_versions
+
+# Общий для всех страниц контекст, посчитанный один раз на процесс:
+# (версии моделей, из которых он собран; сам контекст)
+_site_context = (None, None)
+
+# Модели, при изменении которых общий контекст пересчитывается
+SITE_CONTEXT_NAMESPACES = ('site', 'replica')
+
+
 def debug(request):
     """
     Передает переменную settings.DEBUG в контекст каждого шаблона.
@@ -10,9 +20,33 @@ def debug(request):
     """
     return {'debug': settings.DEBUG}
 
+
+def get_site_context():
+    """
+    Возвращает общий контекст сайта: текущий Site и контакты для подвала.
+    Данные хранятся в памяти процесса и пересчитываются, только когда в
+    админке поменялся сайт (по версиям из core.cache_versions), поэтому
+    обычный рендер не делает ни одного запроса.
+    """
+    global _site_context
+    version, context = _site_context
+    current_version = cache_versions.get_versions(*SITE_CONTEXT_NAMESPACES)
+    if version != current_version:
+        # Сбрасываем SITE_CACHE Django: сайт могли изменить в другом процессе
+        Site.objects.clear_cache()
+        context = {
+            'site': Site.objects.get_current(),
+            'contacts': settings.SITE_CONTACTS,
+            # Входит в ключи фрагментов шаблонов (core.templatetags.fragment_tags)
+            'site_version': current_version,
+        }
+        _site_context = (current_version, context)
+    return context
+
+
 def site_info(request):
     """
-    Добавляет в контекст объект текущего сайта (из Sites Framework).
-    Это позволяет в шаблонах обращаться к домену через {{ site.domain }}.
+    Добавляет в контекст объект текущего сайта (из Sites Framework) и
+    контакты. В шаблонах доступны {{ site.domain }} и contacts.
     """
-    return {'site': Site.objects.get_current()}
\ No newline at end of file
+    return get_site_context()
@@ -0,0 +1,60 @@
+# Path: core/db_routers.py
+
+"""
+Разделение чтения и записи между двумя соединениями с базой.
+
+Публичные страницы только читают, поэтому их запросы уходят на отдельное
+соединение 'replica' (файл базы в режиме только для чтения или снимок
+базы, см. команду snapshot_replica). Запись всегда идет в 'default'.
+
+Реплика используется только внутри запросов, которые разрешил
+ReplicaRoutingMiddleware (безопасные методы и нет недавней записи от этого
+посетителя). Все остальное — админка при сохранении, команды, сигналы,
+чтение внутри открытой транзакции — читает основную базу и поэтому видит
+собственные изменения. После каждого нового снимка увеличивается версия
+'replica' (core.cache_versions), чтобы кеши, собранные по старому снимку,
+не пережили его.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+
+# Сессии и пользователи всегда читаются из основной базы: иначе сразу после
+# входа в админку снимок реплики еще не знает о новой сессии
+PRIMARY_ONLY_APPS = ('sessions', 'auth', 'admin')
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Включает (или выключает) чтение с реплики в текущем потоке или задаче asyncio."""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        # Внутри транзакции читаем основную базу: реплика не видит незакоммиченных изменений
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Обе базы содержат одни и те же данные
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,22 @@
+# Path: core/files.py
+
+"""
+Запись файлов, которые отдаются как статика или читаются другими
+процессами: карта сайта (core.sitemap_files), предрендер страниц
+(core.prerender), профили запросов (core.profiling).
+"""
+
+import os
+import tempfile
+
+
+def write_file(path, data):
+    """Атомарно записывает файл, если его содержимое изменилось. Возвращает True при записи."""
+    if path.exists() and path.read_bytes() == data:
+        return False
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(data)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+    return True
@@ -0,0 +1,134 @@
+# Path: core/management/commands/benchmark_asgi.py
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.autocomplete import _words
+from core.models import Article
+
+# Сколько разных префиксов перебирает "живой" поиск (как набор текста в строке поиска)
+SEARCH_PREFIXES = 50
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность синхронных views под WSGI (пул потоков, "
+        "как gunicorn gthread) и async-views под ASGI (один event loop, core.async_views) "
+        "при одинаковом числе одновременных запросов. Запросы выполняются в процессе "
+        "через тестовые клиенты, без сети."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Запросов на адрес в каждом режиме.")
+        parser.add_argument('--concurrency', type=int, default=20, help="Одновременных запросов.")
+        parser.add_argument('--no-page-cache', action='store_true', help="Отключить кеш страниц (замерить рендер, а не кеш).")
+        parser.add_argument('--output', default=None, help="Сохранить результаты в JSON.")
+
+    def handle(self, *args, **options):
+        targets = self.targets()
+        # Замер идет в одном процессе, поэтому кеш страниц работает и с locmem
+        overrides = {'ALLOWED_HOSTS': ['testserver'], 'PAGE_CACHE_ENABLED': not options['no_page_cache']}
+
+        results = {}
+        for name, urls in targets.items():
+            with override_settings(**overrides, ROOT_URLCONF='myproject.urls'):
+                wsgi = self.run_wsgi(urls, options)
+            with override_settings(**overrides, ROOT_URLCONF='myproject.asgi_urls'):
+                asgi = asyncio.run(self.run_asgi(urls, options))
+            results[name] = {'wsgi': wsgi, 'asgi': asgi}
+            self.report(name, wsgi, asgi)
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+            self.stdout.write(f"Результаты сохранены в {options['output']}")
+
+    def targets(self):
+        """Адреса для замера: {название: список адресов, по которым идут запросы по кругу}."""
+        titles = Article.objects.published().order_by('-published_date').values_list('title', flat=True)[:SEARCH_PREFIXES]
+        words = [word for title in titles for word in _words(title) if len(word) > 3]
+        prefixes = list(dict.fromkeys(word[:length] for word in words for length in (3, 4, 5)))[:SEARCH_PREFIXES]
+        search_url = reverse('api_v1_article_search')
+        article = Article.objects.published().order_by('-published_date').first()
+        return {
+            'api_v1_article_search': [f'{search_url}?q={prefix}' for prefix in prefixes] or [f'{search_url}?q=mik'],
+            'article_list': [reverse('article_list')],
+            'article_detail': [article.get_absolute_url()] if article else [reverse('home')],
+        }
+
+    def summary(self, timings, elapsed, statuses):
+        timings.sort()
+        return {
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'errors': sum(1 for status in statuses if status != 200),
+        }
+
+    def run_wsgi(self, urls, options):
+        local = threading.local()
+        url_cycle = itertools.cycle(urls)
+        lock = threading.Lock()
+
+        def fetch(_):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            with lock:
+                url = next(url_cycle)
+            started = time.perf_counter()
+            status = local.client.get(url).status_code
+            return time.perf_counter() - started, status
+
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            # Прогрев: кеш страниц, индекс поиска, соединения потоков
+            list(pool.map(fetch, range(options['concurrency'])))
+            started = time.perf_counter()
+            measured = list(pool.map(fetch, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+        return self.summary([t for t, _ in measured], elapsed, [s for _, s in measured])
+
+    async def run_asgi(self, urls, options):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        url_cycle = itertools.cycle(urls)
+
+        async def fetch(_):
+            # Как ASGIHandler: у каждого запроса свой поток для sync_to_async,
+            # иначе тестовый клиент выполняет их все в одном потоке
+            async with semaphore, ThreadSensitiveContext():
+                url = next(url_cycle)
+                started = time.perf_counter()
+                response = await client.get(url)
+                return time.perf_counter() - started, response.status_code
+
+        await asyncio.gather(*(fetch(i) for i in range(options['concurrency'])))
+        started = time.perf_counter()
+        measured = await asyncio.gather(*(fetch(i) for i in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        return self.summary([t for t, _ in measured], elapsed, [s for _, s in measured])
+
+    def report(self, name, wsgi, asgi):
+        ratio = asgi['rps'] / wsgi['rps'] if wsgi['rps'] else 0
+        self.stdout.write(name)
+        for mode, result in (('WSGI', wsgi), ('ASGI', asgi)):
+            line = f"  {mode}: {result['rps']:.0f} запр/с, p50 {result['p50_ms']:.1f} мс, p95 {result['p95_ms']:.1f} мс"
+            if result['errors']:
+                line += f", ошибок {result['errors']}"
+            self.stdout.write(line if not result['errors'] else self.style.ERROR(line))
+        self.stdout.write(f"  ASGI / WSGI: {ratio:.2f}")
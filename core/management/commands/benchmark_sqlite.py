@@ -0,0 +1,139 @@
+# Path: core/management/commands/benchmark_sqlite.py
+
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Запрос читателя — первая страница ленты статей, как в article_list_view
+READ_QUERY = (
+    'SELECT id, title, slug, excerpt, published_date FROM core_article '
+    'WHERE is_published ORDER BY published_date DESC, id DESC LIMIT 6'
+)
+
+# Запись как при сохранении статьи в админке: несколько UPDATE в одной транзакции
+WRITE_QUERY = "UPDATE core_article SET updated_date = datetime('now') WHERE id = ?"
+
+# Настройки SQLite по умолчанию (без init_command): журнал отката и полная синхронизация
+DEFAULT_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность чтения SQLite при параллельной записи: "
+        "настройки по умолчанию против SQLITE_PRAGMAS из settings. "
+        "Работает на копии базы, рабочая база не изменяется."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=5, help="Длительность каждого прогона, в секундах.")
+        parser.add_argument('--readers', type=int, default=4, help="Число потоков-читателей.")
+        parser.add_argument('--write-interval', type=float, default=0.01, help="Пауза писателя между транзакциями, в секундах.")
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("Бенчмарк предназначен для SQLite.")
+        timeout = database.get('OPTIONS', {}).get('timeout', 5)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'benchmark.sqlite3'
+            # Копия через backup API: учитывает и незавершенный WAL рабочей базы
+            source, target = sqlite3.connect(database['NAME']), sqlite3.connect(path)
+            source.backup(target)
+            source.close()
+            target.close()
+
+            runs = [
+                ("по умолчанию", DEFAULT_PRAGMAS, 5),
+                ("SQLITE_PRAGMAS", settings.SQLITE_PRAGMAS, timeout),
+            ]
+            for label, pragmas, busy_timeout in runs:
+                result = self.run(path, pragmas, busy_timeout, options)
+                self.report(label, result)
+
+    def connect(self, path, pragmas, timeout):
+        conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name}={value}')
+        return conn
+
+    def run(self, path, pragmas, timeout, options):
+        setup = self.connect(path, pragmas, timeout)
+        article_ids = [row[0] for row in setup.execute('SELECT id FROM core_article LIMIT 20')]
+        setup.close()
+        if not article_ids:
+            raise CommandError("В базе нет статей: сначала загрузите или сгенерируйте данные.")
+
+        stop = threading.Event()
+        latencies, errors, writes = [], [], [0]
+        lock = threading.Lock()
+
+        def reader():
+            conn = self.connect(path, pragmas, timeout)
+            local = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute(READ_QUERY).fetchall()
+                except sqlite3.OperationalError as exc:
+                    with lock:
+                        errors.append(str(exc))
+                    continue
+                local.append(time.perf_counter() - started)
+            conn.close()
+            with lock:
+                latencies.extend(local)
+
+        def writer():
+            conn = self.connect(path, pragmas, timeout)
+            while not stop.is_set():
+                try:
+                    conn.execute('BEGIN IMMEDIATE')
+                    for article_id in article_ids:
+                        conn.execute(WRITE_QUERY, [article_id])
+                    conn.execute('COMMIT')
+                    writes[0] += 1
+                except sqlite3.OperationalError as exc:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    with lock:
+                        errors.append(str(exc))
+                time.sleep(options['write_interval'])
+            conn.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        return {
+            'reads': len(latencies),
+            'writes': writes[0],
+            'errors': len(errors),
+            'duration': options['duration'],
+            'latencies': sorted(latencies),
+        }
+
+    def report(self, label, result):
+        latencies = result['latencies']
+        if latencies:
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        else:
+            p50 = p99 = 0.0
+        self.stdout.write(
+            f"{label}: чтений {result['reads'] / result['duration']:.0f}/с, "
+            f"p50 {p50:.2f} мс, p99 {p99:.2f} мс, "
+            f"транзакций записи {result['writes'] / result['duration']:.0f}/с, "
+            f"ошибок блокировки {result['errors']}"
+        )
@@ -0,0 +1,189 @@
+# Path: core/management/commands/benchmark_views.py
+
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from core import prerender, sitemap_files
+from core.models import Article
+from core.pagination import encode_cursor
+from core.views import ARTICLES_PER_PAGE
+
+# Страницы админки (только для сотрудников) бенчмарк не проходит
+SKIPPED_ROUTES = ('admin_profiles', 'admin_profile_file')
+
+# Токен /metrics на время прогона
+BENCHMARK_METRICS_TOKEN = 'benchmark'
+
+# Насколько результат может быть хуже базового, прежде чем считаться регрессией
+DEFAULT_THRESHOLD = 0.2
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def route_names(resolver=None):
+    """Имена всех маршрутов myproject/urls.py (с вложенными core/urls.py), кроме приложений с namespace (админка)."""
+    names = []
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace:
+                continue
+            names.extend(route_names(pattern))
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.append(pattern.name)
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет все публичные маршруты (core/urls.py и myproject/urls.py) в процессе "
+        "и измеряет p50/p95/p99 времени ответа, число SQL-запросов и пиковую память. "
+        "Результаты сохраняются в JSON; с --baseline сравниваются с прошлым прогоном, "
+        "и команда завершается с ошибкой при регрессии (для CI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help="Замеряемых запросов на адрес.")
+        parser.add_argument('--warmup', type=int, default=3, help="Прогревочных запросов на адрес.")
+        parser.add_argument('--output', default=None, help="Куда сохранить результаты (по умолчанию var/benchmarks/<время>.json).")
+        parser.add_argument('--baseline', default=None, help="JSON прошлого прогона для сравнения.")
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Допустимое ухудшение p95 и памяти (доля, 0.2 = 20%%).")
+        parser.add_argument('--page-cache', action='store_true', help="Не отключать кеш страниц (по умолчанию замеряются сами views).")
+
+    def handle(self, *args, **options):
+        urls = self.sample_urls()
+        missing = [name for name in route_names() if name not in urls and name not in SKIPPED_ROUTES]
+        if missing:
+            raise CommandError("Нет адресов для маршрутов: " + ', '.join(missing))
+
+        results = {}
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            PAGE_CACHE_ENABLED=options['page_cache'],
+            METRICS_TOKEN=BENCHMARK_METRICS_TOKEN,
+        ):
+            client = Client()
+            for name, (url, headers) in urls.items():
+                results[name] = self.measure(client, url, headers, options)
+                self.report(name, results[name])
+
+        data = {
+            'created': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'articles': Article.objects.published().count(),
+                'requests': options['requests'],
+                'page_cache': options['page_cache'],
+            },
+            'results': results,
+        }
+        output = Path(options['output'] or settings.BASE_DIR / 'var' / 'benchmarks' / f'{timezone.now():%Y%m%d-%H%M%S}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.stdout.write(f"Результаты сохранены в {output}")
+
+        if options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text(encoding='utf-8'))
+            regressions = self.compare(results, baseline['results'], options['threshold'])
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(line))
+                raise CommandError(f"Регрессий: {len(regressions)}.")
+            self.stdout.write(self.style.SUCCESS("Регрессий относительно базового прогона нет."))
+
+    def sample_urls(self):
+        """По одному адресу (или несколько вариантов) на каждый маршрут: {имя: (адрес, заголовки)}."""
+        urls = {}
+        for section in dict.fromkeys(prerender.ROUTE_SOURCES.values()):
+            sitemap = prerender.PRERENDER_SITEMAPS[section]()
+            for item in list(sitemap.items())[:2]:
+                url = sitemap_files.item_value(sitemap, 'location', item)
+                name = get_resolver().resolve(url).url_name
+                urls.setdefault(name, (url, {}))
+
+        list_url = reverse('article_list')
+        published = list(Article.objects.published().order_by('-published_date', '-pk')[:ARTICLES_PER_PAGE])
+        if published:
+            urls['article_list (курсор)'] = (f'{list_url}?cursor={encode_cursor(published[-1])}', {})
+        urls['article_list (страница)'] = (f'{list_url}?page=2', {})
+        urls['article_list (htmx)'] = (list_url, {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'})
+        urls['article_list (поиск)'] = (f'{list_url}?q=настройка', {})
+        urls['api_v1_article_search'] = (f"{reverse('api_v1_article_search')}?q=настр", {})
+
+        sitemap_files.ensure_built()
+        urls['sitemap_file'] = (reverse('sitemap_file', kwargs={'filename': sitemap_files.INDEX_FILE}), {})
+        urls['metrics'] = (reverse('metrics'), {'HTTP_AUTHORIZATION': f'Bearer {BENCHMARK_METRICS_TOKEN}'})
+        return urls
+
+    def measure(self, client, url, headers, options):
+        for _ in range(options['warmup']):
+            client.get(url, **headers)
+
+        timings, queries, status = [], [], None
+        for _ in range(options['requests']):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url, **headers)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+            status = response.status_code
+
+        # Память замеряется отдельным запросом: tracemalloc замедляет выполнение
+        tracemalloc.start()
+        client.get(url, **headers)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'url': url,
+            'status': status,
+            'p50_ms': round(percentile(timings, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+            'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+            'queries': max(queries),
+            'peak_memory_kib': round(peak / 1024, 1),
+        }
+
+    def report(self, name, result):
+        line = (
+            f"{name}: p50 {result['p50_ms']:.1f} мс, p95 {result['p95_ms']:.1f} мс, "
+            f"p99 {result['p99_ms']:.1f} мс, запросов {result['queries']}, "
+            f"память {result['peak_memory_kib']:.0f} КиБ ({result['status']})"
+        )
+        self.stdout.write(line if result['status'] == 200 else self.style.ERROR(line))
+
+    def compare(self, results, baseline, threshold):
+        """Строки с описанием регрессий относительно базового прогона."""
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            if result['status'] != before['status']:
+                regressions.append(f"{name}: статус {before['status']} -> {result['status']}")
+            if result['queries'] > before['queries']:
+                regressions.append(f"{name}: SQL-запросов {before['queries']} -> {result['queries']}")
+            for key, label in (('p95_ms', 'p95'), ('peak_memory_kib', 'память')):
+                if before[key] and result[key] > before[key] * (1 + threshold):
+                    regressions.append(f"{name}: {label} {before[key]} -> {result[key]}")
+        return regressions
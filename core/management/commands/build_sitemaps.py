@@ -0,0 +1,24 @@
+# Path: core/management/commands/build_sitemaps.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import sitemap_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Собирает карту сайта в файлы: индекс sitemap.xml и сжатые файлы разделов. "
+        "Запускать после деплоя и массового импорта; при сохранении в админке "
+        "затронутые файлы пересобирает воркер process_sitemap_jobs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help="Каталог для файлов (по умолчанию SITEMAP_DIR).")
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.SITEMAP_DIR
+        manifest = sitemap_files.build(directory)
+        for section, pages in manifest['sections'].items():
+            self.stdout.write(f"{section}: файлов {len(pages)}")
+        self.stdout.write(self.style.SUCCESS(f"Карта сайта собрана в {directory}."))
@@ -0,0 +1,222 @@
+# Path: core/management/commands/generate_articles.py
+
+import io
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from core import cache_versions, search, similarity, sitemap_files, tag_stats
+from core.markup import make_excerpt, markdown_hash, render_markdown
+from core.models import Article, Category, Tag, ThumbnailJob
+
+# Словарь для правдоподобных русских текстов о IT-инфраструктуре
+TOPICS = [
+    'MikroTik', 'WireGuard', 'OpenVPN', 'VLAN', 'Wi-Fi', 'IP-телефония', 'Asterisk',
+    'резервное копирование', 'видеонаблюдение', 'Active Directory', 'Linux', 'Windows Server',
+    'Proxmox', 'Docker', 'мониторинг', 'Zabbix', 'файрвол', 'DNS', 'DHCP', 'NAS',
+    'облачное хранилище', 'антивирус', 'SIP-транк', 'роутер', 'коммутатор', 'точка доступа',
+    'сервер', 'ИБП', 'структурированная кабельная система', 'удаленный доступ',
+]
+CATEGORY_NAMES = [
+    'Сетевое оборудование', 'Защита данных', 'IP-телефония', 'Виртуализация', 'Серверы',
+    'Беспроводные сети', 'Видеонаблюдение', 'Мониторинг', 'Резервное копирование',
+    'Удаленная работа', 'Облачные сервисы', 'Информационная безопасность',
+]
+SUBJECTS = [
+    'Настройка', 'Обслуживание', 'Диагностика', 'Внедрение', 'Обновление', 'Резервирование',
+    'Защита', 'Оптимизация', 'Миграция', 'Аудит',
+]
+AUDIENCES = [
+    'для малого бизнеса', 'в небольшом офисе', 'для удаленных сотрудников', 'в филиальной сети',
+    'на складе', 'в медицинском центре', 'в ресторане', 'для интернет-магазина',
+]
+SENTENCES = [
+    '{topic} помогает снизить простои и упростить администрирование.',
+    'Перед тем как менять конфигурацию, сделайте резервную копию: {topic} не прощает ошибок.',
+    'Мы часто видим, что {topic} настроен по умолчанию, и это главный источник проблем.',
+    'Для большинства компаний достаточно базовой схемы, но {topic} стоит проверить отдельно.',
+    'Если сотрудники жалуются на медленную работу, начните с анализа: {topic} может быть узким местом.',
+    'Бюджетное решение на основе {topic} окупается уже в первый год эксплуатации.',
+    'Документируйте каждое изменение: через полгода никто не вспомнит, зачем {topic} настроен именно так.',
+    'Регулярный мониторинг показывает, что {topic} требует внимания раз в несколько месяцев.',
+    'Главное правило: {topic} должен быть обновлен до актуальной версии.',
+    'Связка {topic} и {other} закрывает большинство задач небольшого офиса.',
+]
+CODE_SNIPPETS = [
+    '/ip firewall filter add chain=input connection-state=established,related action=accept',
+    '/interface wireguard add listen-port=13231 name=wg-office',
+    'rsync -avz --delete /srv/data/ backup@nas:/volume1/backup/',
+    'systemctl status zabbix-agent',
+    'ping -c 4 8.8.8.8',
+]
+
+# Распределение тегов по популярности: вес тега с рангом r — 1 / r**TAG_ZIPF
+TAG_ZIPF = 1.1
+
+PUBLISHED_RATIO = 0.9
+IMAGE_SIZE = (1600, 1000)
+
+
+def make_markdown(rng, topic):
+    """Статья в Markdown: заголовки, абзацы, списки, код и выделения."""
+    def sentence():
+        return rng.choice(SENTENCES).format(topic=topic, other=rng.choice(TOPICS))
+
+    def paragraph():
+        return ' '.join(sentence() for _ in range(rng.randint(2, 5)))
+
+    blocks = [paragraph()]
+    for section in range(rng.randint(2, 5)):
+        blocks.append(f'## {rng.choice(SUBJECTS)}: шаг {section + 1}')
+        blocks.append(paragraph())
+        if rng.random() < 0.5:
+            blocks.append('\n'.join(f'- **{rng.choice(TOPICS)}** — {sentence().lower()}' for _ in range(rng.randint(2, 5))))
+        if rng.random() < 0.3:
+            blocks.append('```\n' + rng.choice(CODE_SNIPPETS) + '\n```')
+        blocks.append(paragraph())
+    return '\n\n'.join(blocks)
+
+
+def make_image(rng, index):
+    """Градиентная картинка с фигурами: для миниатюр в нескольких форматах."""
+    colors = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(2)]
+    image = Image.new('RGB', IMAGE_SIZE)
+    draw = ImageDraw.Draw(image)
+    width, height = IMAGE_SIZE
+    for y in range(height):
+        mix = y / height
+        draw.line([(0, y), (width, y)], fill=tuple(int(a + (b - a) * mix) for a, b in zip(*colors)))
+    for _ in range(12):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randrange(40, 240)
+        draw.ellipse([x - radius, y - radius, x + radius, y + radius], outline=(255, 255, 255), width=6)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return default_storage.save(f'articles/originals/generated-{index}.jpg', ContentFile(buffer.getvalue()))
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует большой набор статей для нагрузочного тестирования: Markdown на русском, "
+        "категории, теги с неравномерной популярностью, изображения. Статьи создаются "
+        "через bulk_create, затем пересобираются поисковый индекс, счетчики тегов, "
+        "похожие статьи и карта сайта."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help="Сколько статей создать.")
+        parser.add_argument('--categories', type=int, default=len(CATEGORY_NAMES), help="Сколько категорий использовать.")
+        parser.add_argument('--tags', type=int, default=150, help="Сколько тегов использовать.")
+        parser.add_argument('--images', type=int, default=20, help="Сколько разных изображений сгенерировать (0 — без изображений).")
+        parser.add_argument('--image-ratio', type=float, default=0.5, help="Доля статей с изображением.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed генератора случайных чисел (для воспроизводимости).")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--skip-related', action='store_true', help="Не пересчитывать похожие статьи (долго на сотнях тысяч статей).")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        author = User.objects.filter(is_superuser=True).first() or User.objects.get_or_create(username='generator')[0]
+        categories = self.make_categories(options['categories'])
+        tags = self.make_tags(options['tags'])
+        tag_weights = [1 / (rank ** TAG_ZIPF) for rank in range(1, len(tags) + 1)]
+        category_weights = [1 / rank for rank in range(1, len(categories) + 1)]
+        images = [make_image(rng, i) for i in range(options['images'])]
+
+        # Уникальная метка запуска: повторный запуск не конфликтует по slug
+        run = f'{options["seed"]}-{int(timezone.now().timestamp())}'
+        now = timezone.now()
+        created = 0
+        for start in range(0, options['count'], options['batch_size']):
+            size = min(options['batch_size'], options['count'] - start)
+            with transaction.atomic():
+                batch = [
+                    self.make_article(rng, run, start + i, author, categories, category_weights, images, options)
+                    for i in range(size)
+                ]
+                articles = Article.objects.bulk_create(batch)
+                # auto_now/auto_now_add перезаписывают даты при вставке: разносим статьи во времени
+                for article in articles:
+                    article.published_date = now - timedelta(minutes=rng.randrange(3 * 365 * 24 * 60))
+                    article.updated_date = article.published_date + timedelta(minutes=rng.randrange(60 * 24 * 90))
+                    article.updated_date = min(article.updated_date, now)
+                Article.objects.bulk_update(articles, ['published_date', 'updated_date'])
+                Article.tags.through.objects.bulk_create(
+                    Article.tags.through(article_id=article.pk, tag_id=tag.pk)
+                    for article in articles
+                    for tag in self.pick_tags(rng, tags, tag_weights)
+                )
+                # Статьи только что созданы, заданий для них в очереди еще нет
+                ThumbnailJob.objects.bulk_create(
+                    ThumbnailJob(model_label=Article._meta.label, object_id=article.pk, created_at=now)
+                    for article in articles if article.original_image
+                )
+            created += len(articles)
+            self.stdout.write(f"Создано статей: {created} из {options['count']}")
+
+        self.rebuild_derived_data(options)
+        self.stdout.write(self.style.SUCCESS(f"Готово: {created} статей."))
+
+    def make_categories(self, count):
+        categories = []
+        for i in range(count):
+            name = CATEGORY_NAMES[i % len(CATEGORY_NAMES)] + (f' {i // len(CATEGORY_NAMES) + 1}' if i >= len(CATEGORY_NAMES) else '')
+            category, _ = Category.objects.get_or_create(slug=f'generated-category-{i}', defaults={'name': f'{name} (ген.)'})
+            categories.append(category)
+        return categories
+
+    def make_tags(self, count):
+        tags = []
+        for i in range(count):
+            name = TOPICS[i % len(TOPICS)] + (f' {i // len(TOPICS) + 1}' if i >= len(TOPICS) else '')
+            tag, _ = Tag.objects.get_or_create(slug=f'generated-tag-{i}', defaults={'name': f'{name} (ген.)'})
+            tags.append(tag)
+        return tags
+
+    def pick_tags(self, rng, tags, weights):
+        count = min(len(tags), rng.choice((1, 2, 3, 3, 4, 5)))
+        picked = set()
+        while len(picked) < count:
+            picked.add(rng.choices(range(len(tags)), weights=weights)[0])
+        return [tags[i] for i in picked]
+
+    def make_article(self, rng, run, index, author, categories, category_weights, images, options):
+        topic = rng.choice(TOPICS)
+        title = f'{rng.choice(SUBJECTS)}: {topic} {rng.choice(AUDIENCES)}'
+        content = make_markdown(rng, topic)
+        # bulk_create не вызывает save(): HTML, хеш и анонс заполняем сами
+        content_html = render_markdown(content)
+        image = rng.choice(images) if images and rng.random() < options['image_ratio'] else None
+        return Article(
+            title=title,
+            slug=f'generated-{run}-{index}',
+            content=content,
+            content_html=content_html,
+            content_hash=markdown_hash(content),
+            excerpt=make_excerpt(content_html),
+            is_published=rng.random() < PUBLISHED_RATIO,
+            author=author,
+            category=rng.choices(categories, weights=category_weights)[0],
+            original_image=image,
+        )
+
+    def rebuild_derived_data(self, options):
+        """bulk_create не отправляет сигналы: пересобираем все, что они обычно поддерживают."""
+        if search.is_available():
+            with transaction.atomic():
+                search.rebuild_index()
+            self.stdout.write("Поисковый индекс пересобран.")
+        tag_stats.rebuild()
+        self.stdout.write("Счетчики тегов и категорий пересчитаны.")
+        if not options['skip_related']:
+            similarity.rebuild()
+            self.stdout.write("Похожие статьи пересчитаны.")
+        cache_versions.bump_version('articles', 'tags', 'categories')
+        sitemap_files.build()
+        self.stdout.write("Карта сайта собрана.")
@@ -0,0 +1,60 @@
+# Path: core/management/commands/generate_thumbnails.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import thumbnails
+
+
+def init_worker():
+    # Дочерний процесс не должен пользоваться соединением родителя
+    django.setup()
+    connections.close_all()
+
+
+def generate(task):
+    model_label, pk, force = task
+    instance = apps.get_model(model_label)._default_manager.get(pk=pk)
+    return thumbnails.generate_for(instance, force=force)
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует миниатюры для всех загруженных изображений параллельно "
+        "в нескольких процессах. Запускать после деплоя и изменения спецификаций."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Число процессов.")
+        parser.add_argument('--force', action='store_true', help="Пересоздать уже существующие файлы.")
+
+    def handle(self, *args, **options):
+        tasks = []
+        for model in thumbnails.models_with_specs():
+            sources = set(thumbnails.spec_fields(model).values())
+            for obj in model._default_manager.only(*sources).order_by('pk'):
+                if any(getattr(obj, field) for field in sources):
+                    tasks.append((model._meta.label, obj.pk, options['force']))
+
+        if not tasks:
+            self.stdout.write("Нет изображений для обработки.")
+            return
+
+        connections.close_all()
+        generated = errors = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+            futures = {pool.submit(generate, task): task for task in tasks}
+            for future, (label, pk, _) in futures.items():
+                try:
+                    generated += future.result()
+                except Exception as exc:
+                    errors += 1
+                    self.stderr.write(f"{label} #{pk}: {exc}")
+
+        style = self.style.WARNING if errors else self.style.SUCCESS
+        self.stdout.write(style(f"Сгенерировано миниатюр: {generated}, ошибок: {errors}"))
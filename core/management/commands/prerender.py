@@ -0,0 +1,40 @@
+# Path: core/management/commands/prerender.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import prerender
+
+
+class Command(BaseCommand):
+    help = (
+        "Экспортирует публичные страницы в статические файлы (HTML, .gz и .br) "
+        "для отдачи веб-сервером без Django. По умолчанию рендерит только страницы, "
+        "у которых изменилась updated_date или данные, от которых они зависят "
+        "(статьи в списках, теги и категории, похожие статьи)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help="Каталог для файлов (по умолчанию PRERENDER_DIR).")
+        parser.add_argument('--full', action='store_true', help="Пересобрать все страницы.")
+
+    def handle(self, *args, **options):
+        uncovered = prerender.uncovered_routes()
+        if uncovered:
+            raise CommandError(
+                "Не указан источник адресов для маршрутов: " + ', '.join(uncovered)
+                + ". Добавьте их в ROUTE_SOURCES или DYNAMIC_ROUTES (core/prerender.py)."
+            )
+        if prerender.brotli is None:
+            self.stdout.write(self.style.WARNING("Пакет brotli не установлен: файлы .br не создаются."))
+
+        directory = options['dir'] or settings.PRERENDER_DIR
+        stats = prerender.export(directory, full=options['full'])
+        for url, status in stats['errors']:
+            self.stdout.write(self.style.ERROR(f"{url}: ответ {status}"))
+        self.stdout.write(
+            f"Отрендерено {stats['rendered']}, без изменений {stats['skipped']}, удалено {stats['removed']}."
+        )
+        if stats['errors']:
+            raise CommandError(f"Не удалось отрендерить страниц: {len(stats['errors'])}.")
+        self.stdout.write(self.style.SUCCESS(f"Сайт экспортирован в {directory}."))
@@ -0,0 +1,31 @@
+# Path: core/management/commands/process_related_jobs.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import similarity
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает похожие статьи для статей из очереди (RelatedArticleJob). "
+        "С --loop работает как фоновый воркер."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Не завершаться, опрашивать очередь постоянно.")
+        parser.add_argument('--interval', type=float, default=30, help="Пауза между опросами очереди, в секундах.")
+        parser.add_argument('--limit', type=int, default=500, help="Сколько статей пересчитывать за один проход.")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            done = similarity.process_jobs(limit=options['limit'])
+            if done:
+                self.stdout.write(f"Похожие статьи пересчитаны для {done} статей")
+            if not options['loop']:
+                break
+            if not done:
+                time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+# Path: core/management/commands/process_sitemap_jobs.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import sitemap_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает файлы карты сайта для изменений из очереди (SitemapJob). "
+        "С --loop работает как фоновый воркер."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Не завершаться, опрашивать очередь постоянно.")
+        parser.add_argument('--interval', type=float, default=30, help="Пауза между опросами очереди, в секундах.")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            done = sitemap_files.process_jobs()
+            if done:
+                self.stdout.write(f"Карта сайта пересобрана по {done} изменениям")
+            if not options['loop']:
+                break
+            if not done:
+                time.sleep(options['interval'])
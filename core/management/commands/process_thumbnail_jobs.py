@@ -0,0 +1,31 @@
+# Path: core/management/commands/process_thumbnail_jobs.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует миниатюры для объектов из очереди (ThumbnailJob). "
+        "С --loop работает как фоновый воркер."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Не завершаться, опрашивать очередь постоянно.")
+        parser.add_argument('--interval', type=float, default=5, help="Пауза между опросами очереди, в секундах.")
+        parser.add_argument('--limit', type=int, default=50, help="Сколько заданий брать за один проход.")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            done, failed = thumbnails.process_jobs(limit=options['limit'])
+            if done or failed:
+                self.stdout.write(f"Миниатюры: готово {done}, с ошибкой {failed}")
+            if not options['loop']:
+                break
+            if not done:
+                time.sleep(options['interval'])
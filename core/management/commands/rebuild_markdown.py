@@ -0,0 +1,46 @@
+# Path: core/management/commands/rebuild_markdown.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Article, Page
+
+
+class Command(BaseCommand):
+    help = (
+        "Перерисовывает сохраненный HTML для статей и страниц вместе с анонсами статей. "
+        "Запускать после loaddata (он не вызывает save()) и после изменения "
+        "расширений или настроек Markdown."
+    )
+
+    batch_size = 200
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--changed-only',
+            action='store_true',
+            help="Обновлять только объекты, у которых изменился хеш контента.",
+        )
+
+    def handle(self, *args, **options):
+        force = not options['changed_only']
+        for model in (Article, Page):
+            updated = self.rebuild(model, force)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: обновлено {updated}")
+        self.stdout.write(self.style.SUCCESS("HTML-версии контента пересобраны."))
+
+    def rebuild(self, model, force):
+        updated = 0
+        batch = []
+        with transaction.atomic():
+            for obj in model.objects.order_by('pk').iterator(chunk_size=self.batch_size):
+                if obj.render_content(force=force):
+                    batch.append(obj)
+                if len(batch) >= self.batch_size:
+                    model.objects.bulk_update(batch, model.rendered_fields)
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                model.objects.bulk_update(batch, model.rendered_fields)
+                updated += len(batch)
+        return updated
@@ -0,0 +1,16 @@
+# Path: core/management/commands/rebuild_related_articles.py
+
+from django.core.management.base import BaseCommand
+
+from core import similarity
+
+
+class Command(BaseCommand):
+    help = (
+        "Полностью пересчитывает похожие статьи (TF-IDF по тексту и тегам). "
+        "Запускать по расписанию и после массового импорта статей."
+    )
+
+    def handle(self, *args, **options):
+        count = similarity.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Похожие статьи посчитаны для {count} статей."))
@@ -0,0 +1,18 @@
+# Path: core/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = "Полностью пересобирает полнотекстовый (FTS5) индекс опубликованных статей."
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write(self.style.WARNING("FTS5 доступен только для SQLite, индекс не нужен."))
+            return
+        with transaction.atomic():
+            count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано статей: {count}"))
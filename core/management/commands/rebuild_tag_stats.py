@@ -0,0 +1,16 @@
+# Path: core/management/commands/rebuild_tag_stats.py
+
+from django.core.management.base import BaseCommand
+
+from core import tag_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счетчики статей у тегов и категорий и таблицу совместной "
+        "встречаемости тегов. Запускать после loaddata и массовых правок через update()."
+    )
+
+    def handle(self, *args, **options):
+        count = tag_stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Счетчики пересчитаны, тегов со статьями: {count}"))
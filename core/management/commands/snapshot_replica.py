@@ -0,0 +1,60 @@
+# Path: core/management/commands/snapshot_replica.py
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import cache_versions
+
+# Если версии этих данных изменились с прошлого снимка, кеши страниц,
+# собранные по старому снимку, сбрасываются версией 'replica'
+CONTENT_NAMESPACES = ('articles', 'tags', 'categories', 'services', 'pages', 'site')
+
+
+class Command(BaseCommand):
+    help = (
+        "Обновляет файл-снимок базы для реплики чтения (DATABASE_REPLICA = путь к файлу). "
+        "Снимок пишется во временный файл и атомарно подменяет старый. "
+        "С --loop повторяет обновление с заданным интервалом."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Обновлять снимок постоянно.")
+        parser.add_argument('--interval', type=float, default=30, help="Пауза между снимками, в секундах.")
+
+    def handle(self, *args, **options):
+        replica = settings.DATABASE_REPLICA
+        if not replica or replica == 'readonly':
+            raise CommandError("DATABASE_REPLICA должен указывать путь к файлу снимка.")
+        target = Path(replica)
+        last_versions = None
+        while True:
+            started = time.monotonic()
+            # Версии читаем до копирования: изменение во время копирования попадет в следующий снимок
+            versions = cache_versions.get_versions(*CONTENT_NAMESPACES)
+            self.snapshot(settings.DATABASES['default']['NAME'], target)
+            if versions != last_versions:
+                cache_versions.bump_version('replica')
+                last_versions = versions
+            self.stdout.write(f"Снимок обновлен за {time.monotonic() - started:.2f} с: {target}")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def snapshot(self, source_path, target):
+        temporary = target.with_name(target.name + '.tmp')
+        source = sqlite3.connect(source_path)
+        destination = sqlite3.connect(temporary)
+        try:
+            # backup API дает согласованную копию, не останавливая запись в основную базу
+            source.backup(destination)
+            # Снимок только читают: режим журнала DELETE не требует файлов -wal/-shm
+            destination.execute('PRAGMA journal_mode=delete')
+        finally:
+            destination.close()
+            source.close()
+        os.replace(temporary, target)
@@ -0,0 +1,37 @@
+# Path: core/markup.py
+
+import hashlib
+import html
+
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from markdown_deux import markdown, get_style
+
+from . import metrics
+
+# Длина анонса статьи в словах (список статей, JSON-LD)
+EXCERPT_WORDS = 30
+
+
+def markdown_hash(text):
+    """
+    Хеш Markdown-текста вместе с текущими настройками markdown_deux.
+    Если поменять стиль рендеринга, хеш изменится и HTML перерисуется.
+    """
+    style = repr(sorted(get_style('default').items()))
+    return hashlib.sha256(f'{style}\n{text}'.encode('utf-8')).hexdigest()
+
+
+def render_markdown(text):
+    """Рендерит Markdown в HTML теми же настройками, что и фильтр |markdown."""
+    with metrics.track('markdown'):
+        return markdown(text)
+
+
+def make_excerpt(content_html, words=EXCERPT_WORDS):
+    """
+    Готовит текстовый анонс из HTML: убирает теги и HTML-сущности
+    и обрезает текст до заданного количества слов.
+    """
+    text = html.unescape(strip_tags(content_html))
+    return Truncator(text).words(words, truncate=' …')
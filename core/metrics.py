@@ -0,0 +1,242 @@
+# Path: core/metrics.py
+
+"""
+Метрики производительности запросов.
+
+MetricsMiddleware (core.middleware) на время запроса включает сбор: каждый
+SQL-запрос (обертка execute_wrapper, которую получает каждое соединение), рендер шаблона
+(core.template_backend), рендер Markdown (core.markup) и генерация
+миниатюр imagekit (core.thumbnails) добавляют свое время через track().
+По итогам запроса ответ получает заголовок Server-Timing, а значения
+попадают в гистограммы процесса с меткой view — имя маршрута из
+resolver_match.
+
+Каждый процесс раз в FLUSH_INTERVAL секунд сохраняет свои гистограммы
+в METRICS_DIR/<pid>.json; эндпоинт /metrics складывает файлы всех
+воркеров и отдает сумму в текстовом формате Prometheus.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+# Границы корзин гистограмм: время в секундах и число SQL-запросов
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Этапы запроса, время которых собирается через track()
+STAGES = ('db', 'template', 'markdown', 'imagekit')
+
+# Гистограммы: имя метрики -> (описание, границы корзин)
+HISTOGRAMS = {
+    'http_request_duration_seconds': ("Время обработки запроса.", DURATION_BUCKETS),
+    'http_request_db_seconds': ("Время SQL-запросов за один запрос.", DURATION_BUCKETS),
+    'http_request_template_seconds': ("Время рендеринга шаблонов за один запрос.", DURATION_BUCKETS),
+    'http_request_markdown_seconds': ("Время рендеринга Markdown за один запрос.", DURATION_BUCKETS),
+    'http_request_imagekit_seconds': ("Время генерации миниатюр за один запрос.", DURATION_BUCKETS),
+    'http_request_db_queries': ("Число SQL-запросов за один запрос.", QUERY_BUCKETS),
+}
+RESPONSES_COUNTER = 'http_responses_total'
+
+# Как часто процесс сохраняет свои метрики в METRICS_DIR, в секундах
+FLUSH_INTERVAL = 1.0
+
+
+# --- Сбор времени внутри запроса ---
+
+class RequestTimings:
+    """Накопленное время этапов одного запроса."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.queries = 0
+
+
+_timings = ContextVar('request_timings', default=None)
+
+
+@contextmanager
+def track(stage):
+    """Добавляет время блока к этапу stage текущего запроса (вне запроса ничего не делает)."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[stage] += time.perf_counter() - started
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    timings.queries += 1
+    with track('db'):
+        return execute(sql, params, many, context)
+
+
+def install_db_wrapper(connection):
+    """
+    Подключает замер SQL к соединению (сигнал connection_created в core.signals).
+    Обертка стоит на соединении постоянно и считает запросы только внутри
+    collect(): так учитываются и запросы из потоков sync_to_async под ASGI,
+    куда ContextVar с RequestTimings копируется вместе с контекстом.
+    """
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+@contextmanager
+def collect():
+    """Включает сбор метрик для запроса; возвращает RequestTimings."""
+    timings = RequestTimings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def server_timing(total, timings):
+    """Значение заголовка Server-Timing (миллисекунды)."""
+    parts = [f'db;dur={timings.durations["db"] * 1000:.1f};desc="{timings.queries} SQL"']
+    for stage in STAGES[1:]:
+        if timings.durations.get(stage):
+            parts.append(f'{stage};dur={timings.durations[stage] * 1000:.1f}')
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+# --- Гистограммы процесса ---
+
+class Registry:
+    """
+    Гистограммы и счетчики процесса в виде, удобном для JSON:
+    histograms[метрика][view] = {'buckets': [...], 'sum': ..., 'count': ...},
+    counters[метрика]['view|status'] = значение.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.counters = {RESPONSES_COUNTER: {}}
+        self.flushed_at = 0.0
+
+    def observe(self, name, view, value):
+        bounds = HISTOGRAMS[name][1]
+        series = self.histograms[name].get(view)
+        if series is None:
+            series = self.histograms[name][view] = {'buckets': [0] * len(bounds), 'sum': 0, 'count': 0}
+        for index, bound in enumerate(bounds):
+            if value <= bound:
+                series['buckets'][index] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+    def record(self, view, status, total, timings):
+        with self.lock:
+            self.observe('http_request_duration_seconds', view, total)
+            for stage in STAGES:
+                self.observe(f'http_request_{stage}_seconds', view, timings.durations.get(stage, 0.0))
+            self.observe('http_request_db_queries', view, timings.queries)
+            key = f'{view}|{status}'
+            counter = self.counters[RESPONSES_COUNTER]
+            counter[key] = counter.get(key, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps({'histograms': self.histograms, 'counters': self.counters}))
+
+
+registry = Registry()
+
+
+def record(view, status, total, timings):
+    registry.record(view, status, total, timings)
+    if settings.METRICS_DIR and time.monotonic() - registry.flushed_at >= FLUSH_INTERVAL:
+        flush()
+
+
+# --- Общий каталог для нескольких воркеров ---
+
+def flush():
+    """Сохраняет метрики процесса в METRICS_DIR/<pid>.json (атомарно)."""
+    registry.flushed_at = time.monotonic()
+    directory = Path(settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+        json.dump(registry.snapshot(), tmp)
+    os.replace(tmp_path, directory / f'{os.getpid()}.json')
+
+
+def _merge(total, snapshot):
+    for name, series_by_view in snapshot.get('histograms', {}).items():
+        if name not in HISTOGRAMS:
+            continue
+        for view, series in series_by_view.items():
+            target = total['histograms'][name].setdefault(
+                view, {'buckets': [0] * len(series['buckets']), 'sum': 0, 'count': 0}
+            )
+            target['buckets'] = [a + b for a, b in zip(target['buckets'], series['buckets'])]
+            target['sum'] += series['sum']
+            target['count'] += series['count']
+    for name, values in snapshot.get('counters', {}).items():
+        counter = total['counters'].setdefault(name, {})
+        for key, value in values.items():
+            counter[key] = counter.get(key, 0) + value
+
+
+def collect_all():
+    """Сумма метрик всех процессов (или только текущего, если METRICS_DIR не задан)."""
+    if not settings.METRICS_DIR:
+        return registry.snapshot()
+    flush()
+    total = {'histograms': {name: {} for name in HISTOGRAMS}, 'counters': {}}
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        try:
+            _merge(total, json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            # Файл мог быть удален или заменен между glob и чтением
+            continue
+    return total
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_bound(bound):
+    return f'{bound:g}'
+
+
+def render_prometheus(data):
+    """Текстовый формат Prometheus (text/plain; version=0.0.4)."""
+    lines = []
+    for name, (description, bounds) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        for view, series in sorted(data['histograms'].get(name, {}).items()):
+            view_label = f'view="{_label(view)}"'
+            for bound, count in zip(bounds, series['buckets']):
+                lines.append(f'{name}_bucket{{{view_label},le="{_format_bound(bound)}"}} {count}')
+            lines.append(f'{name}_bucket{{{view_label},le="+Inf"}} {series["count"]}')
+            lines.append(f'{name}_sum{{{view_label}}} {series["sum"]:.6f}')
+            lines.append(f'{name}_count{{{view_label}}} {series["count"]}')
+    lines.append(f'# HELP {RESPONSES_COUNTER} Число ответов по view и статусу.')
+    lines.append(f'# TYPE {RESPONSES_COUNTER} counter')
+    for key, value in sorted(data['counters'].get(RESPONSES_COUNTER, {}).items()):
+        view, status = key.rsplit('|', 1)
+        lines.append(f'{RESPONSES_COUNTER}{{view="{_label(view)}",status="{status}"}} {value}')
+    return '\n'.join(lines) + '\n'
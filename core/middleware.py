@@ -0,0 +1,184 @@
+# Path: core/middleware.py
+
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics, profiling
+from .db_routers import replica_reads
+
+# Cookie "недавно сохранял": пока она есть, посетитель читает основную базу
+PIN_COOKIE_NAME = 'db_primary'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Отправляет чтение безопасных запросов на реплику (core.db_routers).
+    После запроса с записью (сохранение в админке) ставит короткоживущую cookie,
+    и следующие запросы этого посетителя читают основную базу: редактор сразу
+    видит свои изменения, даже если снимок реплики еще не обновился.
+    Решение хранится в ContextVar, поэтому работает и в async-цепочке.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(self.use_replica(request)):
+            response = self.get_response(request)
+        return self.pin_primary(request, response)
+
+    async def __acall__(self, request):
+        with replica_reads(self.use_replica(request)):
+            response = await self.get_response(request)
+        return self.pin_primary(request, response)
+
+    def use_replica(self, request):
+        return request.method in SAFE_METHODS and PIN_COOKIE_NAME not in request.COOKIES
+
+    def pin_primary(self, request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE_NAME, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, который не мешает async-цепочке под ASGI. Сам WhiteNoise
+    умеет работать только синхронно, и Django переводил бы каждый запрос
+    в поток еще до async-views (core.async_views). Поиск файла — словарь
+    в памяти, поэтому выполняется прямо на event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self.find_file(request.path_info) if self.autorefresh else self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Собирает время запроса по этапам (SQL, шаблоны, Markdown, imagekit)
+    и складывает значения в гистограммы по имени маршрута (core.metrics).
+    Заголовок Server-Timing получают сотрудники или все при
+    METRICS_SERVER_TIMING = True. Отключается METRICS_ENABLED = False.
+    Работает и в синхронной, и в async-цепочке.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with metrics.collect() as timings:
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        show_timing = settings.METRICS_SERVER_TIMING or (self.has_session(request) and request.user.is_staff)
+        return self.finish(request, response, total, timings, show_timing)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with metrics.collect() as timings:
+            response = await self.get_response(request)
+        total = time.perf_counter() - started
+        show_timing = settings.METRICS_SERVER_TIMING or (
+            self.has_session(request) and (await request.auser()).is_staff
+        )
+        return self.finish(request, response, total, timings, show_timing)
+
+    def has_session(self, request):
+        # Без cookie сессии посетитель точно не сотрудник: пользователя из базы не читаем
+        return hasattr(request, 'user') and settings.SESSION_COOKIE_NAME in request.COOKIES
+
+    def finish(self, request, response, total, timings, show_timing):
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        metrics.record(view, response.status_code, total, timings)
+        if show_timing:
+            response['Server-Timing'] = metrics.server_timing(total, timings)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Снимает статистический профиль выбранных запросов (core.profiling):
+    доли PROFILING_SAMPLE_RATE всех запросов, запросов дольше PROFILING_SLOW_MS
+    (среди доли PROFILING_SLOW_SAMPLE_RATE запросов) и запросов сотрудников
+    с заголовком PROFILING_HEADER. Включается PROFILING_ENABLED = True.
+    Стоит после AuthenticationMiddleware, чтобы проверить, что заголовок
+    прислал сотрудник.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def reason(self, request):
+        """Почему запрос профилируется: 'header', 'sample', 'slow' или None."""
+        if request.headers.get(settings.PROFILING_HEADER) and request.user.is_staff:
+            return 'header'
+        if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return 'sample'
+        # Медленный запрос видно только в конце, поэтому профилируется доля
+        # PROFILING_SLOW_SAMPLE_RATE запросов, а сохраняются лишь те, что превысили порог
+        if settings.PROFILING_SLOW_MS and random.random() < settings.PROFILING_SLOW_SAMPLE_RATE:
+            return 'slow'
+        return None
+
+    def __call__(self, request):
+        reason = self.reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with profiling.profile() as result:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        if result.samples and (reason != 'slow' or duration * 1000 >= settings.PROFILING_SLOW_MS):
+            match = request.resolver_match
+            view = match.view_name if match else '<unresolved>'
+            profiling.save(result, view, request, duration, response.status_code, reason)
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_alter_article_options_alter_category_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, editable=False, max_length=64, verbose_name="Хеш контента"
+            ),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="content_html",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="HTML-версия контента"
+            ),
+        ),
+        migrations.AddField(
+            model_name="page",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, editable=False, max_length=64, verbose_name="Хеш контента"
+            ),
+        ),
+        migrations.AddField(
+            model_name="page",
+            name="content_html",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="HTML-версия контента"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+# HTML и анонсы существующих статей заполняет команда rebuild_markdown
+# (а до ее запуска — Article.rendered_content при первом чтении).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_article_content_html_page_content_html"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="excerpt",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="Анонс (автоматически)"
+            ),
+        ),
+    ]
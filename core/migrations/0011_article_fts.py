@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:30
+
+from django.db import migrations
+
+# Имя таблицы зафиксировано здесь: миграция не зависит от core.search
+FTS_TABLE = "core_article_fts"
+
+
+def create_fts_table(apps, schema_editor):
+    """
+    Создает FTS5-таблицу (только SQLite). Существующие статьи индексирует
+    после migrate обработчик post_migrate (core.signals.fill_derived_data).
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        "USING fts5(title, content, tags, tokenize='unicode61 remove_diacritics 2')"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_article_excerpt"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
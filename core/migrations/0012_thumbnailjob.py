@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_article_fts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ThumbnailJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "model_label",
+                    models.CharField(max_length=100, verbose_name="Модель"),
+                ),
+                (
+                    "object_id",
+                    models.PositiveBigIntegerField(verbose_name="ID объекта"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(verbose_name="Поставлено в очередь"),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(default=0, verbose_name="Попыток"),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, verbose_name="Последняя ошибка"),
+                ),
+            ],
+            options={
+                "verbose_name": "Задание на миниатюры",
+                "verbose_name_plural": "Очередь миниатюр",
+                "ordering": ["created_at"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("model_label", "object_id"), name="unique_thumbnail_job"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Счетчики для существующих статей считает после migrate обработчик
+# post_migrate (core.signals.fill_derived_data).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_thumbnailjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="published_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Опубликованных статей"
+            ),
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="published_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Опубликованных статей"
+            ),
+        ),
+        migrations.CreateModel(
+            name="CategoryTagCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.category",
+                    ),
+                ),
+                (
+                    "tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="category_counts",
+                        to="core.tag",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("category", "tag"), name="unique_category_tag_count"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="TagCooccurrence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "related_tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cooccurrences",
+                        to="core.tag",
+                    ),
+                ),
+                (
+                    "tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.tag",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tag", "related_tag"), name="unique_tag_cooccurrence"
+                    )
+                ],
+            },
+        ),
+    ]
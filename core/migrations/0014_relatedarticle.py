@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Похожие статьи для существующих статей считает после migrate обработчик
+# post_migrate (core.signals.fill_derived_data).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_tag_counts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedArticle",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField(verbose_name="Позиция")),
+                ("score", models.FloatField(verbose_name="Сходство")),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_links",
+                        to="core.article",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_from",
+                        to="core.article",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["article", "rank"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("article", "rank"), name="unique_related_article_rank"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_article_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedArticleJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.PositiveBigIntegerField(
+                        unique=True, verbose_name="ID статьи"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(verbose_name="Поставлено в очередь"),
+                ),
+            ],
+            options={
+                "verbose_name": "Задание на похожие статьи",
+                "verbose_name_plural": "Очередь похожих статей",
+                "ordering": ["created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_relatedarticlejob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="thumbnails_source",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=255,
+                verbose_name="Миниатюры созданы для",
+            ),
+        ),
+        migrations.AddField(
+            model_name="service",
+            name="thumbnails_source",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=255,
+                verbose_name="Миниатюры созданы для",
+            ),
+        ),
+    ]
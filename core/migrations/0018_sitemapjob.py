@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_thumbnails_source"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SitemapJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("section", models.CharField(max_length=50, verbose_name="Раздел")),
+                (
+                    "object_id",
+                    models.PositiveBigIntegerField(
+                        blank=True,
+                        help_text="Пусто — раздел целиком.",
+                        null=True,
+                        verbose_name="ID объекта",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(verbose_name="Поставлено в очередь"),
+                ),
+            ],
+            options={
+                "verbose_name": "Задание на карту сайта",
+                "verbose_name_plural": "Очередь карты сайта",
+                "ordering": ["created_at"],
+            },
+        ),
+    ]
@@ -3,8 +3,58 @@
 from django.db import models
 from django.urls import reverse
 from django.contrib.auth.models import User
-from imagekit.models import ImageSpecField
-from imagekit.processors import ResizeToFill
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from .markup import markdown_hash, render_markdown, make_excerpt
+from .renditions import ImageRenditions
+
+
+class MarkdownContentModel(models.Model):
+    """
+    Абстрактная модель для объектов с Markdown-полем `content`.
+    Хранит готовый HTML, чтобы не рендерить Markdown на каждый запрос.
+    """
+    content_html = models.TextField("HTML-версия контента", blank=True, editable=False)
+    content_hash = models.CharField("Хеш контента", max_length=64, blank=True, editable=False)
+
+    # Поля, которые пересчитываются вместе с HTML
+    rendered_fields = ('content_html', 'content_hash')
+
+    class Meta:
+        abstract = True
+
+    def render_content(self, force=False):
+        """
+        Перерисовывает HTML, если контент (или настройки Markdown) изменились.
+        Возвращает True, если поля были обновлены.
+        """
+        content_hash = markdown_hash(self.content)
+        if not force and content_hash == self.content_hash:
+            return False
+        self.content_html = render_markdown(self.content)
+        self.content_hash = content_hash
+        return True
+
+    def save(self, *args, **kwargs):
+        self.render_content()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | set(self.rendered_fields)
+        super().save(*args, **kwargs)
+
+    @property
+    def rendered_content(self):
+        """
+        Готовый HTML для шаблона. Если объект попал в базу в обход save()
+        (loaddata, bulk-операции), HTML рендерится при первом чтении и сохраняется.
+        """
+        if self.render_content() and self.pk:
+            type(self)._default_manager.filter(pk=self.pk).update(
+                **{field: getattr(self, field) for field in self.rendered_fields}
+            )
+        return mark_safe(self.content_html)
+
 
 class Service(models.Model):
     title = models.CharField(max_length=200, verbose_name="Название услуги")
@@ -13,8 +63,11 @@ class Service(models.Model):
     short_description = models.TextField(verbose_name="Краткое описание (для карточки на главной)")
     full_description = models.TextField(verbose_name="Полное описание (для отдельной страницы)", blank=True)
     original_image = models.ImageField(upload_to='services/originals/', verbose_name="Изображение для услуги", help_text="Загрузите изображение. Оно будет автоматически обрезано и оптимизировано.", blank=True, null=True)
-    image_detail = ImageSpecField(source='original_image', processors=[ResizeToFill(800, 400)], format='WEBP', options={'quality': 85})
-    image_thumbnail = ImageSpecField(source='original_image', processors=[ResizeToFill(400, 200)], format='WEBP', options={'quality': 80})
+    # Варианты изображения для карточки на главной (сетка до 3 колонок) и страницы услуги (1/3 ширины)
+    card_image = ImageRenditions(source='original_image', ratio=(2, 1), widths=(320, 480, 640, 800), sizes="(min-width: 1024px) 384px, (min-width: 768px) 50vw, 100vw")
+    detail_image = ImageRenditions(source='original_image', ratio=(2, 1), widths=(480, 800, 1200), sizes="(min-width: 1024px) 33vw, 100vw")
+    # Имя original_image, для которого воркер уже создал все варианты (core.thumbnails)
+    thumbnails_source = models.CharField(max_length=255, blank=True, editable=False, verbose_name="Миниатюры созданы для")
     sort_order = models.PositiveIntegerField(default=0, verbose_name="Порядок сортировки", help_text="Чем меньше число, тем выше услуга в списке.")
     updated_date = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
     meta_title = models.CharField(max_length=255, verbose_name="SEO Заголовок (Title)", blank=True, help_text="Отображается во вкладке браузера и в заголовке поисковой выдачи. Оптимальная длина ~ 60 символов. Если пусто, используется название услуги.")
@@ -31,7 +84,7 @@ class Service(models.Model):
     def get_absolute_url(self):
         return reverse('service_detail', kwargs={'service_slug': self.slug})
 
-class Page(models.Model):
+class Page(MarkdownContentModel):
     TEMPLATE_CHOICES = [
         ("core/pages/default.html", "Универсальный шаблон"),
         ("core/pages/about.html", "О компании"),
@@ -65,6 +118,7 @@ class Page(models.Model):
 class Category(models.Model):
     name = models.CharField("Название категории", max_length=100, unique=True)
     slug = models.SlugField("URL (слаг)", max_length=100, unique=True, help_text="Используется в URL, например, /articles/category/network/")
+    published_count = models.PositiveIntegerField("Опубликованных статей", default=0, editable=False)
 
     class Meta:
         verbose_name = "Категория статей"
@@ -80,6 +134,7 @@ class Category(models.Model):
 class Tag(models.Model):
     name = models.CharField("Название тега", max_length=100, unique=True)
     slug = models.SlugField("URL (слаг)", max_length=100, unique=True, help_text="Используется в URL, например, /articles/tag/mikrotik/")
+    published_count = models.PositiveIntegerField("Опубликованных статей", default=0, editable=False)
 
     class Meta:
         verbose_name = "Тег"
@@ -92,7 +147,28 @@ class Tag(models.Model):
     def get_absolute_url(self):
         return reverse('article_tag', kwargs={'tag_slug': self.slug})
 
-class Article(models.Model):
+class ArticleQuerySet(models.QuerySet):
+    """Общие построители запросов для статей: одни и те же во views и sitemaps."""
+
+    # Колонки, которые нужны карточке статьи в списках
+    LIST_FIELDS = (
+        'title', 'slug', 'excerpt', 'published_date',
+        'category', 'category__name', 'category__slug',
+    )
+
+    def published(self):
+        return self.filter(is_published=True)
+
+    def for_list(self):
+        """Для списков: только нужные колонки и категория одним JOIN."""
+        return self.select_related('category').only(*self.LIST_FIELDS)
+
+    def for_detail(self):
+        """Для детальной страницы: автор и категория через JOIN, теги одним запросом."""
+        return self.select_related('author', 'category').prefetch_related('tags')
+
+
+class Article(MarkdownContentModel):
     title = models.CharField("Заголовок статьи", max_length=200)
     slug = models.SlugField("URL (слаг)", max_length=200, unique=True)
     content = models.TextField("Содержимое статьи", help_text="Поддерживается Markdown.")
@@ -103,17 +179,168 @@ class Article(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="posts", verbose_name="Категория")
     tags = models.ManyToManyField(Tag, blank=True, related_name="posts", verbose_name="Теги")
     original_image = models.ImageField("Изображение для статьи", upload_to='articles/originals/', blank=True, null=True)
-    image_thumbnail = ImageSpecField(source='original_image', processors=[ResizeToFill(400, 250)], format='WEBP', options={'quality': 80})
+    card_image = ImageRenditions(source='original_image', ratio=(8, 5), widths=(320, 480, 800), sizes="(min-width: 768px) 400px, 100vw")
+    thumbnails_source = models.CharField("Миниатюры созданы для", max_length=255, blank=True, editable=False)
     meta_title = models.CharField("SEO Заголовок (Title)", max_length=200, blank=True)
     meta_description = models.TextField("SEO Описание (Description)", blank=True)
+    excerpt = models.TextField("Анонс (автоматически)", blank=True, editable=False)
+
+    objects = ArticleQuerySet.as_manager()
+
+    rendered_fields = MarkdownContentModel.rendered_fields + ('excerpt',)
 
     class Meta:
         verbose_name = "Статью"
         verbose_name_plural = "Статьи"
         ordering = ['-published_date']
+        # Частичные индексы под публичные выборки: только опубликованные статьи
+        # в порядке ленты (списки, курсорная пагинация), по категории и по дате
+        # изменения (sitemap, Last-Modified). Проверяются тестом QueryPlanTests.
+        indexes = [
+            models.Index(
+                fields=['-published_date', '-id'],
+                condition=models.Q(is_published=True),
+                name='article_published_feed_idx',
+            ),
+            models.Index(
+                fields=['category', '-published_date', '-id'],
+                condition=models.Q(is_published=True),
+                name='article_category_feed_idx',
+            ),
+            models.Index(
+                fields=['-updated_date'],
+                condition=models.Q(is_published=True),
+                name='article_published_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def render_content(self, force=False):
+        """Вместе с HTML пересчитывает текстовый анонс для списков и поиска."""
+        if not super().render_content(force=force):
+            return False
+        self.excerpt = make_excerpt(self.content_html)
+        return True
+
+    @property
+    def seo_description(self):
+        """Описание для мета-тегов: SEO-поле или короткий анонс статьи."""
+        return self.meta_description or Truncator(self.excerpt).words(25, truncate=' …')
+
     def get_absolute_url(self):
-        return reverse('article_detail', kwargs={'post_slug': self.slug})
\ No newline at end of file
+        return reverse('article_detail', kwargs={'post_slug': self.slug})
+
+class RelatedArticle(models.Model):
+    """
+    Заранее посчитанные похожие статьи (core.similarity): для каждой
+    опубликованной статьи — несколько ближайших по TF-IDF соседей.
+    """
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='related_from')
+    rank = models.PositiveSmallIntegerField("Позиция")
+    score = models.FloatField("Сходство")
+
+    class Meta:
+        ordering = ['article', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'rank'], name='unique_related_article_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} -> {self.related_id} ({self.score:.3f})"
+
+
+class RelatedArticleJob(models.Model):
+    """
+    Статья, для которой нужно пересчитать похожие статьи (core.similarity).
+    Создается в транзакции сохранения статьи, выполняется командой
+    process_related_jobs. Удаленная статья остается в очереди по id.
+    """
+    object_id = models.PositiveBigIntegerField("ID статьи", unique=True)
+    created_at = models.DateTimeField("Поставлено в очередь")
+
+    class Meta:
+        verbose_name = "Задание на похожие статьи"
+        verbose_name_plural = "Очередь похожих статей"
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Статья #{self.object_id}"
+
+
+class SitemapJob(models.Model):
+    """
+    Изменение, после которого нужно пересобрать раздел карты сайта
+    (core.sitemap_files). Создается в транзакции сохранения объекта,
+    выполняется командой process_sitemap_jobs.
+    """
+    section = models.CharField("Раздел", max_length=50)
+    object_id = models.PositiveBigIntegerField("ID объекта", null=True, blank=True, help_text="Пусто — раздел целиком.")
+    created_at = models.DateTimeField("Поставлено в очередь")
+
+    class Meta:
+        verbose_name = "Задание на карту сайта"
+        verbose_name_plural = "Очередь карты сайта"
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.section} #{self.object_id}" if self.object_id else f"{self.section} целиком"
+
+
+class TagCooccurrence(models.Model):
+    """
+    Сколько опубликованных статей с тегом `tag` имеют также тег `related_tag`.
+    Пара (tag, tag) тоже хранится: ее счетчик равен числу статей с тегом.
+    Поддерживается сигналами (core.tag_stats).
+    """
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='+')
+    related_tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='cooccurrences')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'related_tag'], name='unique_tag_cooccurrence'),
+        ]
+
+    def __str__(self):
+        return f"{self.tag_id} + {self.related_tag_id}: {self.count}"
+
+
+class CategoryTagCount(models.Model):
+    """Сколько опубликованных статей категории имеют тег. Поддерживается сигналами."""
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='category_counts')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'tag'], name='unique_category_tag_count'),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id} + {self.tag_id}: {self.count}"
+
+
+class ThumbnailJob(models.Model):
+    """
+    Задание на генерацию миниатюр (ImageSpecField) для одного объекта.
+    Создается при смене original_image, выполняется командой process_thumbnail_jobs.
+    """
+    model_label = models.CharField("Модель", max_length=100)
+    object_id = models.PositiveBigIntegerField("ID объекта")
+    created_at = models.DateTimeField("Поставлено в очередь")
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+
+    class Meta:
+        verbose_name = "Задание на миниатюры"
+        verbose_name_plural = "Очередь миниатюр"
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['model_label', 'object_id'], name='unique_thumbnail_job'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label} #{self.object_id}"
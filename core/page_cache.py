@@ -0,0 +1,143 @@
+# Path: core/page_cache.py
+
+"""
+Кеш целых ответов публичных страниц для анонимных посетителей.
+
+Ключ строится из адреса страницы, значимых GET-параметров (?q=, ?page=,
+?cursor=), варианта htmx-запроса (X-Requested-With) и версий моделей, от
+которых зависит страница. Сигналы моделей увеличивают версии
+(core.cache_versions), поэтому после правки в админке старые ответы просто
+перестают находиться. Отдача из кеша не трогает ни шаблоны, ни базу.
+"""
+
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+from . import cache_versions
+
+# GET-параметры, которые меняют содержимое страницы. Остальные (utm_* и т.п.) игнорируются.
+VARY_PARAMS = ('q', 'page', 'cursor')
+
+# От сайта (домен в ссылках и OpenGraph) зависит каждая страница, а версия
+# 'replica' меняется при обновлении снимка базы для чтения (core.db_routers)
+COMMON_NAMESPACES = ('site', 'replica')
+
+
+def is_htmx(request):
+    return request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+
+def is_cacheable_request(request):
+    """Кешируем только GET/HEAD от посетителей без сессии (анонимных)."""
+    if not settings.PAGE_CACHE_ENABLED:
+        return False
+    # Экспорт страниц (core.prerender) рендерит их заново и кеш не заполняет
+    if getattr(request, 'bypass_page_cache', False):
+        return False
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Проверяем cookie, а не request.user: так не нужен запрос к таблице сессий
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+def request_key(request):
+    """Нормализованный ключ запроса: адрес, значимые параметры и вариант htmx."""
+    params = '&'.join(
+        f'{name}={request.GET[name]}' for name in VARY_PARAMS if name in request.GET
+    )
+    variant = 'htmx' if is_htmx(request) else 'full'
+    return f'{request.build_absolute_uri(request.path)}?{params}#{variant}'
+
+
+def cache_key(request, namespaces, versions=None):
+    """Ключ ответа в кеше; versions можно передать готовыми (async-views получают их сами)."""
+    if versions is None:
+        versions = cache_versions.get_versions(*COMMON_NAMESPACES, *namespaces)
+    raw = f'{request_key(request)}|{versions}'
+    return 'page:' + hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def cached_response(request, response):
+    """Ответ из кеша с учетом If-None-Match / If-Modified-Since (может стать 304)."""
+    # Сохраненный ответ уже содержит ETag/Last-Modified (core.conditional)
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(response.get('Last-Modified')),
+        response=response,
+    )
+
+
+def is_cacheable_response(response):
+    return response.status_code == 200 and not response.streaming and not response.cookies
+
+
+def _store_later(cache, key, response):
+    """
+    Помечает ответ для кеша. TemplateResponse кладется после рендеринга
+    (колбэком); для остальных возвращает True — положить сразу.
+    """
+    patch_vary_headers(response, ('X-Requested-With',))
+    if not is_cacheable_response(response):
+        return False
+    if hasattr(response, 'render') and callable(response.render):
+        timeout = settings.PAGE_CACHE_TIMEOUT
+        response.add_post_render_callback(lambda r: cache.set(key, r, timeout))
+        return False
+    return True
+
+
+def cache_public_page(*namespaces):
+    """
+    Декоратор view (синхронной или async): кеширует ответ, пока не изменились
+    модели из namespaces ('articles', 'services', ...). Для async-view версии
+    и ответ читаются async API кеша, а кеш в памяти процесса — напрямую
+    (cache_versions.is_in_memory).
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not is_cacheable_request(request):
+                    return await view_func(request, *args, **kwargs)
+
+                cache = caches['pages']
+                in_memory = cache_versions.is_in_memory('pages')
+                versions = await cache_versions.aget_versions(*COMMON_NAMESPACES, *namespaces)
+                key = cache_key(request, namespaces, versions)
+                response = cache.get(key) if in_memory else await cache.aget(key)
+                if response is not None:
+                    return cached_response(request, response)
+
+                response = await view_func(request, *args, **kwargs)
+                if _store_later(cache, key, response):
+                    if in_memory:
+                        cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+                    else:
+                        await cache.aset(key, response, settings.PAGE_CACHE_TIMEOUT)
+                return response
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            cache = caches['pages']
+            key = cache_key(request, namespaces)
+            response = cache.get(key)
+            if response is not None:
+                return cached_response(request, response)
+
+            response = view_func(request, *args, **kwargs)
+            if _store_later(cache, key, response):
+                cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,97 @@
+# Path: core/pagination.py
+
+"""
+Курсорная (keyset) пагинация для списков статей.
+
+Вместо COUNT(*) и OFFSET следующая страница выбирается условием
+"(published_date, id) меньше, чем у последней показанной статьи", поэтому
+каждая страница стоит одинаково независимо от глубины прокрутки.
+Курсор для клиента непрозрачен: это base64 от даты и id последней статьи.
+"""
+
+import base64
+import binascii
+import hashlib
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import cache_versions
+
+# Порядок, на котором держится курсор: дата публикации + id для уникальности
+CURSOR_ORDERING = ('-published_date', '-pk')
+
+
+def encode_cursor(article):
+    raw = f'{article.published_date.isoformat()}|{article.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (published_date, pk) или None, если курсор пустой или поврежден."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(published), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """
+    Страница курсорной пагинации. Повторяет ту часть интерфейса Page,
+    которой пользуются шаблоны: перебор объектов и has_next.
+    """
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def paginate_by_cursor(queryset, cursor, per_page):
+    """Возвращает страницу статей после позиции cursor (или первую страницу)."""
+    queryset = queryset.order_by(*CURSOR_ORDERING)
+    position = decode_cursor(cursor)
+    if position is not None:
+        published, pk = position
+        queryset = queryset.filter(
+            Q(published_date__lt=published) | Q(published_date=published, pk__lt=pk)
+        )
+    # Берем на одну статью больше, чтобы узнать, есть ли следующая страница
+    items = list(queryset[:per_page + 1])
+    next_cursor = encode_cursor(items[per_page - 1]) if len(items) > per_page else None
+    return KeysetPage(items[:per_page], next_cursor)
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Номерная пагинация, которая не считает COUNT(*) на каждый запрос:
+    число объектов хранится в кеше, пока не изменились статьи (версия 'articles').
+    COUNT по всем опубликованным статьям — всегда полный проход по индексу.
+    """
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        raw = f'{self.object_list.query}|{cache_versions.get_version("articles")}'
+        key = 'count:' + hashlib.md5(raw.encode('utf-8')).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count)
+        return count
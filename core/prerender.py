@@ -0,0 +1,276 @@
+# Path: core/prerender.py
+
+"""
+Экспорт публичных страниц в статические файлы (команда prerender).
+
+Адреса берутся из классов Sitemap (core.sitemaps): для каждого маршрута
+core/urls.py в ROUTE_SOURCES указан раздел, который перечисляет его
+страницы. Каждая страница проходит ту же цепочку middleware и views, что
+и запрос к WSGI-серверу (PageRenderer), и записывается как <адрес>/index.html
+вместе со сжатыми копиями
+.gz и .br (если установлен пакет brotli). Рядом кладутся файлы карты
+сайта (core.sitemap_files). После экспорта nginx может отдавать сайт
+без Python: запросы с параметрами (?page, ?cursor, ?q) по-прежнему
+идут в Django.
+
+В manifest.json для каждого адреса хранится отпечаток: lastmod из Sitemap
+и версии данных, от которых страница зависит помимо своего объекта
+(SECTION_DEPENDENCIES): списки — от набора опубликованных статей и тегов
+с категориями, статья — от названий тегов и категорий и своих похожих
+статей. Повторный экспорт рендерит только страницы с новым отпечатком и
+удаляет пропавшие из карты сайта. Если поменялось то, что есть на каждой
+странице (сайт, навигация, контакты), пересобирается все.
+"""
+
+import gzip
+import hashlib
+import json
+import shutil
+import sys
+from collections import defaultdict
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import unquote_to_bytes
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+
+from . import sitemap_files
+from .files import write_file
+from .models import Article, Category, RelatedArticle, Tag
+from .sitemaps import SITEMAPS, CategorySitemap, TagSitemap
+from .urls import urlpatterns
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_FILE = 'manifest.json'
+
+# Разделы, из которых берутся адреса страниц
+PRERENDER_SITEMAPS = {**SITEMAPS, 'categories': CategorySitemap, 'tags': TagSitemap}
+
+# Маршрут core/urls.py -> раздел, который перечисляет его страницы
+ROUTE_SOURCES = {
+    'home': 'static',
+    'article_list': 'static',
+    'service_detail': 'services',
+    'article_detail': 'articles',
+    'article_category': 'categories',
+    'article_tag': 'tags',
+    'page_view': 'pages',
+}
+
+# Раздел -> данные, от которых зависят его страницы помимо lastmod (dependency_signatures).
+# Списки показывают статьи и облако тегов со счетчиками; статья — названия
+# своих тегов и категории и блок похожих статей. Главная попадает в 'static'
+# вместе со списком статей и пересобирается с ним — это одна страница.
+SECTION_DEPENDENCIES = {
+    'static': ('articles', 'taxonomy'),
+    'categories': ('articles', 'taxonomy'),
+    'tags': ('articles', 'taxonomy'),
+    'articles': ('names', 'related'),
+}
+
+# Маршруты, ответ которых зависит от параметров запроса: не экспортируются
+DYNAMIC_ROUTES = ('api_v1_article_search',)
+
+
+def uncovered_routes():
+    """Маршруты core/urls.py, для которых не указан источник адресов."""
+    return [
+        pattern.name for pattern in urlpatterns
+        if pattern.name not in ROUTE_SOURCES and pattern.name not in DYNAMIC_ROUTES
+    ]
+
+
+def _digest(rows):
+    return hashlib.md5(repr(list(rows)).encode('utf-8')).hexdigest()
+
+
+def dependency_signatures():
+    """
+    Отпечатки данных из SECTION_DEPENDENCIES. Значение — строка (общая для
+    всех страниц раздела) или словарь {id объекта: строка}.
+    """
+    related = defaultdict(list)
+    links = (
+        RelatedArticle.objects.filter(related__is_published=True)
+        .order_by('article_id', 'rank')
+        .values_list('article_id', 'related_id', 'related__updated_date')
+    )
+    for article_id, related_id, updated_date in links:
+        related[article_id].append((related_id, updated_date))
+    return {
+        # Публикация, снятие с публикации и удаление меняют списки,
+        # даже если самая свежая updated_date среди опубликованных осталась прежней
+        'articles': _digest(Article.objects.published().order_by('pk').values_list('pk', flat=True)),
+        'taxonomy': _digest([
+            *Category.objects.order_by('pk').values_list('pk', 'name', 'slug', 'published_count'),
+            *Tag.objects.order_by('pk').values_list('pk', 'name', 'slug', 'published_count'),
+        ]),
+        'names': _digest([
+            *Category.objects.order_by('pk').values_list('pk', 'name', 'slug'),
+            *Tag.objects.order_by('pk').values_list('pk', 'name', 'slug'),
+        ]),
+        'related': {article_id: _digest(rows) for article_id, rows in related.items()},
+    }
+
+
+def collect_urls(dependencies=None):
+    """Все экспортируемые адреса: {путь: отпечаток страницы (lastmod и зависимости)}."""
+    if dependencies is None:
+        dependencies = dependency_signatures()
+    urls = {}
+    for section in dict.fromkeys(ROUTE_SOURCES.values()):
+        sitemap = PRERENDER_SITEMAPS[section]()
+        for item in sitemap.items():
+            lastmod = sitemap_files.item_value(sitemap, 'lastmod', item)
+            parts = [lastmod.isoformat() if lastmod else '']
+            for name in SECTION_DEPENDENCIES.get(section, ()):
+                value = dependencies[name]
+                if isinstance(value, dict):
+                    value = value.get(getattr(item, 'pk', None), '')
+                parts.append(value)
+            # Один адрес может прийти из двух разделов (страница со slug 'home')
+            urls.setdefault(sitemap_files.item_value(sitemap, 'location', item), '|'.join(parts))
+    return urls
+
+
+def layout_signature():
+    """Отпечаток общих для всех страниц данных: сайт и контакты."""
+    site = Site.objects.get_current()
+    raw = f"{site.domain}|{site.name}|{sorted(settings.SITE_CONTACTS.items())}"
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+class _ExportRequest(WSGIRequest):
+    # Домен берется из настроек сайта, а не из заголовка клиента: проверка
+    # по ALLOWED_HOSTS (защита от подмены Host) экспорту не нужна
+    def get_host(self):
+        return self.META['HTTP_HOST']
+
+
+class PageRenderer(BaseHandler):
+    """
+    Рендерит страницы без сервера: запрос собирается прямо из адреса и
+    проходит обычную цепочку middleware, как в WSGIHandler. Настройки не
+    подменяются, поэтому экспорт можно запускать и рядом с работающим сайтом.
+    """
+
+    def __init__(self, domain, secure=False):
+        super().__init__()
+        self.load_middleware()
+        self.domain = domain
+        self.secure = secure
+
+    def build_request(self, url):
+        request = _ExportRequest({
+            'REQUEST_METHOD': 'GET',
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote_to_bytes(url).decode('iso-8859-1'),
+            'QUERY_STRING': '',
+            'HTTP_HOST': self.domain,
+            'SERVER_NAME': self.domain.partition(':')[0],
+            'SERVER_PORT': '443' if self.secure else '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.url_scheme': 'https' if self.secure else 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': sys.stderr,
+        })
+        # Анонимный посетитель, мимо кеша страниц
+        request.bypass_page_cache = True
+        return request
+
+    def render(self, url):
+        """Ответ view для адреса (с уже отрисованным содержимым)."""
+        response = self.get_response(self.build_request(url))
+        response.close()
+        return response
+
+
+def output_path(directory, url):
+    return directory / url.strip('/') / 'index.html'
+
+
+def _write_variants(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_file(path, content)
+    write_file(path.with_name(path.name + '.gz'), gzip.compress(content, 9, mtime=0))
+    if brotli is not None:
+        write_file(path.with_name(path.name + '.br'), brotli.compress(content))
+
+
+def _remove_variants(directory, path):
+    for suffix in ('', '.gz', '.br'):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+    # Пустые каталоги статьи/тега тоже удаляем
+    parent = path.parent
+    while parent != directory and parent.is_dir() and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+def _read_manifest(directory):
+    try:
+        return json.loads((directory / MANIFEST_FILE).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def export(directory=None, full=False):
+    """
+    Экспортирует страницы в directory. Возвращает статистику:
+    {'rendered': ..., 'skipped': ..., 'removed': ..., 'errors': [(адрес, статус)]}.
+    """
+    directory = Path(directory or settings.PRERENDER_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(directory)
+    signature = layout_signature()
+    if manifest.get('layout') != signature:
+        full = True
+    old_urls = manifest.get('urls', {})
+    urls = collect_urls()
+
+    stats = {'rendered': 0, 'skipped': 0, 'removed': 0, 'errors': []}
+    exported = {}
+    # Рендерим на боевом домене: он попадает в канонические ссылки и OpenGraph
+    renderer = PageRenderer(Site.objects.get_current().domain, secure=settings.SITEMAP_PROTOCOL == 'https')
+    for url, fingerprint in urls.items():
+        path = output_path(directory, url)
+        if not full and url in old_urls and old_urls[url] == fingerprint and path.exists():
+            exported[url] = fingerprint
+            stats['skipped'] += 1
+            continue
+        response = renderer.render(url)
+        if response.status_code != 200:
+            # Устаревшую копию не оставляем: адрес уйдет в Django
+            _remove_variants(directory, path)
+            stats['errors'].append((url, response.status_code))
+            continue
+        _write_variants(path, response.content)
+        exported[url] = fingerprint
+        stats['rendered'] += 1
+
+    # Снятые с публикации и удаленные объекты, опустевшие категории и теги
+    for url in old_urls.keys() - urls.keys():
+        _remove_variants(directory, output_path(directory, url))
+        stats['removed'] += 1
+
+    # Карта сайта уже собрана в файлы: копируем ее как есть
+    sitemap_files.ensure_built()
+    sources = {source.name: source for source in Path(settings.SITEMAP_DIR).glob('sitemap*.xml*')}
+    for target in directory.glob('sitemap*.xml*'):
+        if target.name not in sources:
+            target.unlink()
+    for name, source in sources.items():
+        shutil.copy2(source, directory / name)
+
+    manifest = {'layout': signature, 'urls': exported}
+    write_file(
+        directory / MANIFEST_FILE, json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8')
+    )
+    return stats
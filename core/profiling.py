@@ -0,0 +1,223 @@
+# Path: core/profiling.py
+
+"""
+Статистический профайлер запросов (ProfilingMiddleware в core.middleware).
+
+Один фоновый поток раз в PROFILING_INTERVAL_MS миллисекунд снимает стеки
+потоков, которые сейчас обрабатывают профилируемые запросы
+(sys._current_frames), и считает, сколько раз встретился каждый стек.
+Сам запрос при этом не замедляется: нет ни трассировки каждого вызова, ни
+sys.setprofile. Пока профилируемых запросов нет, поток спит.
+
+Снятый профиль сохраняется в PROFILING_DIR/<имя маршрута>/ тремя файлами:
+  <имя>.txt             — collapsed stacks (flamegraph.pl, speedscope, inferno);
+  <имя>.speedscope.json — формат https://www.speedscope.app;
+  <имя>.meta.json       — адрес, время ответа, причина записи (для админки).
+Для каждого маршрута хранится не больше PROFILING_KEEP последних профилей.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+from .files import write_file
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+# Расширения файлов одного профиля
+SUFFIXES = ('.txt', '.speedscope.json', '.meta.json')
+
+
+class Profile:
+    """Стеки одного запроса: кортеж code-объектов от корня к листу -> число снимков."""
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.samples = 0
+
+    def add(self, frame):
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+
+class Sampler(threading.Thread):
+    """Фоновый поток, который снимает стеки зарегистрированных потоков."""
+
+    def __init__(self, interval):
+        super().__init__(name='request-profiler', daemon=True)
+        self.interval = interval
+        self.profiles = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+
+    def register(self, thread_id, profile):
+        with self.lock:
+            self.profiles[thread_id] = profile
+        self.wake.set()
+
+    def unregister(self, thread_id):
+        with self.lock:
+            self.profiles.pop(thread_id, None)
+
+    def run(self):
+        while True:
+            with self.lock:
+                active = list(self.profiles.items())
+            if not active:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            frames = sys._current_frames()
+            for thread_id, profile in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    profile.add(frame)
+            del frames
+            time.sleep(self.interval)
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = Sampler(settings.PROFILING_INTERVAL_MS / 1000)
+            _sampler.start()
+    return _sampler
+
+
+@contextmanager
+def profile():
+    """Профилирует текущий поток на время блока; возвращает Profile."""
+    sampler = get_sampler()
+    thread_id = threading.get_ident()
+    result = Profile()
+    sampler.register(thread_id, result)
+    try:
+        yield result
+    finally:
+        sampler.unregister(thread_id)
+
+
+# --- Сохранение ---
+
+def _frame_name(code, prefixes):
+    filename = code.co_filename
+    for prefix in prefixes:
+        if filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1:]
+            break
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+
+def collapsed(result):
+    """Текст в формате collapsed stacks: 'корень;...;лист число'."""
+    # Пути файлов укорачиваются до пути внутри проекта или site-packages
+    prefixes = [str(settings.BASE_DIR), *sorted(filter(None, sys.path), key=len, reverse=True)]
+    return '\n'.join(
+        ';'.join(_frame_name(code, prefixes) for code in stack) + f' {count}'
+        for stack, count in result.stacks.most_common()
+    ) + '\n'
+
+
+def speedscope(result, name, duration):
+    """Профиль в формате speedscope (sampled, веса в миллисекундах)."""
+    frames, index = [], {}
+    samples, weights = [], []
+    interval = settings.PROFILING_INTERVAL_MS
+    for stack, count in result.stacks.most_common():
+        sample = []
+        for code in stack:
+            if code not in index:
+                index[code] = len(frames)
+                frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+            sample.append(index[code])
+        samples.append(sample)
+        weights.append(count * interval)
+    return {
+        '$schema': SPEEDSCOPE_SCHEMA,
+        'name': name,
+        'exporter': 'core.profiling',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': round(duration * 1000, 1),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
+
+
+def _view_directory(view):
+    return re.sub(r'[^\w.-]', '_', view)
+
+
+def save(result, view, request, duration, status, reason):
+    """Записывает профиль запроса в PROFILING_DIR и удаляет старые профили маршрута."""
+    directory = Path(settings.PROFILING_DIR) / _view_directory(view)
+    directory.mkdir(parents=True, exist_ok=True)
+    now = datetime.now()
+    base = f'{now:%Y%m%d-%H%M%S-%f}-{os.getpid()}'
+    name = f'{request.method} {request.get_full_path()} ({duration * 1000:.0f} мс)'
+    meta = {
+        'view': view,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': status,
+        'duration_ms': round(duration * 1000, 1),
+        'samples': result.samples,
+        'reason': reason,
+        'created': now.isoformat(timespec='seconds'),
+    }
+    write_file(directory / f'{base}.txt', collapsed(result).encode('utf-8'))
+    write_file(
+        directory / f'{base}.speedscope.json',
+        json.dumps(speedscope(result, name, duration), ensure_ascii=False).encode('utf-8'),
+    )
+    # meta.json пишется последним: админка видит только полностью записанные профили
+    write_file(directory / f'{base}.meta.json', json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+    _prune(directory)
+
+
+def _prune(directory):
+    captures = sorted(directory.glob('*.meta.json'))
+    for meta in captures[:-settings.PROFILING_KEEP]:
+        base = meta.name[:-len('.meta.json')]
+        for suffix in SUFFIXES:
+            (directory / f'{base}{suffix}').unlink(missing_ok=True)
+
+
+def captured(limit=100):
+    """Сохраненные профили, самые медленные первыми; к каждому добавлены пути файлов."""
+    profiles = []
+    for path in Path(settings.PROFILING_DIR).glob('*/*.meta.json'):
+        try:
+            meta = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            # Профиль мог быть удален между glob и чтением
+            continue
+        base = f'{path.parent.name}/{path.name[:-len(".meta.json")]}'
+        meta['collapsed_file'] = f'{base}.txt'
+        meta['speedscope_file'] = f'{base}.speedscope.json'
+        profiles.append(meta)
+    profiles.sort(key=lambda meta: meta['duration_ms'], reverse=True)
+    return profiles[:limit]
@@ -0,0 +1,123 @@
+# Path: core/renditions.py
+
+"""
+Адаптивные изображения: несколько ширин и форматов (AVIF, WEBP, JPEG)
+для одного original_image.
+
+Набор вариантов объявляется в модели одной строкой:
+
+    card_image = ImageRenditions(source='original_image', ratio=(2, 1),
+                                 widths=(320, 640), sizes='100vw')
+
+Для каждой пары ширина × формат создается обычный ImageSpecField
+(card_image_320_avif, ...), поэтому варианты генерируются той же очередью
+миниатюр (core.thumbnails), что и остальные спецификации. Тег {% picture %}
+из image_tags выводит <picture> с srcset/sizes и размерами width/height,
+которые известны заранее из пропорций — без чтения файлов.
+"""
+
+from imagekit.models import ImageSpecField
+from imagekit.processors import ResizeToFill
+
+# Форматы в порядке предпочтения: браузер берет первый поддерживаемый.
+# Последний формат — запасной, он же попадает в <img>.
+FORMATS = (
+    ('AVIF', 'image/avif', {'quality': 55}),
+    ('WEBP', 'image/webp', {'quality': 80}),
+    ('JPEG', 'image/jpeg', {'quality': 82, 'progressive': True}),
+)
+
+# Поле модели с именем источника, для которого варианты уже созданы
+GENERATED_FIELD = 'thumbnails_source'
+
+class ImageRenditions:
+    """Объявление набора вариантов изображения для модели."""
+
+    def __init__(self, source, ratio, widths, sizes):
+        self.source = source
+        self.ratio = ratio
+        self.widths = tuple(sorted(widths))
+        self.sizes = sizes
+
+    def height_for(self, width):
+        ratio_width, ratio_height = self.ratio
+        return round(width * ratio_height / ratio_width)
+
+    def contribute_to_class(self, cls, name):
+        self.name = name
+        self.variants = {}
+        for image_format, mime_type, options in FORMATS:
+            for width in self.widths:
+                attname = f'{name}_{width}_{image_format.lower()}'
+                field = ImageSpecField(
+                    source=self.source,
+                    processors=[ResizeToFill(width, self.height_for(width))],
+                    format=image_format,
+                    options=options,
+                )
+                field.contribute_to_class(cls, attname)
+                self.variants.setdefault(mime_type, []).append((width, attname))
+        setattr(cls, name, self)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return BoundRenditions(self, instance)
+
+
+class BoundRenditions:
+    """Набор вариантов для конкретного объекта (то, что видит шаблон)."""
+
+    def __init__(self, renditions, instance):
+        self.renditions = renditions
+        self.instance = instance
+
+    def __bool__(self):
+        return bool(getattr(self.instance, self.renditions.source))
+
+    @property
+    def sizes(self):
+        return self.renditions.sizes
+
+    @property
+    def width(self):
+        return self.renditions.widths[-1]
+
+    @property
+    def height(self):
+        return self.renditions.height_for(self.width)
+
+    def srcset(self, mime_type):
+        return ', '.join(
+            f'{getattr(self.instance, attname).url} {width}w'
+            for width, attname in self.renditions.variants[mime_type]
+        )
+
+    def sources(self):
+        """Пары (MIME-тип, srcset) для <source>, без запасного формата."""
+        return [(mime_type, self.srcset(mime_type)) for _, mime_type, _ in FORMATS[:-1]]
+
+    @property
+    def fallback_srcset(self):
+        return self.srcset(FORMATS[-1][1])
+
+    @property
+    def is_generated(self):
+        """
+        Созданы ли файлы вариантов. Воркер миниатюр (core.thumbnails)
+        записывает в поле GENERATED_FIELD имя источника, для которого создал
+        все варианты; пока оно не совпадает с текущим original_image (сразу
+        после загрузки, до первого прохода воркера), шаблон выводит оригинал.
+        Хранилище при рендере не опрашивается.
+        """
+        source = getattr(self.instance, self.renditions.source)
+        return getattr(self.instance, GENERATED_FIELD, '') == source.name
+
+    @property
+    def original_url(self):
+        return getattr(self.instance, self.renditions.source).url
+
+    @property
+    def fallback_url(self):
+        _, attname = self.renditions.variants[FORMATS[-1][1]][-1]
+        return getattr(self.instance, attname).url
@@ -0,0 +1,311 @@
+# Path: core/search.py
+
+"""
+Полнотекстовый поиск по статьям на базе SQLite FTS5.
+
+В индекс попадают только опубликованные статьи. Текст перед индексацией
+проходит через русский стеммер (упрощенный Snowball), поэтому запрос
+"настройки сетей" находит статьи про "настройку сети". Запрос пользователя
+никогда не передается в FTS как есть: каждое слово экранируется, поэтому
+синтаксические ошибки и "тяжелые" шаблоны невозможны.
+"""
+
+import re
+
+from django.db import connection, connections, router
+from django.db.models import Q
+from django.utils.html import strip_tags
+
+FTS_TABLE = 'core_article_fts'
+
+# Вес колонок для bm25: совпадение в заголовке важнее совпадения в тексте
+BM25_WEIGHTS = {'title': 10.0, 'content': 1.0, 'tags': 5.0}
+
+# Максимум результатов, которые отдает поиск для пагинации
+SEARCH_RESULTS_LIMIT = 500
+
+STOP_WORDS = frozenset("""
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы
+по только ее мне было вот от меня еще нет о из ему теперь когда даже ну вдруг
+ли если уже или ни быть был него до вас нибудь опять уж вам ведь там потом
+себя ничего ей может они тут где есть надо ней для мы тебя их чем была сам
+чтоб без будто чего раз тоже себе под будет ж тогда кто этот того потому этого
+какой совсем ним здесь этом один почти мой тем чтобы нее сейчас были куда
+зачем всех никогда можно при наконец два об другой хоть после над больше тот
+через эти нас про всего них какая много разве три эту моя впрочем хорошо свою
+этой перед иногда лучше чуть том нельзя такой им более всегда конечно всю
+между это как также
+""".split())
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_CYRILLIC_RE = re.compile(r'[а-я]')
+
+# --- Русский стеммер (по мотивам алгоритма Snowball) ---
+
+_VOWELS = 'аеиоуыэюя'
+
+
+def _endings(*groups):
+    """
+    Собирает окончания в список пар (окончание, нужна_ли_а_я_перед_ним),
+    отсортированный по убыванию длины: Snowball всегда берет самое длинное.
+    """
+    pairs = []
+    for words, needs_a in groups:
+        pairs.extend((word, needs_a) for word in words.split())
+    return sorted(pairs, key=lambda pair: len(pair[0]), reverse=True)
+
+
+_PERFECTIVE_GERUND = _endings(
+    ('в вши вшись', True),
+    ('ив ивши ившись ыв ывши ывшись', False),
+)
+_REFLEXIVE = _endings(('ся сь', False))
+_ADJECTIVE = _endings((
+    'ее ие ые ое ими ыми ей ий ый ой ем им ым ом его ого ему ому их ых ую юю '
+    'ая яя ою ею', False,
+))
+_PARTICIPLE = _endings(
+    ('ем нн вш ющ щ', True),
+    ('ивш ывш ующ', False),
+)
+_VERB = _endings(
+    ('ла на ете йте ли й л ем н ло но ет ют ны ть ешь нно', True),
+    ('ила ыла ена ейте уйте ите или ыли ей уй ил ыл им ым ен ило ыло ено ят '
+     'ует уют ит ыт ены ить ыть ишь ую ю', False),
+)
+_NOUN = _endings((
+    'а ев ов ие ье е иями ями ами еи ии и ией ей ой ий й иям ям ием ем ам ом '
+    'о у ах иях ях ы ь ию ью ю ия ья я', False,
+))
+_SUPERLATIVE = _endings(('ейш ейше', False))
+_DERIVATIONAL = _endings(('ост ость', False))
+
+
+def _strip(rv, endings):
+    """Отрезает самое длинное подходящее окончание. None, если не нашлось."""
+    for ending, needs_a in endings:
+        if rv.endswith(ending):
+            stem = rv[:-len(ending)]
+            if needs_a and not stem.endswith(('а', 'я')):
+                return None
+            return stem
+    return None
+
+
+def _regions(word):
+    """Возвращает начало областей RV и R2 (индексы в слове)."""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in _VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in _VOWELS and word[i] not in _VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in _VOWELS and word[i] not in _VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def stem(word):
+    """Возвращает основу русского слова. Латиница и числа не изменяются."""
+    word = word.lower().replace('ё', 'е')
+    if len(word) < 3 or not _CYRILLIC_RE.search(word):
+        return word
+
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1: деепричастие, иначе возвратность + прилагательное/глагол/существительное
+    result = _strip(rv, _PERFECTIVE_GERUND)
+    if result is None:
+        reflexive = _strip(rv, _REFLEXIVE)
+        if reflexive is not None:
+            rv = reflexive
+        result = _strip(rv, _ADJECTIVE)
+        if result is not None:
+            participle = _strip(result, _PARTICIPLE)
+            if participle is not None:
+                result = participle
+        else:
+            result = _strip(rv, _VERB)
+            if result is None:
+                result = _strip(rv, _NOUN)
+    if result is not None:
+        rv = result
+
+    # Шаг 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательное окончание, целиком лежащее в R2
+    for ending, _ in _DERIVATIONAL:
+        if rv.endswith(ending) and rv_start + len(rv) - len(ending) >= r2_start:
+            rv = rv[:-len(ending)]
+            break
+
+    # Шаг 4
+    superlative = _strip(rv, _SUPERLATIVE)
+    if superlative is not None:
+        rv = superlative
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif superlative is None and rv.endswith('ь'):
+        rv = rv[:-1]
+
+    return prefix + rv
+
+
+def tokenize(text):
+    """Разбивает текст на нормализованные основы слов без стоп-слов."""
+    tokens = []
+    for word in _WORD_RE.findall(text.lower()):
+        if word in STOP_WORDS:
+            continue
+        tokens.append(stem(word))
+    return tokens
+
+
+def normalize(text):
+    """Текст для записи в FTS-индекс: основы слов через пробел."""
+    return ' '.join(tokenize(text))
+
+
+# --- Работа с индексом ---
+
+def is_available():
+    """FTS5-индекс есть только у SQLite; на других базах работает запасной поиск."""
+    return connection.vendor == 'sqlite'
+
+
+def article_html(article):
+    """
+    HTML статьи для индексации. После loaddata и bulk-операций content_html
+    пуст (save() и сигналы не вызывались): rendered_content отрисует
+    Markdown и сохранит HTML вместе с анонсом.
+    """
+    return article.rendered_content
+
+
+def build_document(title, content_html, tag_names):
+    """Готовит колонки индекса для одной статьи."""
+    return (
+        normalize(title),
+        normalize(strip_tags(content_html)),
+        normalize(' '.join(tag_names)),
+    )
+
+
+def index_article(article):
+    """Добавляет (или обновляет) статью в индексе. Неопубликованные удаляются."""
+    if not is_available():
+        return
+    if not article.is_published:
+        remove_article(article.pk)
+        return
+    document = build_document(
+        article.title,
+        article_html(article),
+        article.tags.values_list('name', flat=True),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [article.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+            [article.pk, *document],
+        )
+
+
+def remove_article(article_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [article_id])
+
+
+def is_index_empty():
+    """Пуст ли индекс (например, сразу после миграции на существующей базе)."""
+    if not is_available():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT 1 FROM {FTS_TABLE} LIMIT 1')
+        return cursor.fetchone() is None
+
+
+def rebuild_index():
+    """Полностью пересобирает индекс. Возвращает количество проиндексированных статей."""
+    from .models import Article
+
+    if not is_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    count = 0
+    for article in Article.objects.published().prefetch_related('tags').iterator(chunk_size=500):
+        document = build_document(
+            article.title,
+            article_html(article),
+            [tag.name for tag in article.tags.all()],
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+                [article.pk, *document],
+            )
+        count += 1
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def build_match_expression(query, fields=None):
+    """
+    Превращает пользовательский запрос в безопасное выражение FTS5:
+    каждое слово — экранированный префиксный терм, термы объединяются через AND.
+    """
+    terms = ['"{}"*'.format(token.replace('"', '""')) for token in tokenize(query)]
+    if not terms:
+        return ''
+    expression = ' AND '.join(terms)
+    if fields:
+        expression = '{%s} : (%s)' % (' '.join(fields), expression)
+    return expression
+
+
+def search_article_ids(query, fields=None, limit=SEARCH_RESULTS_LIMIT):
+    """
+    Возвращает id опубликованных статей, отсортированные по релевантности (bm25).
+    fields ограничивает поиск колонками индекса, например ('title',).
+    """
+    from .models import Article
+
+    if not is_available():
+        # Запасной вариант для баз без FTS5: простой поиск по подстроке
+        condition = Q(title__icontains=query)
+        if not fields or 'content' in fields:
+            condition |= Q(content__icontains=query)
+        articles = Article.objects.published().filter(condition)
+        return list(articles.values_list('pk', flat=True)[:limit])
+
+    expression = build_match_expression(query, fields)
+    if not expression:
+        return []
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS.values())
+    # Поиск — чтение: на реплику, если она включена (core.db_routers)
+    with connections[router.db_for_read(Article)].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+            [expression, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def articles_in_order(queryset, ids):
+    """Загружает статьи по списку id, сохраняя порядок релевантности."""
+    articles = queryset.in_bulk(list(ids))
+    return [articles[pk] for pk in ids if pk in articles]
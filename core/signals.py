@@ -0,0 +1,247 @@
+# Path: core/signals.py
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, cache_versions, metrics, search, similarity, sitemap_files, tag_stats
+from .models import Article, Category, Page, RelatedArticle, Service, Tag
+
+# --- Версии кешей ---
+# Версии увеличиваются после коммита (cache_versions.bump_on_commit). Эти
+# обработчики подключаются первыми, поэтому колбэки остальных после коммита
+# уже видят новую версию.
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def bump_article_version(sender, **kwargs):
+    cache_versions.bump_on_commit('articles')
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def bump_article_version_on_tags_change(sender, action, **kwargs):
+    if action.startswith('post_'):
+        cache_versions.bump_on_commit('articles')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tag_version(sender, **kwargs):
+    cache_versions.bump_on_commit('tags')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_version(sender, **kwargs):
+    cache_versions.bump_on_commit('categories')
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def bump_service_version(sender, **kwargs):
+    cache_versions.bump_on_commit('services')
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def bump_page_version(sender, **kwargs):
+    cache_versions.bump_on_commit('pages')
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def bump_site_version(sender, **kwargs):
+    cache_versions.bump_on_commit('site')
+
+
+# --- Поисковый индекс и автодополнение ---
+
+def refresh_article(article):
+    """Обновляет статью во всех поисковых индексах и в похожих статьях."""
+    search.index_article(article)
+    # Индекс в памяти запоминает версию, поэтому обновляется после коммита,
+    # когда версия уже увеличена
+    transaction.on_commit(lambda: autocomplete.index.update_article(article))
+    similarity.schedule_update(article.pk)
+
+
+@receiver(post_save, sender=Article)
+def index_article_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_article(instance)
+
+
+@receiver(pre_delete, sender=Article)
+def remember_related_from(sender, instance, **kwargs):
+    # Ссылки на статью удалятся каскадом; эти списки похожих нужно будет дополнить
+    instance._related_from = list(RelatedArticle.objects.filter(related=instance).values_list('article_id', flat=True))
+
+
+@receiver(post_delete, sender=Article)
+def remove_article_from_index(sender, instance, **kwargs):
+    article_id = instance.pk
+    search.remove_article(article_id)
+    # После удаления Django обнуляет instance.pk, поэтому id запоминаем заранее
+    transaction.on_commit(lambda: autocomplete.index.remove_article(article_id))
+    # Сама статья тоже: воркер уберет ее из корпуса в памяти
+    similarity.schedule_update(article_id, *getattr(instance, '_related_from', []))
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def reindex_article_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Теги статьи входят в индекс, поэтому при их изменении статья переиндексируется."""
+    if reverse and action == 'pre_clear':
+        # tag.posts.clear() не передает pk_set, поэтому запоминаем статьи заранее
+        instance._article_ids = list(instance.posts.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_article(instance)
+        return
+    # Изменение со стороны тега (tag.posts.add(...)): переиндексируем затронутые статьи
+    article_ids = pk_set if pk_set is not None else getattr(instance, '_article_ids', [])
+    for article in Article.objects.filter(pk__in=article_ids):
+        refresh_article(article)
+
+
+@receiver(post_save, sender=Tag)
+def reindex_tag_articles(sender, instance, created, raw=False, **kwargs):
+    """При переименовании тега обновляем все статьи с этим тегом."""
+    if raw or created:
+        return
+    for article in instance.posts.all():
+        search.index_article(article)
+    autocomplete.index.invalidate()
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_articles(sender, instance, **kwargs):
+    # После удаления связи с тегом уже не найти, поэтому запоминаем их заранее
+    instance._article_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def reindex_articles_after_tag_delete(sender, instance, **kwargs):
+    for article in Article.objects.filter(pk__in=getattr(instance, '_article_ids', [])):
+        search.index_article(article)
+    autocomplete.index.invalidate()
+
+
+# --- Счетчики тегов и категорий ---
+
+@receiver(pre_save, sender=Article)
+@receiver(pre_delete, sender=Article)
+def remember_article_counts(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._tag_stats_before = tag_stats.snapshot([instance.pk]) if instance.pk else {}
+
+
+@receiver(post_save, sender=Article)
+def update_counts_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    tag_stats.apply_change(getattr(instance, '_tag_stats_before', {}), tag_stats.snapshot([instance.pk]))
+
+
+@receiver(post_delete, sender=Article)
+def update_counts_on_delete(sender, instance, **kwargs):
+    tag_stats.apply_change(getattr(instance, '_tag_stats_before', {}), {})
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def update_counts_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Снимает состояние затронутых статей до изменения тегов и применяет разницу после."""
+    if action.startswith('pre_'):
+        if not reverse:
+            article_ids = [instance.pk]
+        elif pk_set is not None:
+            article_ids = pk_set
+        else:
+            article_ids = instance.posts.values_list('pk', flat=True)
+        instance._tag_stats_before = tag_stats.snapshot(article_ids)
+        return
+    before = getattr(instance, '_tag_stats_before', {})
+    article_ids = set(before) | ({instance.pk} if not reverse else set(pk_set or ()))
+    tag_stats.apply_change(before, tag_stats.snapshot(article_ids))
+
+
+# --- Карта сайта ---
+# Пересобираются только файлы затронутых разделов, после коммита.
+# Дата изменения страниц home и article_list (раздел static) зависит от услуг и статей.
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def update_article_sitemap(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sitemap_files.schedule_update('articles', instance.pk)
+    sitemap_files.schedule_update('static')
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def update_service_sitemap(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sitemap_files.schedule_update('services')
+    sitemap_files.schedule_update('static')
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def update_page_sitemap(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sitemap_files.schedule_update('pages')
+
+
+@receiver(post_save, sender=Site)
+def update_sitemap_domain(sender, instance, raw=False, **kwargs):
+    # Адреса во всех файлах содержат домен: сборка увидит новый домен и пересоберет все
+    if raw:
+        return
+    sitemap_files.schedule_update('static')
+
+
+# --- Заполнение после миграций ---
+# Миграции создают производные таблицы пустыми: на существующей базе после
+# migrate их заполняют те же функции, что и команды rebuild_*.
+
+def _schema_is_current(using):
+    # Функции пересборки работают с текущими моделями, поэтому при откате
+    # или частичной миграции (migrate core 0011) ничего не заполняем
+    executor = MigrationExecutor(connections[using])
+    return not executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+@receiver(post_migrate)
+def fill_derived_data(sender, using=DEFAULT_DB_ALIAS, verbosity=1, stdout=None, **kwargs):
+    """Заполняет пустые производные таблицы, если в базе есть опубликованные статьи."""
+    if sender.name != 'core' or using != DEFAULT_DB_ALIAS:
+        return
+    if not Article.objects.published().exists() or not _schema_is_current(using):
+        return
+    filled = []
+    if search.is_index_empty():
+        filled.append(f"поисковый индекс ({search.rebuild_index()})")
+    if tag_stats.is_empty():
+        filled.append(f"счетчики тегов ({tag_stats.rebuild()})")
+    if not RelatedArticle.objects.exists():
+        filled.append(f"похожие статьи ({similarity.rebuild()})")
+    if filled and verbosity and stdout is not None:
+        stdout.write(f"Заполнено после миграций: {', '.join(filled)}")
+
+
+# --- Метрики ---
+
+@receiver(connection_created)
+def install_metrics_db_wrapper(sender, connection, **kwargs):
+    if settings.METRICS_ENABLED:
+        metrics.install_db_wrapper(connection)
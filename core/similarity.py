@@ -0,0 +1,323 @@
+# Path: core/similarity.py
+
+"""
+Похожие статьи по содержанию (блок "Похожие статьи").
+
+Каждая опубликованная статья превращается в TF-IDF вектор из основ слов
+заголовка, текста и тегов (тот же стеммер и стоп-слова, что у поиска,
+core.search). Для каждой статьи заранее считаются RELATED_COUNT ближайших
+соседей по косинусной мере и сохраняются в RelatedArticle, поэтому
+детальная страница читает их одним запросом по индексу.
+
+Векторы разреженные (dict), скалярные произведения считаются через
+инвертированный индекс: сравниваются только статьи с общими словами.
+Полный пересчет — команда rebuild_related_articles. При сохранении статья
+только ставится в очередь (RelatedArticleJob) в той же транзакции: при
+откате задание исчезает вместе с изменением. Воркер process_related_jobs
+держит корпус в памяти (частоты слов в документах, векторы и инвертированный
+индекс) и на каждую пачку заданий читает из базы только измененные статьи:
+пересчитываются их векторы и векторы статей с общими словами (у них
+поменялся IDF), затем соседи измененных статей и списки статей, в которые
+они входят или должны войти. Остальные списки не трогаются, даже если у них
+немного сдвинулись веса, — их выравнивает полный пересчет. Корпус в памяти
+целиком перечитывается раз в CORPUS_MAX_AGE секунд: так учитываются правки
+в обход сигналов.
+"""
+
+import math
+import time
+from collections import Counter, defaultdict
+
+from django.apps import apps as global_apps
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from . import search
+
+# Сколько похожих статей хранить для каждой статьи
+RELATED_COUNT = 4
+
+# Ниже этого сходства статьи не считаются похожими
+MIN_SCORE = 0.05
+
+# Вес вхождения слова в зависимости от поля
+FIELD_WEIGHTS = {'title': 3.0, 'content': 1.0, 'tags': 4.0}
+
+# Слова, которые встречаются больше чем в этой доле статей, не различают их
+MAX_DF_RATIO = 0.5
+
+# Через сколько секунд воркер перечитывает корпус из базы целиком
+CORPUS_MAX_AGE = 6 * 60 * 60
+
+
+# --- Документы и векторы ---
+
+def load_documents(article_ids=None):
+    """
+    Взвешенные частоты слов опубликованных статей: {id: Counter}. Без
+    article_ids — всех статей. На SQLite слова берутся из FTS-индекса, где
+    текст уже нормализован.
+    """
+    fields = list(FIELD_WEIGHTS)
+    if search.is_available():
+        sql = f'SELECT rowid, {", ".join(fields)} FROM {search.FTS_TABLE}'
+        params = []
+        if article_ids is not None:
+            article_ids = list(article_ids)
+            sql += f' WHERE rowid IN ({", ".join(["%s"] * len(article_ids))})'
+            params = article_ids
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return {row[0]: _term_counts(zip(fields, (text.split() for text in row[1:]))) for row in rows}
+
+    Article = global_apps.get_model('core', 'Article')
+    articles = Article.objects.filter(is_published=True)
+    if article_ids is not None:
+        articles = articles.filter(pk__in=article_ids)
+    documents = {}
+    for article in articles.prefetch_related('tags').iterator(chunk_size=500):
+        tokens = (
+            search.tokenize(article.title),
+            search.tokenize(strip_tags(search.article_html(article))),
+            search.tokenize(' '.join(tag.name for tag in article.tags.all())),
+        )
+        documents[article.pk] = _term_counts(zip(fields, tokens))
+    return documents
+
+
+def _term_counts(field_tokens):
+    counts = Counter()
+    for field, tokens in field_tokens:
+        weight = FIELD_WEIGHTS[field]
+        # Слова из тегов — отдельные признаки: совпадение тега сильнее совпадения слова
+        prefix = '#' if field == 'tags' else ''
+        for token in tokens:
+            counts[prefix + token] += weight
+    return counts
+
+
+class Corpus:
+    """
+    Нормированные TF-IDF векторы статей и инвертированный индекс по ним.
+    Документы можно заменять по одному (update): пересчитываются только
+    векторы статей, у которых есть слова с изменившейся частотой.
+    """
+
+    def __init__(self, documents):
+        self.documents = dict(documents)
+        self.df = Counter()
+        # Все статьи со словом, в том числе со словом, которое сейчас
+        # слишком частое и в вектор не входит
+        self.holders = defaultdict(set)
+        for article_id, counts in self.documents.items():
+            self.df.update(counts.keys())
+            for term in counts:
+                self.holders[term].add(article_id)
+        self.vectors = {}
+        self.postings = defaultdict(dict)
+        for article_id in self.documents:
+            self._build_vector(article_id)
+
+    def _idf(self, term):
+        total = len(self.documents)
+        count = self.df[term]
+        if not count or count > max(1, MAX_DF_RATIO * total):
+            return 0.0
+        return math.log((1 + total) / (1 + count))
+
+    def _build_vector(self, article_id):
+        for term in self.vectors.pop(article_id, ()):
+            self.postings[term].pop(article_id, None)
+        counts = self.documents.get(article_id)
+        if not counts:
+            return
+        vector = {}
+        for term, tf in counts.items():
+            idf = self._idf(term)
+            if idf:
+                vector[term] = (1 + math.log(tf)) * idf
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if not norm:
+            return
+        vector = {term: weight / norm for term, weight in vector.items()}
+        self.vectors[article_id] = vector
+        for term, weight in vector.items():
+            self.postings[term][article_id] = weight
+
+    def update(self, documents, article_ids):
+        """
+        Заменяет документы статей article_ids новыми из documents (статьи,
+        которых там нет, удаляются). Возвращает множество статей, чьи
+        векторы пересчитаны.
+        """
+        terms = set()
+        for article_id in article_ids:
+            old = self.documents.pop(article_id, None)
+            if old:
+                self.df.subtract(old.keys())
+                for term in old:
+                    self.holders[term].discard(article_id)
+                terms.update(old)
+            new = documents.get(article_id)
+            if new:
+                self.documents[article_id] = new
+                self.df.update(new.keys())
+                for term in new:
+                    self.holders[term].add(article_id)
+                terms.update(new)
+        rebuilt = set(article_ids)
+        for term in terms:
+            rebuilt |= self.holders[term]
+            if not self.df[term]:
+                del self.df[term], self.holders[term]
+        for article_id in rebuilt:
+            self._build_vector(article_id)
+        return rebuilt
+
+    def similarity(self, first_id, second_id):
+        first, second = self.vectors.get(first_id), self.vectors.get(second_id)
+        if not first or not second:
+            return 0.0
+        if len(first) > len(second):
+            first, second = second, first
+        return sum(weight * second.get(term, 0.0) for term, weight in first.items())
+
+    def scores(self, article_id):
+        """Сходство статьи со всеми статьями, у которых есть общие слова: {id: сходство}."""
+        scores = Counter()
+        for term, weight in self.vectors.get(article_id, {}).items():
+            for other_id, other_weight in self.postings[term].items():
+                if other_id != article_id:
+                    scores[other_id] += weight * other_weight
+        return scores
+
+    def neighbours(self, article_id, count=RELATED_COUNT):
+        """Ближайшие статьи: список (сходство, id) по убыванию сходства."""
+        ranked = sorted(
+            ((score, other_id) for other_id, score in self.scores(article_id).items() if score >= MIN_SCORE),
+            key=lambda item: (-item[0], -item[1]),
+        )
+        return ranked[:count]
+
+
+# Корпус воркера между пачками заданий: (корпус, момент построения)
+_corpus = (None, 0.0)
+
+
+def _fresh_corpus():
+    global _corpus
+    _corpus = (Corpus(load_documents()), time.monotonic())
+    return _corpus[0]
+
+
+def reset_corpus():
+    """Забывает корпус в памяти: следующая пачка прочитает все статьи заново."""
+    global _corpus
+    _corpus = (None, 0.0)
+
+
+# --- Сохранение ---
+
+def _save_neighbours(model, article_id, neighbours):
+    model.objects.filter(article_id=article_id).delete()
+    model.objects.bulk_create(
+        model(article_id=article_id, related_id=related_id, rank=rank, score=score)
+        for rank, (score, related_id) in enumerate(neighbours, start=1)
+    )
+
+
+def rebuild():
+    """Полностью пересчитывает похожие статьи. Возвращает число статей со списком."""
+    RelatedArticle = global_apps.get_model('core', 'RelatedArticle')
+    RelatedArticleJob = global_apps.get_model('core', 'RelatedArticleJob')
+    started = timezone.now()
+    corpus = _fresh_corpus()
+    links = [
+        RelatedArticle(article_id=article_id, related_id=related_id, rank=rank, score=score)
+        for article_id in corpus.vectors
+        for rank, (score, related_id) in enumerate(corpus.neighbours(article_id), start=1)
+    ]
+    with transaction.atomic():
+        RelatedArticle.objects.all().delete()
+        RelatedArticle.objects.bulk_create(links, batch_size=500)
+        # Задания, поставленные до начала пересчета, он уже учел
+        RelatedArticleJob.objects.filter(created_at__lte=started).delete()
+    return len({link.article_id for link in links})
+
+
+def update_articles(article_ids):
+    """
+    Пересчитывает соседей измененных статей и списки других статей,
+    в которые измененные входят или теперь должны войти.
+    """
+    RelatedArticle = global_apps.get_model('core', 'RelatedArticle')
+    changed = set(article_ids)
+    corpus, built_at = _corpus
+    if corpus is None or time.monotonic() - built_at > CORPUS_MAX_AGE:
+        corpus = _fresh_corpus()
+    else:
+        corpus.update(load_documents(changed), changed)
+
+    # Статьи, которые ссылались на измененные (в том числе снятые с публикации)
+    affected = set(
+        RelatedArticle.objects.filter(related_id__in=changed).values_list('article_id', flat=True)
+    )
+    # Войти в чужой список измененная статья может только при общих словах
+    candidates = Counter()
+    for article_id in changed:
+        for other_id, score in corpus.scores(article_id).items():
+            candidates[other_id] = max(candidates[other_id], score)
+    for article_id in changed:
+        candidates.pop(article_id, None)
+    weakest = {}
+    counts = Counter()
+    for article_id, score in RelatedArticle.objects.filter(
+        article_id__in=candidates.keys() - affected,
+    ).values_list('article_id', 'score'):
+        weakest[article_id] = min(weakest.get(article_id, score), score)
+        counts[article_id] += 1
+    for other_id, score in candidates.items():
+        threshold = weakest[other_id] if counts[other_id] >= RELATED_COUNT else MIN_SCORE
+        if score > threshold:
+            affected.add(other_id)
+
+    with transaction.atomic():
+        for article_id in changed | affected:
+            _save_neighbours(RelatedArticle, article_id, corpus.neighbours(article_id))
+
+
+# --- Очередь ---
+
+def schedule_update(*article_ids):
+    """
+    Ставит статьи в очередь на пересчет. Запись идет в текущей транзакции:
+    откат убирает и задание. Повторная постановка только обновляет время.
+    """
+    if not article_ids:
+        return
+    RelatedArticleJob = global_apps.get_model('core', 'RelatedArticleJob')
+    now = timezone.now()
+    RelatedArticleJob.objects.bulk_create(
+        [RelatedArticleJob(object_id=article_id, created_at=now) for article_id in set(article_ids)],
+        update_conflicts=True,
+        unique_fields=['object_id'],
+        update_fields=['created_at'],
+    )
+
+
+def process_jobs(limit=None):
+    """Пересчитывает статьи из очереди одной пачкой. Возвращает число выполненных заданий."""
+    RelatedArticleJob = global_apps.get_model('core', 'RelatedArticleJob')
+    started = timezone.now()
+    jobs = RelatedArticleJob.objects.filter(created_at__lte=started).values_list('object_id', flat=True)
+    if limit:
+        jobs = jobs[:limit]
+    article_ids = list(jobs)
+    if not article_ids:
+        return 0
+    update_articles(article_ids)
+    # Статьи, снова измененные за время пересчета, остаются в очереди
+    RelatedArticleJob.objects.filter(object_id__in=article_ids, created_at__lte=started).delete()
+    return len(article_ids)
@@ -0,0 +1,179 @@
+# Path: core/single_flight.py
+
+"""
+Склейка одинаковых одновременных запросов (single flight).
+
+Живой поиск и кнопка htmx "Показать еще" дают всплески одинаковых запросов,
+и при промахе кеша каждый из них считал бы страницу заново. Декоратор
+coalesce_requests пропускает к view только первый запрос с данным ключом;
+остальные, пришедшие, пока он выполняется, ждут и получают копию его
+ответа. Готовый ответ еще SINGLE_FLIGHT_TTL секунд отдается повторным
+запросам с тем же ключом (только при включенном PAGE_CACHE_ENABLED, как и
+кеш страниц: проверки и бенчмарки отключают его, чтобы замерять сами views).
+
+Ключ — нормализованный адрес запроса (core.page_cache.request_key) и версии
+моделей (core.cache_versions), поэтому правка в админке сразу дает новый
+ключ. Склеиваются только GET/HEAD анонимных посетителей и только ответы 200
+без cookies. Ожидание работает и в потоках (threading.Event), и в asyncio
+(future на event loop ждущего): лидер и ожидающие могут быть разных видов.
+Состояние общее для процесса, между воркерами запросы не склеиваются.
+"""
+
+import asyncio
+import pickle
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+from . import cache_versions
+from .page_cache import COMMON_NAMESPACES, is_cacheable_response, request_key
+
+# Сколько ожидающий запрос ждет лидера, прежде чем выполнить view сам
+WAIT_TIMEOUT = 30
+
+# Сколько готовых ответов хранить для повторных запросов в течение TTL
+MAX_RESULTS = 1000
+
+
+class Flight:
+    """Выполняющийся запрос: ожидающие потоки и future на event loop."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.futures = []
+        self.waiters = 0
+        self.result = None
+
+    def finish(self, result):
+        with _lock:
+            self.result = result
+            self.event.set()
+            futures, self.futures = self.futures, []
+        for loop, future in futures:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def wait(self):
+        return self.event.wait(WAIT_TIMEOUT)
+
+    async def await_result(self):
+        with _lock:
+            if self.event.is_set():
+                return True
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.futures.append((loop, future))
+        try:
+            await asyncio.wait_for(future, WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+_lock = threading.Lock()
+_flights = {}
+_results = {}  # ключ -> (момент устаревания, сериализованный ответ)
+
+
+def is_shareable_request(request):
+    """Ответ можно отдать другому посетителю: GET/HEAD без сессии."""
+    return request.method in ('GET', 'HEAD') and settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+def _key(request, versions):
+    return f'{request_key(request)}|{versions}'
+
+
+def _join(key):
+    """Возвращает (готовый ответ, None, False), (None, flight, лидер ли этот запрос)."""
+    with _lock:
+        cached = _results.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1], None, False
+        flight = _flights.get(key)
+        if flight is not None:
+            flight.waiters += 1
+            return None, flight, False
+        flight = _flights[key] = Flight()
+        return None, flight, True
+
+
+def _land(key, flight, response):
+    """Лидер завершил запрос: раздает ответ ожидающим и запоминает его на TTL."""
+    with _lock:
+        # После этого новые запросы с ключом сами становятся лидерами,
+        # поэтому число ожидающих больше не растет
+        _flights.pop(key, None)
+        waiters = flight.waiters
+    keep = settings.PAGE_CACHE_ENABLED and settings.SINGLE_FLIGHT_TTL
+    data = None
+    # Копия ответа нужна, только если его кто-то ждет или он сохраняется на TTL
+    if (waiters or keep) and response is not None and is_cacheable_response(response):
+        data = pickle.dumps(response, pickle.HIGHEST_PROTOCOL)
+    if data is not None and keep:
+        with _lock:
+            now = time.monotonic()
+            for stale in [k for k, (expires, _) in _results.items() if expires <= now]:
+                del _results[stale]
+            while len(_results) >= MAX_RESULTS:
+                del _results[next(iter(_results))]
+            _results[key] = (now + settings.SINGLE_FLIGHT_TTL, data)
+    flight.finish(data)
+
+
+def coalesce_requests(*namespaces):
+    """
+    Декоратор view (синхронной или async): одинаковые одновременные запросы
+    выполняют view один раз. namespaces — модели, от которых зависит ответ.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not is_shareable_request(request):
+                    return await view_func(request, *args, **kwargs)
+                key = _key(request, await cache_versions.aget_versions(*COMMON_NAMESPACES, *namespaces))
+                data, flight, leader = _join(key)
+                if data is not None:
+                    return pickle.loads(data)
+                if leader:
+                    response = None
+                    try:
+                        response = await view_func(request, *args, **kwargs)
+                    finally:
+                        _land(key, flight, response)
+                    return response
+                if await flight.await_result() and flight.result is not None:
+                    return pickle.loads(flight.result)
+                # Лидер упал, вернул неподходящий ответ или не успел: считаем сами
+                return await view_func(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_shareable_request(request):
+                return view_func(request, *args, **kwargs)
+            key = _key(request, cache_versions.get_versions(*COMMON_NAMESPACES, *namespaces))
+            data, flight, leader = _join(key)
+            if data is not None:
+                return pickle.loads(data)
+            if leader:
+                response = None
+                try:
+                    response = view_func(request, *args, **kwargs)
+                finally:
+                    _land(key, flight, response)
+                return response
+            if flight.wait() and flight.result is not None:
+                return pickle.loads(flight.result)
+            # Лидер упал, вернул неподходящий ответ или не успел: считаем сами
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
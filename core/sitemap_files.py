@@ -0,0 +1,307 @@
+# Path: core/sitemap_files.py
+
+"""
+Карта сайта в виде готовых файлов на диске.
+
+sitemap.xml — индекс (sitemapindex), который ссылается на файлы разделов
+sitemap-<раздел>-<номер>.xml.gz (по Sitemap.limit адресов в каждом).
+lastmod каждого файла в индексе — самая свежая updated_date среди его
+адресов. Файлы отдаются как статика (views.sitemap_file_view или
+напрямую веб-сервером), поэтому запрос карты сайта не трогает базу.
+
+Адреса раздела идут по возрастанию id, а в manifest.json для каждого файла
+записан id первого объекта. Поэтому при сохранении статьи пересобирается
+только файл, в который она попадает, и следующие за ним (публикация или
+удаление сдвигают их), а файлы, содержимое которых не изменилось, не
+перезаписываются: их Last-Modified остается прежним.
+Полная сборка — команда build_sitemaps.
+
+Сохранение объекта ничего не пересобирает: в той же транзакции в очередь
+(SitemapJob) ставится раздел и id объекта, а воркер process_sitemap_jobs
+забирает все накопленные задания и пересобирает каждый раздел один раз.
+Сборки из разных процессов (воркер, build_sitemaps, первый запрос после
+деплоя) не пересекаются: manifest читается и пишется под блокировкой
+файла (fcntl.flock).
+"""
+
+import gzip
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.db import transaction
+from django.db.models import QuerySet
+from django.urls import reverse
+from django.utils import timezone
+
+from .files import write_file
+from .sitemaps import SITEMAPS
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (разработка): остается только блокировка внутри процесса
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'sitemap.xml'
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.lock'
+
+# Сколько объектов читать из базы за один раз
+CHUNK_SIZE = 2000
+
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# Сборки не должны пересекаться: у них общий manifest
+_lock = threading.Lock()
+
+
+@contextmanager
+def _locked(directory):
+    """
+    Блокировка каталога карты сайта для всех процессов. Блокируется
+    отдельный файл: manifest заменяется атомарно (новый inode), и
+    блокировка на нем не остановила бы процесс, открывший уже новый файл.
+    """
+    with _lock, open(directory / LOCK_FILE, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def page_filename(section, number):
+    return f'sitemap-{section}-{number}.xml.gz'
+
+
+def item_value(sitemap, name, item):
+    """Атрибут Sitemap, который может быть методом (как Sitemap._get в Django)."""
+    attr = getattr(sitemap, name, None)
+    return attr(item) if callable(attr) else attr
+
+
+def _format_date(value):
+    return value.isoformat(timespec='seconds') if value else None
+
+
+# --- Запись файлов ---
+
+def _urlset(urls):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<urlset xmlns="{XMLNS}">']
+    for url in urls:
+        parts = [f'<loc>{escape(url["location"])}</loc>']
+        if url['lastmod']:
+            parts.append(f'<lastmod>{url["lastmod"]}</lastmod>')
+        if url['changefreq']:
+            parts.append(f'<changefreq>{url["changefreq"]}</changefreq>')
+        if url['priority'] is not None:
+            parts.append(f'<priority>{url["priority"]}</priority>')
+        lines.append(f'<url>{"".join(parts)}</url>')
+    lines.append('</urlset>\n')
+    # mtime=0: одинаковое содержимое дает одинаковые байты, лишней перезаписи не будет
+    return gzip.compress('\n'.join(lines).encode('utf-8'), mtime=0)
+
+
+def _sitemapindex(entries):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<sitemapindex xmlns="{XMLNS}">']
+    for location, lastmod in entries:
+        lastmod_tag = f'<lastmod>{lastmod}</lastmod>' if lastmod else ''
+        lines.append(f'<sitemap><loc>{escape(location)}</loc>{lastmod_tag}</sitemap>')
+    lines.append('</sitemapindex>\n')
+    return '\n'.join(lines).encode('utf-8')
+
+
+# --- Сборка разделов ---
+
+def _items(sitemap, start=None):
+    """Объекты раздела по возрастанию id (начиная с id start) или как есть для списков."""
+    items = sitemap.items()
+    if not isinstance(items, QuerySet):
+        return items
+    items = items.order_by('pk')
+    if start is not None:
+        items = items.filter(pk__gte=start)
+    return items.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _pages(sitemap, base_url, start=None):
+    """Файлы раздела: (id первого объекта, список адресов) по sitemap.limit адресов."""
+    urls, first = [], None
+    for item in _items(sitemap, start):
+        if not urls:
+            first = getattr(item, 'pk', None)
+        urls.append({
+            'location': base_url + item_value(sitemap, 'location', item),
+            'lastmod': item_value(sitemap, 'lastmod', item),
+            'changefreq': item_value(sitemap, 'changefreq', item),
+            'priority': item_value(sitemap, 'priority', item),
+        })
+        if len(urls) >= sitemap.limit:
+            yield first, urls
+            urls = []
+    if urls:
+        yield first, urls
+
+
+def _build_section(directory, section, base_url, old_pages, start=None):
+    """
+    Пересобирает файлы раздела начиная с того, в который попадает объект
+    с id start (None — весь раздел). Возвращает новый список страниц manifest.
+    """
+    sitemap = SITEMAPS[section]()
+    keep = 0
+    if start is not None and old_pages:
+        for index, page in enumerate(old_pages):
+            if page['start'] is not None and page['start'] <= start:
+                keep = index
+        # Первый файл раздела собирается с самого начала
+        start = old_pages[keep]['start'] if keep else None
+    else:
+        start = None
+
+    pages = old_pages[:keep]
+    for first, urls in _pages(sitemap, base_url, start):
+        filename = page_filename(section, len(pages) + 1)
+        dates = [url['lastmod'] for url in urls if url['lastmod']]
+        for url in urls:
+            url['lastmod'] = _format_date(url['lastmod'])
+        write_file(directory / filename, _urlset(urls))
+        pages.append({'file': filename, 'start': first, 'lastmod': _format_date(max(dates, default=None))})
+
+    # Раздел стал короче: лишние файлы удаляются
+    for page in old_pages[len(pages):]:
+        (directory / page['file']).unlink(missing_ok=True)
+    return pages
+
+
+def _read_manifest(directory):
+    try:
+        return json.loads((directory / MANIFEST_FILE).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def update(changes=None, directory=None):
+    """
+    Пересобирает карту сайта. changes — {раздел: id измененного объекта или None};
+    None вместо словаря — полная сборка. Индекс и manifest записываются в конце.
+    """
+    directory = Path(directory or settings.SITEMAP_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    site = Site.objects.get_current()
+    base_url = f'{settings.SITEMAP_PROTOCOL}://{site.domain}'
+
+    with _locked(directory):
+        manifest = _read_manifest(directory)
+        # Сменился домен или файлов еще нет — собираем все; старый список
+        # файлов нужен, чтобы удалить лишние
+        if changes is None or not manifest or manifest.get('base_url') != base_url:
+            changes = dict.fromkeys(SITEMAPS)
+            manifest = {'base_url': base_url, 'sections': (manifest or {}).get('sections', {})}
+
+        sections = manifest['sections']
+        for section, start in changes.items():
+            sections[section] = _build_section(directory, section, base_url, sections.get(section, []), start)
+
+        entries = [
+            (base_url + reverse('sitemap_file', kwargs={'filename': page['file']}), page['lastmod'])
+            for section in SITEMAPS
+            for page in sections.get(section, [])
+        ]
+        write_file(directory / INDEX_FILE, _sitemapindex(entries))
+        write_file(directory / MANIFEST_FILE, json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8'))
+    return manifest
+
+
+def build(directory=None):
+    """Полная сборка всех разделов. Задания, поставленные до ее начала, она уже учла."""
+    SitemapJob = global_apps.get_model('core', 'SitemapJob')
+    started = timezone.now()
+    manifest = update(None, directory)
+    if directory is None or Path(directory) == Path(settings.SITEMAP_DIR):
+        SitemapJob.objects.filter(created_at__lte=started).delete()
+    return manifest
+
+
+def ensure_built():
+    """Собирает карту сайта, если ее еще нет (первый запрос после деплоя)."""
+    if not (Path(settings.SITEMAP_DIR) / INDEX_FILE).exists():
+        build()
+
+
+# --- Очередь ---
+
+def _merge(changes, section, pk):
+    """Добавляет изменение в {раздел: наименьший id или None — раздел целиком}."""
+    if section in changes and changes[section] is None:
+        return
+    changes[section] = pk if pk is None or section not in changes else min(changes[section], pk)
+
+
+def process_jobs():
+    """Пересобирает разделы из очереди одной пачкой. Возвращает число выполненных заданий."""
+    SitemapJob = global_apps.get_model('core', 'SitemapJob')
+    started = timezone.now()
+    jobs = list(SitemapJob.objects.filter(created_at__lte=started).values_list('pk', 'section', 'object_id'))
+    if not jobs:
+        return 0
+    changes = {}
+    for _, section, object_id in jobs:
+        # Раздел могли убрать из SITEMAPS, пока задание ждало
+        if section in SITEMAPS:
+            _merge(changes, section, object_id)
+    update(changes)
+    SitemapJob.objects.filter(pk__in=[pk for pk, _, _ in jobs]).delete()
+    return len(jobs)
+
+
+# Без очереди (SITEMAP_QUEUE_ENABLED = False) разделы, измененные в текущей
+# транзакции, собираются в пачку и пересобираются один раз после коммита.
+# Пачка живет, пока ее колбэк зарегистрирован в транзакции: при откате Django
+# удаляет колбэк, и следующее изменение начинает новую пачку вместо того,
+# чтобы дописать в отмененную.
+_pending = threading.local()
+
+
+class _Batch(dict):
+    def __call__(self):
+        # Транзакция уже закоммичена: ошибка сборки не должна превращать
+        # успешное сохранение в ответ 500. Файлы исправит следующая сборка.
+        try:
+            update(dict(self))
+        except Exception:
+            logger.exception("Не удалось пересобрать карту сайта: %s", sorted(self))
+
+
+def _current_batch():
+    batch = getattr(_pending, 'batch', None)
+    connection = transaction.get_connection()
+    if batch is not None and any(entry[1] is batch for entry in connection.run_on_commit):
+        return batch, False
+    batch = _pending.batch = _Batch()
+    return batch, True
+
+
+def schedule_update(section, pk=None):
+    """Пересобрать раздел после коммита: начиная с объекта pk или целиком (pk=None)."""
+    if settings.SITEMAP_QUEUE_ENABLED:
+        # Запись идет в текущей транзакции: откат убирает и задание
+        SitemapJob = global_apps.get_model('core', 'SitemapJob')
+        SitemapJob.objects.create(section=section, object_id=pk, created_at=timezone.now())
+        return
+    batch, is_new = _current_batch()
+    _merge(batch, section, pk)
+    if is_new:
+        # Вне транзакции колбэк выполняется сразу
+        transaction.on_commit(batch)
@@ -1,9 +1,9 @@
 # Path: core/sitemaps.py
 
 from django.contrib.sitemaps import Sitemap
+from django.db.models import Max, Q
 from django.urls import reverse
-from .models import Article, Service, Page
-from django.utils import timezone # Импортируем timezone
+from .models import Article, Category, Service, Page, Tag
 
 class StaticViewSitemap(Sitemap):
     """Карта сайта для ключевых статических страниц."""
@@ -15,14 +15,18 @@ class StaticViewSitemap(Sitemap):
         return 'daily' if item == 'home' else 'weekly'
 
     def items(self):
+        # Дата изменения "статической" страницы — самое свежее изменение ее содержимого
+        self._lastmods = {
+            'home': Service.objects.aggregate(last=Max('updated_date'))['last'],
+            'article_list': Article.objects.published().aggregate(last=Max('updated_date'))['last'],
+        }
         return ['home', 'article_list']
 
     def location(self, item):
         return reverse(item)
         
     def lastmod(self, item):
-        # Для статических страниц возвращаем текущую дату
-        return timezone.now()
+        return self._lastmods.get(item)
 
 class PageSitemap(Sitemap):
     """Карта сайта для страниц, созданных через модель Page."""
@@ -30,7 +34,7 @@ class PageSitemap(Sitemap):
     priority = 0.8
 
     def items(self):
-        return Page.objects.filter(is_published=True)
+        return Page.objects.filter(is_published=True).only('slug', 'updated_date')
 
     def lastmod(self, obj):
         # Используем новое поле updated_date
@@ -42,7 +46,7 @@ class ServiceSitemap(Sitemap):
     priority = 0.8
 
     def items(self):
-        return Service.objects.all()
+        return Service.objects.only('slug', 'updated_date')
 
     def lastmod(self, obj):
         # Используем новое поле updated_date
@@ -52,9 +56,41 @@ class ArticleSitemap(Sitemap):
     """Карта сайта для опубликованных статей."""
     changefreq = "weekly"
     priority = 0.7
+    # Файлы поменьше: после сохранения статьи пересобирается меньше адресов
+    limit = 10000
 
     def items(self):
-        return Article.objects.filter(is_published=True).order_by('-updated_date')
+        return Article.objects.published().only('slug', 'updated_date')
 
     def lastmod(self, obj):
-        return obj.updated_date
\ No newline at end of file
+        return obj.updated_date
+
+class CategorySitemap(Sitemap):
+    """Списки статей по категориям. В sitemap.xml не входят, используются для prerender."""
+
+    def items(self):
+        return Category.objects.filter(published_count__gt=0).annotate(
+            last=Max('posts__updated_date', filter=Q(posts__is_published=True))
+        )
+
+    def lastmod(self, obj):
+        return obj.last
+
+class TagSitemap(Sitemap):
+    """Списки статей по тегам. В sitemap.xml не входят, используются для prerender."""
+
+    def items(self):
+        return Tag.objects.filter(published_count__gt=0).annotate(
+            last=Max('posts__updated_date', filter=Q(posts__is_published=True))
+        )
+
+    def lastmod(self, obj):
+        return obj.last
+
+# Разделы карты сайта (core.sitemap_files) в порядке вывода в индексе
+SITEMAPS = {
+    'static': StaticViewSitemap,
+    'pages': PageSitemap,
+    'services': ServiceSitemap,
+    'articles': ArticleSitemap,
+}
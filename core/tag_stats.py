@@ -0,0 +1,181 @@
+# Path: core/tag_stats.py
+
+"""
+Денормализованные счетчики для облаков тегов.
+
+Хранятся:
+  * Tag.published_count и Category.published_count — число опубликованных статей;
+  * TagCooccurrence — сколько опубликованных статей с тегом A имеют и тег B;
+  * CategoryTagCount — сколько опубликованных статей категории имеют тег.
+
+Вклад статьи в счетчики зависит только от ее состояния: опубликована ли она,
+категория и набор тегов. Сигналы (core.signals) снимают состояние статьи до
+и после изменения, а apply_change() применяет разницу. Изменения в обход
+сигналов (queryset.update(), loaddata) исправляет команда rebuild_tag_stats.
+"""
+
+from collections import Counter, defaultdict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+
+
+def snapshot(article_ids):
+    """
+    Состояние статей, которое влияет на счетчики:
+    {id: (категория, frozenset(id тегов))}. Неопубликованные статьи не входят.
+    """
+    Article = global_apps.get_model('core', 'Article')
+    article_ids = list(article_ids)
+    if not article_ids:
+        return {}
+    categories = dict(
+        Article.objects.filter(pk__in=article_ids, is_published=True).values_list('pk', 'category_id')
+    )
+    tags = defaultdict(set)
+    through = Article.tags.through.objects.filter(article_id__in=categories)
+    for article_id, tag_id in through.values_list('article_id', 'tag_id'):
+        tags[article_id].add(tag_id)
+    return {pk: (category_id, frozenset(tags[pk])) for pk, category_id in categories.items()}
+
+
+def _contributions(states, sign, deltas):
+    tag_counts, pairs, category_counts, category_tags = deltas
+    for category_id, tag_ids in states:
+        for tag_id in tag_ids:
+            tag_counts[tag_id] += sign
+            for related_id in tag_ids:
+                pairs[tag_id, related_id] += sign
+            if category_id:
+                category_tags[category_id, tag_id] += sign
+        if category_id:
+            category_counts[category_id] += sign
+
+
+def apply_change(before, after):
+    """Переносит в счетчики разницу между двумя снимками snapshot()."""
+    deltas = (Counter(), Counter(), Counter(), Counter())
+    for pk in set(before) | set(after):
+        if before.get(pk) == after.get(pk):
+            continue
+        if pk in before:
+            _contributions([before[pk]], -1, deltas)
+        if pk in after:
+            _contributions([after[pk]], 1, deltas)
+    tag_counts, pairs, category_counts, category_tags = (
+        {key: value for key, value in delta.items() if value} for delta in deltas
+    )
+    if not (tag_counts or pairs or category_counts or category_tags):
+        return
+    with transaction.atomic():
+        _add_to_objects('Tag', tag_counts)
+        _add_to_objects('Category', category_counts)
+        _add_to_pairs('TagCooccurrence', ('tag_id', 'related_tag_id'), pairs)
+        _add_to_pairs('CategoryTagCount', ('category_id', 'tag_id'), category_tags)
+
+
+def _add_to_objects(model_name, deltas):
+    if not deltas:
+        return
+    model = global_apps.get_model('core', model_name)
+    objects = list(model.objects.filter(pk__in=deltas).only('published_count'))
+    for obj in objects:
+        obj.published_count = max(obj.published_count + deltas[obj.pk], 0)
+    model.objects.bulk_update(objects, ['published_count'])
+
+
+def _add_to_pairs(model_name, key_fields, deltas):
+    """Прибавляет дельты к счетчикам пар: существующие строки обновляет, новые создает, нулевые удаляет."""
+    if not deltas:
+        return
+    model = global_apps.get_model('core', model_name)
+    first, second = key_fields
+    rows = model.objects.filter(**{
+        f'{first}__in': {key[0] for key in deltas},
+        f'{second}__in': {key[1] for key in deltas},
+    })
+    existing = {(getattr(row, first), getattr(row, second)): row for row in rows}
+    to_update, to_delete, to_create = [], [], []
+    for key, delta in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            if delta > 0:
+                to_create.append(model(**{first: key[0], second: key[1], 'count': delta}))
+            continue
+        row.count += delta
+        if row.count > 0:
+            to_update.append(row)
+        else:
+            to_delete.append(row.pk)
+    model.objects.bulk_update(to_update, ['count'])
+    model.objects.bulk_create(to_create)
+    model.objects.filter(pk__in=to_delete).delete()
+
+
+def is_empty():
+    """Не посчитаны ли счетчики (например, сразу после миграции 0013 на существующей базе)."""
+    Tag = global_apps.get_model('core', 'Tag')
+    Category = global_apps.get_model('core', 'Category')
+    return not (
+        Tag.objects.filter(published_count__gt=0).exists()
+        or Category.objects.filter(published_count__gt=0).exists()
+    )
+
+
+def rebuild():
+    """Пересчитывает все счетчики с нуля (после массового импорта или правок в обход сигналов)."""
+    Article = global_apps.get_model('core', 'Article')
+    Tag = global_apps.get_model('core', 'Tag')
+    Category = global_apps.get_model('core', 'Category')
+    TagCooccurrence = global_apps.get_model('core', 'TagCooccurrence')
+    CategoryTagCount = global_apps.get_model('core', 'CategoryTagCount')
+
+    deltas = (Counter(), Counter(), Counter(), Counter())
+    article_ids = Article.objects.filter(is_published=True).values_list('pk', flat=True)
+    _contributions(snapshot(article_ids).values(), 1, deltas)
+    tag_counts, pairs, category_counts, category_tags = deltas
+
+    with transaction.atomic():
+        Tag.objects.update(published_count=0)
+        Category.objects.update(published_count=0)
+        Tag.objects.bulk_update(
+            [Tag(pk=pk, published_count=count) for pk, count in tag_counts.items()], ['published_count']
+        )
+        Category.objects.bulk_update(
+            [Category(pk=pk, published_count=count) for pk, count in category_counts.items()], ['published_count']
+        )
+        TagCooccurrence.objects.all().delete()
+        TagCooccurrence.objects.bulk_create(
+            TagCooccurrence(tag_id=tag_id, related_tag_id=related_id, count=count)
+            for (tag_id, related_id), count in pairs.items()
+        )
+        CategoryTagCount.objects.all().delete()
+        CategoryTagCount.objects.bulk_create(
+            CategoryTagCount(category_id=category_id, tag_id=tag_id, count=count)
+            for (category_id, tag_id), count in category_tags.items()
+        )
+    return len(tag_counts)
+
+
+# --- Облако тегов ---
+
+# Сколько ступеней размера шрифта в облаке
+CLOUD_WEIGHTS = 4
+
+
+def weighted(tags):
+    """
+    Проставляет тегам атрибут weight (1..CLOUD_WEIGHTS) по числу статей
+    (атрибут article_count) в линейной шкале от минимума к максимуму.
+    """
+    tags = list(tags)
+    if not tags:
+        return tags
+    counts = [tag.article_count for tag in tags]
+    low, high = min(counts), max(counts)
+    for tag in tags:
+        if high == low:
+            tag.weight = 1
+        else:
+            tag.weight = 1 + round((tag.article_count - low) * (CLOUD_WEIGHTS - 1) / (high - low))
+    return tags
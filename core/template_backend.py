@@ -0,0 +1,27 @@
+# Path: core/template_backend.py
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from . import metrics
+
+
+class TimedTemplate(Template):
+    """Шаблон, время рендеринга которого попадает в метрики запроса (core.metrics)."""
+
+    def render(self, context=None, request=None):
+        with metrics.track('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Обычный движок шаблонов Django, который возвращает TimedTemplate."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,90 @@
+# Path: core/templatetags/fragment_tags.py
+
+"""
+Кеш фрагментов шаблонов в памяти процесса.
+
+    {% load fragment_tags %}
+    {% cached_fragment 'nav' section %}...{% endcached_fragment %}
+    {% cached_fragment 'article_head' post.pk post.updated_date namespaces='articles tags' %}
+        ...
+    {% endcached_fragment %}
+
+Ключ фрагмента — имя, значения после имени и версия общего контекста
+сайта (site_version из core.context_processors): при изменении сайта все
+фрагменты пересобираются. namespaces добавляет в ключ
+версии перечисленных моделей (core.cache_versions) — для фрагментов, которые
+зависят от связанных объектов, например названий тегов статьи.
+
+В отличие от {% cache %} Django фрагменты не ходят в бэкенд кеша: повторный
+рендер стоит одного поиска в словаре. Число фрагментов ограничено
+FRAGMENT_CACHE_SIZE, давно не использованные вытесняются.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django import template
+
+from core import cache_versions
+
+register = template.Library()
+
+# Сколько фрагментов хранить в памяти процесса
+FRAGMENT_CACHE_SIZE = 1000
+
+_fragments = OrderedDict()
+_lock = threading.Lock()
+
+
+def clear():
+    with _lock:
+        _fragments.clear()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on, namespaces):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+        self.namespaces = namespaces
+
+    def render(self, context):
+        key = (
+            self.name.resolve(context),
+            tuple(var.resolve(context) for var in self.vary_on),
+            context.get('site_version'),
+        )
+        if self.namespaces is not None:
+            key += cache_versions.get_versions(*self.namespaces.resolve(context).split())
+
+        with _lock:
+            output = _fragments.get(key)
+            if output is not None:
+                _fragments.move_to_end(key)
+                return output
+
+        output = self.nodelist.render(context)
+        with _lock:
+            _fragments[key] = output
+            while len(_fragments) > FRAGMENT_CACHE_SIZE:
+                _fragments.popitem(last=False)
+        return output
+
+
+@register.tag('cached_fragment')
+def do_cached_fragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' требует имя фрагмента.")
+    nodelist = parser.parse(('endcached_fragment',))
+    parser.delete_first_token()
+
+    namespaces = None
+    if bits[-1].startswith('namespaces='):
+        namespaces = parser.compile_filter(bits.pop()[len('namespaces='):])
+    return CachedFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in bits[2:]],
+        namespaces,
+    )
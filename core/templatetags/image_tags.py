@@ -0,0 +1,46 @@
+# Path: core/templatetags/image_tags.py
+
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(renditions, alt='', css_class='', loading='lazy'):
+    """
+    Выводит <picture> для набора вариантов (core.renditions):
+    AVIF и WEBP через <source>, JPEG в <img> с размерами против сдвига верстки.
+    Пока воркер не создал варианты, выводится <img> с оригиналом.
+    Для первого экрана передайте loading="eager".
+    Пример: {% picture service.card_image alt=service.title css_class="h-40 w-full" %}
+    """
+    if not renditions:
+        return ''
+    if not renditions.is_generated:
+        return format_html(
+            '<img src="{}" width="{}" height="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            renditions.original_url,
+            renditions.width,
+            renditions.height,
+            alt,
+            css_class,
+            loading,
+        )
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime_type, srcset, renditions.sizes) for mime_type, srcset in renditions.sources()),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" '
+        'alt="{}" class="{}" loading="{}" decoding="async"></picture>',
+        sources,
+        renditions.fallback_url,
+        renditions.fallback_srcset,
+        renditions.sizes,
+        renditions.width,
+        renditions.height,
+        alt,
+        css_class,
+        loading,
+    )
@@ -0,0 +1,17 @@
+# Path: core/templatetags/markup_tags.py
+
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.markup import render_markdown
+
+register = template.Library()
+
+
+@register.filter(is_safe=True)
+def markdown(value):
+    """
+    Как фильтр |markdown из markdown_deux (те же настройки), но через
+    core.markup.render_markdown: время рендеринга попадает в метрики.
+    """
+    return mark_safe(render_markdown(value))
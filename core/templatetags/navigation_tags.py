@@ -5,19 +5,19 @@ from django import template
 register = template.Library()
 
 @register.simple_tag(takes_context=True)
-def is_active_nav(context, *url_names):
+def nav_section(context):
     """
-    Проверяет, является ли текущая страница активной для навигации.
-    Принимает одно или несколько имен URL (url_names).
-    Возвращает 'active' если текущий URL относится к одному из имен,
-    иначе возвращает пустую строку.
+    Раздел меню, к которому относится текущая страница: 'services',
+    'articles', адрес статической страницы или пустая строка.
+    От него зависит подсветка пунктов, поэтому меню кешируется
+    отдельно для каждого раздела (см. fragment_tags).
     """
     request = context['request']
-    current_url_name = request.resolver_match.url_name
-    
-    # Проверяем, начинается ли имя текущего URL с одного из префиксов
-    for name in url_names:
-        if current_url_name.startswith(name):
-            return 'active'
-            
-    return ''
\ No newline at end of file
+    url_name = request.resolver_match.url_name if request.resolver_match else ''
+    if url_name in ('home', 'service_detail'):
+        return 'services'
+    if url_name.startswith('article'):
+        return 'articles'
+    if url_name == 'page_view':
+        return request.path
+    return ''
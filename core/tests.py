@@ -0,0 +1,1354 @@
+# Path: core/tests.py
+
+import gzip
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sites.models import Site
+from django.core.cache import cache, caches
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.template import Context, Engine, Template
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    autocomplete, cache_versions, context_processors, prerender, search, signals, similarity, single_flight,
+    sitemap_files, tag_stats, thumbnails, warmup,
+)
+from .db_routers import PrimaryReplicaRouter, replica_reads
+from .markup import EXCERPT_WORDS, render_markdown
+from .middleware import PIN_COOKIE_NAME, ProfilingMiddleware, ReplicaRoutingMiddleware
+from .models import (
+    Article, Category, CategoryTagCount, Page, RelatedArticle, RelatedArticleJob, Service, SitemapJob, Tag,
+    TagCooccurrence, ThumbnailJob,
+)
+from .pagination import decode_cursor, encode_cursor
+from .templatetags import fragment_tags
+from .views import ARTICLES_PER_PAGE
+
+
+class MarkdownContentTests(TestCase):
+    """Готовый HTML статей и страниц (MarkdownContentModel)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.article = Article.objects.create(
+                title='Markdown', slug='markdown-article', content='Текст с *выделением*', is_published=True,
+            )
+
+    def test_html_is_rendered_on_save_only_when_content_changes(self):
+        self.assertIn('<em>выделением</em>', self.article.content_html)
+        with mock.patch('core.models.render_markdown', wraps=render_markdown) as render:
+            self.article.title = 'Новый заголовок'
+            self.article.save()
+            render.assert_not_called()
+            self.article.content = 'Текст с **другим** выделением'
+            self.article.save(update_fields=['content'])
+            render.assert_called_once()
+        self.article.refresh_from_db()
+        self.assertIn('<strong>другим</strong>', self.article.content_html)
+
+    def test_missing_html_is_rendered_on_first_read(self):
+        # Так статья выглядит после loaddata или bulk_create
+        Article.objects.filter(pk=self.article.pk).update(content_html='', content_hash='')
+        article = Article.objects.get(pk=self.article.pk)
+        self.assertIn('<em>выделением</em>', article.rendered_content)
+        self.assertIn('<em>выделением</em>', Article.objects.get(pk=self.article.pk).content_html)
+
+    def test_page_uses_stored_html(self):
+        page = Page.objects.create(title='О нас', slug='markdown-page', content='# Заголовок', is_published=True)
+        with mock.patch('core.models.render_markdown') as render:
+            response = self.client.get(reverse('page_view', args=[page.slug]))
+        render.assert_not_called()
+        self.assertContains(response, '<h1>Заголовок</h1>', html=True)
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class ExcerptTests(TestCase):
+    """Анонсы статей для списков хранятся готовыми (Article.excerpt)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        words = ' '.join(f'слово{number}' for number in range(EXCERPT_WORDS + 10))
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.article = Article.objects.create(
+                title='Анонс', slug='excerpt-article', is_published=True,
+                content=f'**Жирный** текст &amp; [ссылка](https://example.com) {words}',
+            )
+
+    def test_excerpt_is_plain_truncated_text(self):
+        excerpt = self.article.excerpt
+        self.assertTrue(excerpt.startswith('Жирный текст & ссылка слово0'))
+        self.assertNotIn('<', excerpt)
+        self.assertEqual(len(excerpt.split()), EXCERPT_WORDS + 1)
+        self.assertTrue(excerpt.endswith('…'))
+
+    def test_list_does_not_load_content(self):
+        with (
+            CaptureQueriesContext(connection) as queries,
+            mock.patch('core.models.render_markdown') as render,
+        ):
+            response = self.client.get(reverse('article_list'))
+        self.assertContains(response, 'Жирный текст &amp; ссылка')
+        render.assert_not_called()
+        article_queries = [query['sql'] for query in queries if 'FROM "core_article"' in query['sql']]
+        self.assertTrue(article_queries)
+        for sql in article_queries:
+            self.assertNotIn('"core_article"."content"', sql)
+
+
+class StemmerTests(SimpleTestCase):
+    """Русский стеммер и подготовка запросов для FTS5 (core.search)."""
+
+    def test_word_forms_share_stem(self):
+        for forms in (
+            ('настройка', 'настройки', 'настройку', 'настройкой'),
+            ('сеть', 'сети', 'сетей', 'сетями'),
+            ('защищенный', 'защищенная', 'защищенных'),
+        ):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({search.stem(word) for word in forms}), 1)
+
+    def test_short_latin_and_numbers_unchanged(self):
+        self.assertEqual(search.stem('MikroTik'), 'mikrotik')
+        self.assertEqual(search.stem('2024'), '2024')
+        self.assertEqual(search.stem('ip'), 'ip')
+
+    def test_yo_is_normalized(self):
+        self.assertEqual(search.stem('ёлка'), search.stem('елка'))
+
+    def test_tokenize_drops_stop_words(self):
+        self.assertEqual(search.tokenize('Настройка и защита сети'), [
+            search.stem('настройка'), search.stem('защита'), search.stem('сети'),
+        ])
+
+    def test_match_expression_is_escaped(self):
+        # Кавычки и операторы FTS5 из запроса становятся обычными термами
+        self.assertEqual(search.build_match_expression('"роутер'), '"роутер"*')
+        self.assertEqual(
+            search.build_match_expression('роутер OR NEAR(сеть)'),
+            '"роутер"* AND "or"* AND "near"* AND "%s"*' % search.stem('сеть'),
+        )
+        self.assertEqual(search.build_match_expression('и или'), '')
+        self.assertEqual(
+            search.build_match_expression('сети', fields=('title',)),
+            '{title} : ("%s"*)' % search.stem('сети'),
+        )
+
+
+class FillAfterMigrateTests(TestCase):
+    """Заполнение пустых производных таблиц после migrate (core.signals.fill_derived_data)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.category = Category.objects.create(name='Сети', slug='fill-category')
+            cls.tag = Tag.objects.create(name='Роутеры', slug='fill-tag')
+            cls.article = Article.objects.create(
+                title='Настройка маршрутизатора', slug='fill-after-migrate', content='Текст', is_published=True,
+                category=cls.category,
+            )
+            cls.article.tags.add(cls.tag)
+            cls.similar = Article.objects.create(
+                title='Настройка маршрутизатора дома', slug='fill-after-migrate-similar', content='Текст',
+                is_published=True,
+            )
+            for number, title in enumerate(('Резервное копирование баз', 'Облачное хранилище файлов')):
+                Article.objects.create(title=title, slug=f'fill-other-{number}', content='Текст', is_published=True)
+        # Похожие статьи считает воркер; здесь таблица заполняется сразу
+        similarity.rebuild()
+
+    def migrate(self):
+        stdout = StringIO()
+        signals.fill_derived_data(sender=apps.get_app_config('core'), using='default', stdout=stdout)
+        return stdout.getvalue()
+
+    @skipUnless(search.is_available(), "FTS5-индекс есть только у SQLite.")
+    def test_empty_search_index_is_filled(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        self.assertEqual(search.search_article_ids('маршрутизаторы'), [])
+        self.assertIn('поисковый индекс (4)', self.migrate())
+        self.assertEqual(set(search.search_article_ids('маршрутизаторы')), {self.article.pk, self.similar.pk})
+
+    def test_empty_tag_counts_are_filled(self):
+        Tag.objects.update(published_count=0)
+        Category.objects.update(published_count=0)
+        CategoryTagCount.objects.all().delete()
+        self.assertIn('счетчики тегов (1)', self.migrate())
+        self.assertEqual(Tag.objects.get(pk=self.tag.pk).published_count, 1)
+        self.assertEqual(Category.objects.get(pk=self.category.pk).published_count, 1)
+        self.assertTrue(CategoryTagCount.objects.filter(category=self.category, tag=self.tag, count=1).exists())
+
+    def test_empty_related_articles_are_filled(self):
+        RelatedArticle.objects.all().delete()
+        self.assertIn('похожие статьи (2)', self.migrate())
+        self.assertEqual(list(self.article.related_links.values_list('related_id', flat=True)), [self.similar.pk])
+
+    def test_filled_tables_are_kept(self):
+        with (
+            mock.patch.object(search, 'rebuild_index') as rebuild_index,
+            mock.patch.object(tag_stats, 'rebuild') as rebuild_tag_stats,
+            mock.patch.object(similarity, 'rebuild') as rebuild_related,
+        ):
+            self.assertEqual(self.migrate(), '')
+        rebuild_index.assert_not_called()
+        rebuild_tag_stats.assert_not_called()
+        rebuild_related.assert_not_called()
+
+
+class AutocompleteTests(TestCase):
+    """Индекс "живого" поиска в памяти (core.autocomplete)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            tag = Tag.objects.create(name='Маршрутизаторы', slug='autocomplete-routers')
+            cls.setup = Article.objects.create(
+                title='Настройка роутера дома', slug='autocomplete-setup', content='Текст', is_published=True,
+            )
+            cls.setup.tags.add(tag)
+            cls.router = Article.objects.create(
+                title='Роутер для офиса', slug='autocomplete-router', content='Текст', is_published=True,
+            )
+            Article.objects.create(
+                title='Роутер-черновик', slug='autocomplete-draft', content='Текст', is_published=False,
+            )
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.index.invalidate()
+        self.addCleanup(autocomplete.index.invalidate)
+
+    def titles(self, query):
+        return [result['title'] for result in autocomplete.index.search(query)]
+
+    def test_prefix_search_and_ranking(self):
+        # Заголовок, начинающийся с запроса, выше совпадения в середине заголовка
+        self.assertEqual(self.titles('роут'), ['Роутер для офиса', 'Настройка роутера дома'])
+        self.assertEqual(self.titles('нас роу'), ['Настройка роутера дома'])
+        self.assertEqual(self.titles('маршрут'), ['Настройка роутера дома'])
+        self.assertEqual(self.titles('коммутатор'), [])
+
+    def test_api_reads_index_without_queries(self):
+        url = reverse('api_v1_article_search')
+        self.client.get(url, {'q': 'настр'})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'q': 'роутер'})
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_saved_article_is_found(self):
+        self.titles('роут')
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(title='Роутеры: обзор', slug='autocomplete-new', content='Текст', is_published=True)
+        with self.assertNumQueries(0):
+            self.assertIn('Роутеры: обзор', self.titles('роут'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.router.delete()
+        self.assertNotIn('Роутер для офиса', self.titles('роут'))
+
+
+class CursorTests(SimpleTestCase):
+    """Курсор keyset-пагинации (core.pagination)."""
+
+    def test_round_trip(self):
+        article = Article(pk=42, published_date=timezone.now())
+        self.assertEqual(decode_cursor(encode_cursor(article)), (article.published_date, 42))
+
+    def test_cursor_has_no_padding(self):
+        article = Article(pk=1, published_date=timezone.now())
+        self.assertNotIn('=', encode_cursor(article))
+
+    def test_broken_cursor(self):
+        for cursor in ('', None, 'не-base64', 'bm90LWEtY3Vyc29y', 'MjAyNC0wMS0wMXx4'):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class QueryBudgetTests(TestCase):
+    """
+    Число SQL-запросов публичных страниц. Оно не должно зависеть от числа
+    статей на странице: N+1 сразу изменит счетчик. Первый запрос каждой
+    страницы — проверка ETag/Last-Modified (core.conditional). Страница
+    запрашивается дважды: первый раз прогревает кеши процесса (Site, индекс
+    автодополнения, число статей для пагинации).
+    """
+
+    # Больше размера страницы, чтобы N+1 было заметно
+    ARTICLES_COUNT = 12
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Карта сайта из тестовых данных собирается во временный каталог
+        cls.sitemap_dir = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(SITEMAP_DIR=cls.sitemap_dir))
+        cls.addClassCleanup(shutil.rmtree, cls.sitemap_dir, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='query-budget-author', first_name='Иван', last_name='Петров')
+        cls.category = Category.objects.create(name='Бюджет запросов', slug='query-budget')
+        cls.tags = [Tag.objects.create(name=f'Бюджет {i}', slug=f'query-budget-{i}') for i in range(4)]
+        cls.articles = []
+        for i in range(cls.ARTICLES_COUNT):
+            article = Article.objects.create(
+                title=f'Проверка бюджета запросов {i}',
+                slug=f'query-budget-article-{i}',
+                content=f'## Раздел {i}\n\nТекст статьи для проверки бюджета запросов.',
+                is_published=True,
+                author=author,
+                category=cls.category,
+            )
+            article.tags.set(cls.tags)
+            cls.articles.append(article)
+        cls.service = Service.objects.create(
+            title='Бюджет запросов', slug='query-budget-service', short_description='Тест'
+        )
+        cls.page = Page.objects.create(title='Бюджет запросов', slug='query-budget-page', content='Текст')
+
+    def assertQueries(self, count, url, **headers):
+        self.client.get(url, **headers)
+        with self.assertNumQueries(count):
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_home(self):
+        self.assertQueries(2, reverse('home'))
+
+    def test_service_detail(self):
+        self.assertQueries(2, self.service.get_absolute_url())
+
+    def test_page(self):
+        self.assertQueries(2, self.page.get_absolute_url())
+
+    def test_article_list(self):
+        self.assertQueries(3, reverse('article_list'))
+
+    def test_article_list_htmx(self):
+        self.assertQueries(2, reverse('article_list'), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def test_article_list_search(self):
+        self.assertQueries(4, reverse('article_list') + '?q=бюджет')
+
+    def test_article_detail(self):
+        self.assertQueries(4, self.articles[0].get_absolute_url())
+
+    def test_article_category(self):
+        self.assertQueries(4, self.category.get_absolute_url())
+
+    def test_article_tag(self):
+        self.assertQueries(4, self.tags[0].get_absolute_url())
+
+    def test_search_api(self):
+        self.assertQueries(0, reverse('api_v1_article_search') + '?q=провер')
+
+    def test_sitemap(self):
+        # Готовые файлы (core.sitemap_files): первый запрос их собирает, дальше база не нужна
+        self.assertQueries(0, '/sitemap.xml')
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class PageCacheTests(TestCase):
+    """Кеш страниц (core.page_cache) и его сброс по версиям после коммита (core.cache_versions)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.tag = Tag.objects.create(name='Кеш', slug='page-cache')
+            cls.article = Article.objects.create(
+                title='Кешированная статья', slug='page-cache-article', content='Текст', is_published=True,
+                author=User.objects.create(username='page-cache-author'),
+            )
+
+    def setUp(self):
+        caches['pages'].clear()
+        cache.clear()
+
+    def save_article(self, **changes):
+        for field, value in changes.items():
+            setattr(self.article, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.save()
+
+    def test_cached_page_is_served_without_queries(self):
+        url = self.article.get_absolute_url()
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Кешированная статья')
+
+    def test_saved_article_is_rendered_again(self):
+        detail_url, list_url = self.article.get_absolute_url(), reverse('article_list')
+        self.client.get(detail_url)
+        self.client.get(list_url)
+        self.save_article(title='Новый заголовок')
+        self.assertContains(self.client.get(detail_url), 'Новый заголовок')
+        self.assertContains(self.client.get(list_url), 'Новый заголовок')
+
+    def test_versions_change_once_after_commit(self):
+        before = cache_versions.get_version('articles')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.article.title = 'Черновик правки'
+            self.article.save()
+            self.article.tags.add(self.tag)
+            # До коммита параллельные запросы еще видят старые строки
+            self.assertEqual(cache_versions.get_version('articles'), before)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(cache_versions.get_version('articles'), before + 1)
+
+    def test_rollback_keeps_versions(self):
+        before = cache_versions.get_version('articles')
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.article.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(cache_versions.get_version('articles'), before)
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class ConditionalGetTests(TestCase):
+    """Ответы 304 по ETag и Last-Modified (core.conditional)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.category = Category.objects.create(name='Условные запросы', slug='conditional')
+            cls.older = Article.objects.create(
+                title='Старая статья', slug='conditional-older', content='Текст', is_published=True,
+                category=cls.category,
+            )
+            cls.newer = Article.objects.create(
+                title='Новая статья', slug='conditional-newer', content='Текст', is_published=True,
+                category=cls.category,
+            )
+        # Самая свежая статья заметно новее: после ее удаления максимум updated_date уходит назад
+        Article.objects.filter(pk=cls.older.pk).update(updated_date=timezone.now() - timedelta(days=30))
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (reverse('article_list'), self.category.get_absolute_url())
+
+    def change(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+
+    def assertModifiedSince(self, change):
+        validators = {}
+        for url in self.urls:
+            response = self.client.get(url)
+            validators[url] = response.headers['Last-Modified']
+            self.assertEqual(
+                self.client.get(url, HTTP_IF_MODIFIED_SINCE=validators[url]).status_code, 304
+            )
+        self.change(change)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=validators[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_matching_etag(self):
+        response = self.client.get(self.urls[0])
+        etag = response.headers['ETag']
+        self.assertEqual(self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.change(lambda: self.newer.save())
+        self.assertEqual(self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_delete_newest_article(self):
+        self.assertModifiedSince(lambda: self.newer.delete())
+
+    def test_unpublish_newest_article(self):
+        def unpublish():
+            self.newer.is_published = False
+            self.newer.save()
+        self.assertModifiedSince(unpublish)
+
+    def test_rename_category(self):
+        def rename():
+            self.category.name = 'Переименованная категория'
+            self.category.save()
+        self.assertModifiedSince(rename)
+        self.assertContains(self.client.get(self.urls[0]), 'Переименованная категория')
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class SiteContextTests(TestCase):
+    """Общий контекст сайта (core.context_processors) и фрагменты шапки и статьи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.author = User.objects.create(username='site-context-author', first_name='Анна', last_name='Иванова')
+            cls.article = Article.objects.create(
+                title='Статья с автором', slug='site-context-article', content='Текст', is_published=True,
+                author=cls.author,
+            )
+
+    def setUp(self):
+        cache.clear()
+        fragment_tags.clear()
+
+    def test_context_is_built_once_per_version(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            context_processors.get_site_context()
+        with self.captureOnCommitCallbacks(execute=True):
+            Site.objects.update_or_create(pk=settings.SITE_ID, defaults={'domain': 'example.org'})
+        self.assertEqual(context_processors.get_site_context()['site'].domain, 'example.org')
+
+    def test_menu_links_are_fixed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Page.objects.create(title='Вакансии', slug='jobs', content='Текст', is_published=True)
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, f'href="{reverse("page_view", args=["about"])}"', count=2)
+        self.assertContains(response, f'href="{reverse("page_view", args=["contacts"])}"', count=2)
+        self.assertNotContains(response, 'Вакансии')
+
+    def test_article_head_follows_author_name(self):
+        url = self.article.get_absolute_url()
+        self.assertContains(self.client.get(url), 'content="Анна Иванова"')
+        # Пользователь не входит ни в одну версию: ключ фрагмента включает имя автора
+        self.author.first_name = 'Мария'
+        self.author.save()
+        self.assertContains(self.client.get(url), 'content="Мария Иванова"')
+
+
+@override_settings(PAGE_CACHE_ENABLED=True, THUMBNAIL_QUEUE_ENABLED=True)
+class RenditionTests(TestCase):
+    """Оригинал вместо <picture>, пока воркер не создал варианты (core.renditions, core.thumbnails)."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        caches['pages'].clear()
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service = Service.objects.create(
+                title='Услуга с картинкой', slug='rendition-service', short_description='Описание',
+                original_image=self.make_image('service.png'),
+            )
+
+    @staticmethod
+    def make_image(name):
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 800), 'navy').save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def get_home(self):
+        # Рендер не опрашивает хранилище: готовность вариантов записана в объекте
+        with mock.patch.object(FileSystemStorage, 'exists', side_effect=AssertionError):
+            return self.client.get(reverse('home'))
+
+    def test_original_until_worker_runs(self):
+        response = self.get_home()
+        self.assertContains(response, self.service.original_image.url)
+        self.assertNotContains(response, '<picture>')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(thumbnails.process_jobs(), (1, 0))
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.thumbnails_source, self.service.original_image.name)
+        response = self.get_home()
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, 'type="image/avif"')
+
+    def test_new_image_falls_back_to_original(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            thumbnails.process_jobs()
+            self.service.refresh_from_db()
+            self.service.original_image = self.make_image('replaced.png')
+            self.service.save()
+        response = self.get_home()
+        self.assertContains(response, self.service.original_image.url)
+        self.assertNotContains(response, '<picture>')
+
+
+class TagStatsTests(TestCase):
+    """Счетчики тегов и категорий, которые сигналы поддерживают по разнице снимков (core.tag_stats)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Сети', slug='networks')
+        cls.other_category = Category.objects.create(name='Телефония', slug='telephony')
+        cls.tags = [Tag.objects.create(name=f'Тег {i}', slug=f'tag-{i}') for i in range(3)]
+
+    def create_article(self, slug, tags, is_published=True, category=None):
+        article = Article.objects.create(
+            title=slug, slug=slug, content='Текст', is_published=is_published,
+            category=category or self.category,
+        )
+        article.tags.set(tags)
+        return article
+
+    def counts(self):
+        return {
+            'tags': dict(Tag.objects.filter(published_count__gt=0).values_list('slug', 'published_count')),
+            'categories': dict(
+                Category.objects.filter(published_count__gt=0).values_list('slug', 'published_count')
+            ),
+            'pairs': dict(
+                ((tag, related), count) for tag, related, count in
+                TagCooccurrence.objects.values_list('tag__slug', 'related_tag__slug', 'count')
+            ),
+            'category_tags': dict(
+                ((category, tag), count) for category, tag, count in
+                CategoryTagCount.objects.values_list('category__slug', 'tag__slug', 'count')
+            ),
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.counts()
+        tag_stats.rebuild()
+        self.assertEqual(incremental, self.counts())
+
+    def test_publish_adds_counts(self):
+        self.create_article('first', self.tags[:2])
+        counts = self.counts()
+        self.assertEqual(counts['tags'], {'tag-0': 1, 'tag-1': 1})
+        self.assertEqual(counts['categories'], {'networks': 1})
+        self.assertEqual(counts['pairs'][('tag-0', 'tag-1')], 1)
+        self.assertEqual(counts['pairs'][('tag-0', 'tag-0')], 1)
+        self.assertEqual(counts['category_tags'], {('networks', 'tag-0'): 1, ('networks', 'tag-1'): 1})
+        self.assertMatchesRebuild()
+
+    def test_drafts_are_not_counted(self):
+        self.create_article('draft', self.tags, is_published=False)
+        self.assertEqual(self.counts(), {'tags': {}, 'categories': {}, 'pairs': {}, 'category_tags': {}})
+
+    def test_unpublish_and_delete_remove_counts(self):
+        first = self.create_article('first', self.tags[:2])
+        second = self.create_article('second', self.tags[1:])
+        first.is_published = False
+        first.save()
+        self.assertEqual(self.counts()['tags'], {'tag-1': 1, 'tag-2': 1})
+        second.delete()
+        self.assertEqual(self.counts(), {'tags': {}, 'categories': {}, 'pairs': {}, 'category_tags': {}})
+
+    def test_tag_and_category_changes(self):
+        article = self.create_article('first', self.tags[:2])
+        self.create_article('second', self.tags[:1])
+        article.tags.remove(self.tags[0])
+        article.tags.add(self.tags[2])
+        article.category = self.other_category
+        article.save()
+        self.tags[1].posts.clear()
+        self.assertMatchesRebuild()
+        self.assertEqual(self.counts()['tags'], {'tag-0': 1, 'tag-2': 1})
+
+
+class RelatedArticlesTests(TestCase):
+    """Похожие статьи (core.similarity): порядок и пересчет только затронутых статей."""
+
+    TITLES = {
+        'mikrotik-vpn': 'Настройка VPN на MikroTik',
+        'mikrotik-firewall': 'Файрвол MikroTik для офиса',
+        'mikrotik-wifi': 'Wi-Fi на MikroTik: роуминг',
+        'backup-postgres': 'Резервное копирование PostgreSQL',
+        'backup-files': 'Резервное копирование файлов сервера',
+        'printer': 'Сетевой принтер в офисе',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.tag = Tag.objects.create(name='MikroTik', slug='related-mikrotik')
+            cls.articles = {}
+            for slug, title in cls.TITLES.items():
+                cls.articles[slug] = Article.objects.create(
+                    title=title, slug=slug, content=f'{title}. Пошаговая инструкция.', is_published=True,
+                )
+                if slug.startswith('mikrotik'):
+                    cls.articles[slug].tags.add(cls.tag)
+
+    def setUp(self):
+        similarity.reset_corpus()
+        self.addCleanup(similarity.reset_corpus)
+        similarity.rebuild()
+        RelatedArticleJob.objects.all().delete()
+
+    def related(self, slug):
+        return list(self.articles[slug].related_links.order_by('rank').values_list('related__slug', flat=True))
+
+    def assertMatchesFullRebuild(self):
+        expected = {slug: self.related(slug) for slug in self.articles}
+        similarity.reset_corpus()
+        similarity.rebuild()
+        self.assertEqual({slug: self.related(slug) for slug in self.articles}, expected)
+
+    def test_same_topic_ranks_first(self):
+        self.assertEqual(set(self.related('mikrotik-vpn')[:2]), {'mikrotik-firewall', 'mikrotik-wifi'})
+        self.assertEqual(self.related('backup-postgres')[0], 'backup-files')
+
+    def test_update_reads_only_changed_articles(self):
+        article = self.articles['printer']
+        article.title = 'Резервное копирование принтера'
+        with mock.patch.object(similarity, 'load_documents', wraps=similarity.load_documents) as load:
+            article.save()
+            self.assertEqual(similarity.process_jobs(), 1)
+        load.assert_called_once_with({article.pk})
+        self.assertIn('backup-files', self.related('printer'))
+        self.assertIn('printer', self.related('backup-files'))
+        self.assertMatchesFullRebuild()
+
+    def test_deleted_article_leaves_lists(self):
+        self.articles['mikrotik-wifi'].delete()
+        similarity.process_jobs()
+        self.assertNotIn('mikrotik-wifi', self.related('mikrotik-vpn'))
+        self.assertNotIn(self.articles['mikrotik-wifi'].pk, similarity._corpus[0].documents)
+
+    def test_incremental_corpus_equals_full(self):
+        documents = similarity.load_documents()
+        corpus = similarity.Corpus(documents)
+        changed = self.articles['printer'].pk
+        documents[changed] = Counter({'резервн': 3.0, 'принтер': 3.0})
+        del documents[self.articles['mikrotik-wifi'].pk]
+        corpus.update(documents, [changed, self.articles['mikrotik-wifi'].pk])
+        full = similarity.Corpus(documents)
+        self.assertEqual(corpus.vectors.keys(), full.vectors.keys())
+        for article_id, vector in full.vectors.items():
+            self.assertEqual(corpus.vectors[article_id].keys(), vector.keys())
+            for term, weight in vector.items():
+                self.assertAlmostEqual(corpus.vectors[article_id][term], weight)
+
+
+# --- Планы запросов ---
+
+# Таблицы, которые растут вместе с количеством статей: полный проход по ним
+# или сортировка во временном B-дереве на большом сайте недопустимы.
+# Маленькие справочники (услуги, страницы, категории, теги, сайты) не проверяются.
+LARGE_TABLES = (
+    'core_article',
+    'core_article_tags',
+    'core_relatedarticle',
+    'core_tagcooccurrence',
+    'core_categorytagcount',
+)
+
+# Выборки из больших таблиц, которые заведомо возвращают несколько строк:
+# теги и похожие статьи одной статьи, счетчики одного тега или категории
+# (их не больше, чем тегов). Такие строки можно сортировать.
+BOUNDED_LOOKUPS = {
+    'core_article_tags': '(article_id=?)',
+    'core_relatedarticle': '(article_id=?)',
+    'core_tagcooccurrence': '(tag_id=?)',
+    'core_categorytagcount': '(category_id=?)',
+}
+
+
+def reads_large_table(step):
+    """Шаг плана читает большую таблицу (не считая выборок из BOUNDED_LOOKUPS)."""
+    words = step.split()
+    if words[0] not in ('SCAN', 'SEARCH') or words[1] not in LARGE_TABLES:
+        return False
+    bounded = BOUNDED_LOOKUPS.get(words[1])
+    return not (words[0] == 'SEARCH' and bounded and step.endswith(bounded))
+
+
+def find_bad_steps(plan):
+    """
+    Шаги плана с полным проходом по большой таблице и сортировки во временном
+    B-дереве в тех (под)запросах, которые читают большую таблицу.
+    plan — строки EXPLAIN QUERY PLAN: (id, parent, notused, detail).
+    """
+    bad = []
+    siblings = {}
+    for _, parent, _, step in plan:
+        siblings.setdefault(parent, []).append(step)
+    for steps in siblings.values():
+        sorts_large = any(reads_large_table(step) for step in steps)
+        for step in steps:
+            if step.startswith('SCAN ') and ' USING ' not in step and reads_large_table(step):
+                bad.append(step)
+            elif step.startswith('USE TEMP B-TREE') and sorts_large:
+                bad.append(step)
+    return bad
+
+
+@skipUnless(connection.vendor == 'sqlite', "Проверка планов написана для SQLite (EXPLAIN QUERY PLAN).")
+@override_settings(PAGE_CACHE_ENABLED=False)
+class QueryPlanTests(TestCase):
+    """
+    Планы запросов публичных страниц на большом наборе статей: запрос к
+    большой таблице не должен читать ее целиком или сортировать во временном
+    B-дереве — обычно это значит, что не хватает индекса.
+    """
+
+    ARTICLES_COUNT = 2000
+    CATEGORIES_COUNT = 20
+    TAGS_COUNT = 200
+    TAGS_PER_ARTICLE = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        author = User.objects.create(username='query-plan-author')
+        categories = Category.objects.bulk_create(
+            Category(name=f'План запросов {i}', slug=f'query-plan-{i}') for i in range(cls.CATEGORIES_COUNT)
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'План {i}', slug=f'query-plan-{i}') for i in range(cls.TAGS_COUNT)
+        )
+        articles = Article.objects.bulk_create(
+            (
+                Article(
+                    title=f'Проверка плана запросов {i}',
+                    slug=f'query-plan-article-{i}',
+                    content='Текст',
+                    content_html='<p>Текст</p>',
+                    excerpt='Текст',
+                    is_published=rng.random() < 0.9,
+                    author=author,
+                    category=rng.choice(categories),
+                )
+                for i in range(cls.ARTICLES_COUNT)
+            ),
+            batch_size=500,
+        )
+        # bulk_create ставит всем одну и ту же дату (auto_now_add); разносим статьи во времени
+        now = timezone.now()
+        for i, article in enumerate(articles):
+            article.published_date = now - timedelta(hours=i)
+            article.updated_date = article.published_date + timedelta(hours=rng.randrange(0, 1000))
+        Article.objects.bulk_update(articles, ['published_date', 'updated_date'], batch_size=500)
+
+        Article.tags.through.objects.bulk_create(
+            (
+                Article.tags.through(article_id=article.pk, tag_id=tag.pk)
+                for article in articles
+                for tag in rng.sample(tags, cls.TAGS_PER_ARTICLE)
+            ),
+            batch_size=1000,
+        )
+        RelatedArticle.objects.bulk_create(
+            (
+                RelatedArticle(article=article, related=rng.choice(articles), rank=rank, score=0.5)
+                for article in articles
+                for rank in range(1, 5)
+            ),
+            batch_size=1000,
+        )
+        tag_stats.rebuild()
+        with connection.cursor() as cursor:
+            # Статистика для планировщика, как на живой базе после ANALYZE
+            cursor.execute('ANALYZE')
+
+        # Статьи созданы от новых к старым, поэтому порядок списка совпадает с порядком создания
+        published = [article for article in articles if article.is_published]
+        list_url = reverse('article_list')
+        cls.urls = {
+            'article_list': list_url,
+            'article_list (курсор)': f'{list_url}?cursor={encode_cursor(published[ARTICLES_PER_PAGE * 2 - 1])}',
+            'article_list (страница)': f'{list_url}?page=3',
+            'article_detail': published[len(published) // 2].get_absolute_url(),
+            'article_category': categories[0].get_absolute_url(),
+            'article_tag': tags[0].get_absolute_url(),
+        }
+
+    def test_find_bad_steps(self):
+        plan = [
+            (2, 0, 0, 'SCAN core_article'),
+            (5, 0, 0, 'SEARCH core_article_tags USING INDEX x (article_id=?)'),
+            (9, 0, 0, 'USE TEMP B-TREE FOR ORDER BY'),
+        ]
+        self.assertEqual(find_bad_steps(plan), ['SCAN core_article', 'USE TEMP B-TREE FOR ORDER BY'])
+        self.assertEqual(find_bad_steps([(2, 0, 0, 'SCAN core_article USING INDEX article_published_feed_idx')]), [])
+
+    def test_public_pages_use_indexes(self):
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                # Первый запрос прогревает кеши (число статей для номерной пагинации и т.п.)
+                self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                for query in queries.captured_queries:
+                    if not query['sql'].startswith('SELECT'):
+                        continue
+                    with connection.cursor() as cursor:
+                        cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                        plan = cursor.fetchall()
+                    self.assertEqual(find_bad_steps(plan), [], f"{query['sql']}\n{[row[-1] for row in plan]}")
+
+
+class SqlitePragmaTests(TestCase):
+    """Настройки SQLite (SQLITE_PRAGMAS) применяются к каждому новому соединению."""
+
+    def test_new_connection_gets_pragmas(self):
+        # Тестовая база живет в памяти, где WAL невозможен, поэтому открываем файл
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        wrapper = type(connections['default'])({**connection.settings_dict, 'NAME': Path(directory) / 'db.sqlite3'})
+        self.addCleanup(wrapper.close)
+
+        with wrapper.cursor() as cursor:
+            def pragma(name):
+                cursor.execute(f'PRAGMA {name}')
+                return cursor.fetchone()[0]
+
+            self.assertEqual(pragma('journal_mode'), settings.SQLITE_PRAGMAS['journal_mode'])
+            self.assertEqual(pragma('synchronous'), 1)  # NORMAL
+            self.assertEqual(pragma('mmap_size'), settings.SQLITE_PRAGMAS['mmap_size'])
+            self.assertEqual(pragma('cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+            self.assertEqual(pragma('temp_store'), 2)  # MEMORY
+            self.assertEqual(pragma('busy_timeout'), int(connection.settings_dict['OPTIONS']['timeout'] * 1000))
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    """Чтение с реплики (core.db_routers) и выбор соединения в ReplicaRoutingMiddleware."""
+
+    router = PrimaryReplicaRouter()
+
+    def test_router_reads_replica_only_when_enabled(self):
+        self.assertEqual(self.router.db_for_read(Article), 'default')
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Article), 'replica')
+            self.assertEqual(self.router.db_for_write(Article), 'default')
+            # Сессии и пользователи — всегда из основной базы
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            # Внутри транзакции реплика не видит незакоммиченных изменений
+            with mock.patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertEqual(self.router.db_for_read(Article), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+
+    def test_middleware_pins_primary_after_write(self):
+        def get_response(request):
+            response = HttpResponse()
+            response.db = self.router.db_for_read(Article)
+            return response
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        factory = RequestFactory()
+
+        self.assertEqual(middleware(factory.get('/')).db, 'replica')
+        response = middleware(factory.post('/'))
+        self.assertEqual(response.db, 'default')
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+        request = factory.get('/')
+        request.COOKIES[PIN_COOKIE_NAME] = '1'
+        self.assertEqual(middleware(request).db, 'default')
+
+
+@override_settings(SITEMAP_QUEUE_ENABLED=True)
+class SitemapFilesTests(TestCase):
+    """Карта сайта в файлах (core.sitemap_files) и очередь ее пересборки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.article = Article.objects.create(
+                title='Статья в карте сайта', slug='sitemap-article', content='Текст', is_published=True,
+            )
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.enterContext(override_settings(SITEMAP_DIR=self.directory))
+        sitemap_files.build()
+
+    def article_urls(self):
+        path = self.directory / sitemap_files.page_filename('articles', 1)
+        return gzip.decompress(path.read_bytes()).decode('utf-8')
+
+    def create_article(self, slug):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Article.objects.create(title='Новая статья', slug=slug, content='Текст', is_published=True)
+
+    def test_saved_article_is_added_by_worker(self):
+        self.assertIn(self.article.get_absolute_url(), self.article_urls())
+        article = self.create_article('sitemap-new')
+        # Сохранение только ставит разделы в очередь
+        self.assertNotIn(article.get_absolute_url(), self.article_urls())
+        self.assertEqual(sitemap_files.process_jobs(), 2)
+        self.assertIn(article.get_absolute_url(), self.article_urls())
+        self.assertFalse(SitemapJob.objects.exists())
+
+    def test_rollback_drops_jobs(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Article.objects.create(title='Откат', slug='sitemap-rollback', content='Текст', is_published=True)
+            raise RuntimeError
+        self.assertFalse(SitemapJob.objects.exists())
+
+    @override_settings(SITEMAP_QUEUE_ENABLED=False)
+    def test_build_error_does_not_fail_save(self):
+        with (
+            mock.patch.object(sitemap_files, 'update', side_effect=OSError("Нет места на диске")),
+            self.assertLogs('core.sitemap_files', 'ERROR'),
+        ):
+            article = self.create_article('sitemap-error')
+        self.assertTrue(Article.objects.filter(pk=article.pk).exists())
+
+    @override_settings(SITEMAP_QUEUE_ENABLED=False)
+    def test_without_queue_rebuilds_after_commit(self):
+        article = self.create_article('sitemap-sync')
+        self.assertIn(article.get_absolute_url(), self.article_urls())
+
+
+@override_settings(PAGE_CACHE_ENABLED=True, ALLOWED_HOSTS=['testserver'])
+class PrerenderTests(TestCase):
+    """Экспорт страниц в файлы (core.prerender)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            Site.objects.update_or_create(pk=settings.SITE_ID, defaults={'domain': 'export.example'})
+            cls.article = Article.objects.create(
+                title='Экспортируемая статья', slug='prerender-article', content='Текст', is_published=True,
+                author=User.objects.create(username='prerender-author'),
+            )
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        sitemap_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, sitemap_dir)
+        self.enterContext(override_settings(SITEMAP_DIR=sitemap_dir))
+        cache.clear()
+        caches['pages'].clear()
+
+    def test_pages_rendered_on_site_domain(self):
+        # Домена сайта нет в ALLOWED_HOSTS, а настройки экспорт не подменяет
+        with mock.patch.object(caches['pages'], 'set') as cache_set:
+            stats = prerender.export(self.directory)
+        self.assertEqual(stats['errors'], [])
+        cache_set.assert_not_called()
+        html = prerender.output_path(self.directory, self.article.get_absolute_url()).read_text(encoding='utf-8')
+        self.assertIn('Экспортируемая статья', html)
+        self.assertIn(f'://export.example{self.article.get_absolute_url()}', html)
+        self.assertTrue((self.directory / 'sitemap.xml').exists())
+
+    def test_unchanged_pages_are_skipped(self):
+        first = prerender.export(self.directory)
+        self.assertEqual(prerender.export(self.directory)['rendered'], 0)
+        self.article.title = 'Новый заголовок'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.save()
+        stats = prerender.export(self.directory)
+        # Сама статья и список статей
+        self.assertEqual(stats['rendered'], 2)
+        self.assertEqual(stats['skipped'], first['rendered'] - 2)
+
+
+class FragmentCacheTests(SimpleTestCase):
+    """Ключи {% cached_fragment %}: значения после имени, site_version и версии namespaces."""
+
+    template = Template(
+        "{% load fragment_tags %}"
+        "{% cached_fragment 'test_fragment' value namespaces='fragment-test' %}{{ render }}{% endcached_fragment %}"
+    )
+
+    def setUp(self):
+        fragment_tags.clear()
+        self.renders = Counter()
+
+    def render(self, value='a', site_version=1):
+        def count():
+            self.renders[value] += 1
+            return self.renders[value]
+
+        return self.template.render(Context({'value': value, 'site_version': site_version, 'render': count}))
+
+    def test_key_parts_invalidate_fragment(self):
+        self.assertEqual(self.render(), '1')
+        self.assertEqual(self.render(), '1')
+        self.assertEqual(self.render(value='b'), '1')
+        self.assertEqual(self.render(site_version=2), '2')
+        cache_versions.bump_version('fragment-test')
+        self.assertEqual(self.render(site_version=2), '3')
+        self.assertEqual(self.render(value='b'), '2')
+
+    def test_least_recently_used_fragments_are_evicted(self):
+        with mock.patch.object(fragment_tags, 'FRAGMENT_CACHE_SIZE', 2):
+            self.render('a')
+            self.render('b')
+            self.render('a')
+            self.render('c')
+            self.assertEqual(self.render('a'), '1')
+            self.assertEqual(self.render('b'), '2')
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    """Прогрев шаблонов при старте воркера (core.warmup)."""
+
+    def test_templates_are_parsed_before_first_request(self):
+        engine = Engine.get_default()
+        engine.template_loaders[0].reset()
+        self.addCleanup(engine.template_loaders[0].reset)
+
+        # Проектные шаблоны и родитель переопределенного admin/base_site.html
+        project_templates = list(Path(settings.BASE_DIR, 'core', 'templates').rglob('*.html'))
+        self.assertGreater(warmup.warm_templates(), len(project_templates))
+        # После прогрева файлы шаблонов больше не читаются
+        with mock.patch.object(FilesystemLoader, 'get_contents', side_effect=AssertionError):
+            for name in ('core/article_detail.html', 'core/base.html', 'admin/base_site.html', 'admin/base.html'):
+                engine.get_template(name)
+
+
+@override_settings(PAGE_CACHE_ENABLED=False, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    """Заголовок Server-Timing и эндпоинт /metrics (core.metrics)."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.enterContext(override_settings(METRICS_DIR=directory))
+
+    def test_server_timing_counts_queries(self):
+        with self.settings(METRICS_SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('article_list')))
+        with self.settings(METRICS_SERVER_TIMING=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('article_list'))
+        self.assertIn(f'desc="{len(queries)} SQL"', response['Server-Timing'])
+        self.assertIn('template;dur=', response['Server-Timing'])
+
+    def test_metrics_endpoint_requires_token(self):
+        self.client.get(reverse('article_list'))
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+        response = self.client.get(url, headers={'Authorization': 'Bearer secret'})
+        self.assertContains(response, 'http_responses_total{view="article_list",status="200"}')
+        self.assertContains(response, 'http_request_db_queries_bucket{view="article_list",le="+Inf"}')
+        # Метрики процесса сохранены в общий каталог воркеров
+        self.assertTrue(list(Path(settings.METRICS_DIR).glob('*.json')))
+
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer secret'}).status_code, 404)
+
+
+class BenchmarkCommandsTests(TestCase):
+    """Генератор статей (generate_articles) и бенчмарк views (benchmark_views)."""
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        self.directory = directory
+        self.enterContext(override_settings(
+            MEDIA_ROOT=directory / 'media', SITEMAP_DIR=directory / 'sitemaps', METRICS_DIR=directory / 'metrics',
+        ))
+
+    def test_generated_articles_are_complete(self):
+        call_command(
+            'generate_articles', count=12, categories=2, tags=5, images=1, image_ratio=1, batch_size=5, seed=1,
+            skip_related=True, stdout=StringIO(),
+        )
+        articles = Article.objects.filter(slug__startswith='generated-')
+        self.assertEqual(articles.count(), 12)
+        # bulk_create не вызывает save(): готовые поля заполнены командой
+        self.assertFalse(articles.filter(content_html='').exists())
+        self.assertFalse(articles.filter(excerpt='').exists())
+        self.assertFalse(articles.filter(tags=None).exists())
+        self.assertEqual(ThumbnailJob.objects.count(), 12)
+        self.assertFalse(tag_stats.is_empty())
+        self.assertFalse(search.is_index_empty())
+        self.assertTrue((self.directory / 'sitemaps' / sitemap_files.INDEX_FILE).exists())
+
+    def test_benchmark_reports_regressions_against_baseline(self):
+        # Бенчмарк проходит каждый публичный маршрут: нужен хотя бы один объект каждого вида
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(
+                title='Замер', slug='benchmark-article', content='Текст', is_published=True,
+                author=User.objects.create(username='benchmark-author'),
+                category=Category.objects.create(name='Замеры', slug='benchmark'),
+            )
+            article.tags.add(Tag.objects.create(name='Замер', slug='benchmark'))
+            Service.objects.create(title='Замер', slug='benchmark-service', short_description='Тест')
+            Page.objects.create(title='Замер', slug='benchmark-page', content='Текст', is_published=True)
+        output = self.directory / 'run.json'
+        call_command('benchmark_views', requests=2, warmup=0, output=output, stdout=StringIO())
+        results = json.loads(output.read_text(encoding='utf-8'))['results']
+        self.assertIn('article_detail', results)
+        self.assertEqual({result['status'] for result in results.values()}, {200})
+
+        baseline = {name: {**result, 'queries': result['queries'] - 1} for name, result in results.items()}
+        output.write_text(json.dumps({'results': baseline}), encoding='utf-8')
+        with self.assertRaisesMessage(CommandError, 'Регрессий'):
+            call_command(
+                'benchmark_views', requests=1, warmup=0, output=self.directory / 'next.json', baseline=output,
+                threshold=100, stdout=StringIO(),
+            )
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0, PROFILING_SLOW_MS=500)
+class ProfilingSelectionTests(SimpleTestCase):
+    """Какие запросы профилирует ProfilingMiddleware."""
+
+    def setUp(self):
+        self.middleware = ProfilingMiddleware(lambda request: HttpResponse())
+        self.request = RequestFactory().get('/')
+        self.request.user = AnonymousUser()
+
+    def test_slow_threshold_profiles_only_a_sample(self):
+        with override_settings(PROFILING_SLOW_SAMPLE_RATE=0.1):
+            with mock.patch('core.middleware.random.random', return_value=0.5):
+                self.assertIsNone(self.middleware.reason(self.request))
+            with mock.patch('core.middleware.random.random', return_value=0.05):
+                self.assertEqual(self.middleware.reason(self.request), 'slow')
+
+    @override_settings(PROFILING_SLOW_MS=0, PROFILING_SLOW_SAMPLE_RATE=1)
+    def test_no_threshold_no_profiling(self):
+        self.assertIsNone(self.middleware.reason(self.request))
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class AsyncViewsTests(TestCase):
+    """Async-варианты views (core.async_views) отвечают так же, как синхронные."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.category = Category.objects.create(name='Асинхронность', slug='async-category')
+            cls.article = Article.objects.create(
+                title='Асинхронная статья', slug='async-article', content='Текст *статьи*', is_published=True,
+                category=cls.category, author=User.objects.create(username='async-author'),
+            )
+
+    def setUp(self):
+        cache.clear()
+        caches['pages'].clear()
+        self.urls = (
+            reverse('home'), reverse('article_list'), self.article.get_absolute_url(),
+            self.category.get_absolute_url(), reverse('article_list') + '?q=статья',
+        )
+
+    def get_async(self, url, **headers):
+        with override_settings(ROOT_URLCONF='myproject.asgi_urls'):
+            return async_to_sync(self.async_client.get)(url, headers=headers)
+
+    def test_same_output_as_sync(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                sync_response = self.client.get(url)
+                caches['pages'].clear()
+                async_response = self.get_async(url)
+                self.assertEqual(async_response.status_code, 200)
+                self.assertEqual(async_response.content, sync_response.content)
+                for header in ('ETag', 'Last-Modified'):
+                    self.assertEqual(async_response.headers.get(header), sync_response.headers.get(header))
+
+    def test_cache_and_not_modified(self):
+        url = self.article.get_absolute_url()
+        etag = self.get_async(url).headers['ETag']
+        with self.assertNumQueries(0):
+            self.assertContains(self.get_async(url), 'Асинхронная статья')
+        # Кеш общий с синхронными views
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(url), 'Асинхронная статья')
+        caches['pages'].clear()
+        self.assertEqual(self.get_async(url, if_none_match=etag).status_code, 304)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Склейка одинаковых одновременных запросов (core.single_flight)."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        single_flight._results.clear()
+
+    def test_concurrent_requests_share_one_response(self):
+        calls = []
+        entered, release = threading.Event(), threading.Event()
+
+        @single_flight.coalesce_requests('articles')
+        def view(request):
+            calls.append(request)
+            entered.set()
+            release.wait(5)
+            return HttpResponse('готово')
+
+        responses = []
+        leader = threading.Thread(target=lambda: responses.append(view(self.factory.get('/articles/?q=сеть'))))
+        follower = threading.Thread(target=lambda: responses.append(view(self.factory.get('/articles/?q=сеть'))))
+        leader.start()
+        self.assertTrue(entered.wait(5))
+        follower.start()
+        # Даем ожидающему запросу встать в очередь за лидером
+        time.sleep(0.2)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([response.content.decode() for response in responses], ['готово', 'готово'])
+        self.assertIsNot(responses[0], responses[1])
+        self.assertEqual(single_flight._flights, {})
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_lone_request_is_not_serialized(self):
+        @single_flight.coalesce_requests('articles')
+        def view(request):
+            return HttpResponse('ok')
+
+        with mock.patch('core.single_flight.pickle.dumps') as dumps:
+            view(self.factory.get('/articles/'))
+        dumps.assert_not_called()
+
+    def test_different_queries_are_not_coalesced(self):
+        calls = []
+
+        @single_flight.coalesce_requests('articles')
+        def view(request):
+            calls.append(request.GET['q'])
+            return HttpResponse(request.GET['q'])
+
+        with override_settings(PAGE_CACHE_ENABLED=True, SINGLE_FLIGHT_TTL=60):
+            view(self.factory.get('/articles/?q=сеть'))
+            view(self.factory.get('/articles/?q=телефония'))
+            # Повтор в пределах TTL отдается из памяти, без вызова view
+            response = view(self.factory.get('/articles/?q=сеть'))
+        self.assertEqual(calls, ['сеть', 'телефония'])
+        self.assertEqual(response.content.decode(), 'сеть')
+
+    def test_requests_with_session_are_not_shared(self):
+        calls = []
+
+        @single_flight.coalesce_requests('articles')
+        def view(request):
+            calls.append(request)
+            return HttpResponse('ok')
+
+        with override_settings(PAGE_CACHE_ENABLED=True, SINGLE_FLIGHT_TTL=60):
+            for _ in range(2):
+                request = self.factory.get('/articles/')
+                request.COOKIES['sessionid'] = 'x'
+                view(request)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(single_flight._results, {})
+
+    def test_errors_are_not_shared(self):
+        @single_flight.coalesce_requests('articles')
+        def view(request):
+            return HttpResponse('нет', status=404)
+
+        with override_settings(PAGE_CACHE_ENABLED=True, SINGLE_FLIGHT_TTL=60):
+            view(self.factory.get('/articles/missing/'))
+        self.assertEqual(single_flight._results, {})
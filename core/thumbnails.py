@@ -0,0 +1,152 @@
+# Path: core/thumbnails.py
+
+"""
+Заранее генерируемые миниатюры imagekit.
+
+По умолчанию imagekit создает миниатюру при первом обращении к ней, то есть
+Pillow режет и кодирует WEBP прямо в запросе первого посетителя, а на каждом
+рендере проверяет наличие файла в хранилище. Здесь используется другая
+стратегия: при смене original_image объект ставится в очередь (ThumbnailJob),
+а фоновый воркер (process_thumbnail_jobs) генерирует все варианты и
+записывает в поле thumbnails_source имя источника, для которого они готовы.
+Ни imagekit, ни тег {% picture %} не обращаются к хранилищу при рендере:
+пока поле не совпадает с original_image, тег выводит оригинал. Для уже
+загруженных изображений есть команда generate_thumbnails.
+"""
+
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+from imagekit.models.fields.utils import ImageSpecFileDescriptor
+
+from . import cache_versions, metrics
+from .renditions import GENERATED_FIELD
+
+logger = logging.getLogger(__name__)
+
+# После стольких неудачных попыток задание больше не берется в работу
+MAX_ATTEMPTS = 3
+
+# Версии кешей страниц, на которых выводятся варианты изображений модели:
+# после генерации страницы перерисовываются уже с <picture>
+PAGE_NAMESPACES = {
+    'core.Service': 'services',
+    'core.Article': 'articles',
+}
+
+
+def spec_fields(model):
+    """Имена ImageSpecField модели и поле-источник для каждого."""
+    return {
+        name: attr.source_field_name
+        for name, attr in vars(model).items()
+        if isinstance(attr, ImageSpecFileDescriptor)
+    }
+
+
+def models_with_specs():
+    return [model for model in apps.get_app_config('core').get_models() if spec_fields(model)]
+
+
+def generate_for(instance, force=False):
+    """
+    Генерирует все миниатюры объекта и отмечает источник как обработанный.
+    Возвращает число обработанных вариантов.
+    """
+    count = 0
+    sources = set()
+    for name, source_field in spec_fields(type(instance)).items():
+        if not getattr(instance, source_field):
+            continue
+        with metrics.track('imagekit'):
+            getattr(instance, name).generate(force=force)
+        sources.add(getattr(instance, source_field).name)
+        count += 1
+    if len(sources) == 1:
+        mark_generated(instance, sources.pop())
+    return count
+
+
+def mark_generated(instance, source_name):
+    """
+    Запоминает имя источника, для которого созданы варианты. Пишется одним
+    UPDATE, без save(): сигналы сохранения (индексы, карта сайта) здесь не нужны.
+    """
+    model = type(instance)
+    if not hasattr(instance, GENERATED_FIELD) or getattr(instance, GENERATED_FIELD) == source_name:
+        return
+    model._default_manager.filter(pk=instance.pk).update(**{GENERATED_FIELD: source_name})
+    setattr(instance, GENERATED_FIELD, source_name)
+    namespace = PAGE_NAMESPACES.get(instance._meta.label)
+    if namespace:
+        cache_versions.bump_on_commit(namespace)
+
+
+def enqueue(instance):
+    """
+    Ставит объект в очередь одним запросом. Повторная постановка обновляет
+    время задания и сбрасывает счетчик попыток.
+    """
+    from .models import ThumbnailJob
+
+    ThumbnailJob.objects.bulk_create(
+        [ThumbnailJob(model_label=instance._meta.label, object_id=instance.pk, created_at=timezone.now())],
+        update_conflicts=True,
+        unique_fields=['model_label', 'object_id'],
+        update_fields=['created_at', 'attempts', 'last_error'],
+    )
+
+
+def process_jobs(limit=None):
+    """
+    Выполняет задания из очереди (от старых к новым).
+    Возвращает пару (выполнено, с ошибкой).
+    """
+    from .models import ThumbnailJob
+
+    jobs = ThumbnailJob.objects.filter(attempts__lt=MAX_ATTEMPTS)
+    if limit:
+        jobs = jobs[:limit]
+    done = failed = 0
+    for job in list(jobs):
+        try:
+            model = apps.get_model(job.model_label)
+            instance = model._default_manager.filter(pk=job.object_id).first()
+            if instance is not None:
+                generate_for(instance)
+        except Exception as exc:
+            logger.exception("Не удалось создать миниатюры для %s", job)
+            ThumbnailJob.objects.filter(pk=job.pk).update(
+                attempts=job.attempts + 1, last_error=str(exc),
+            )
+            failed += 1
+            continue
+        # Если за время генерации картинку снова заменили, задание остается в очереди
+        ThumbnailJob.objects.filter(pk=job.pk, created_at=job.created_at).delete()
+        done += 1
+    return done, failed
+
+
+class QueuedOptimistic:
+    """
+    Стратегия imagekit: миниатюры генерируются в фоне после сохранения
+    источника, imagekit не проверяет наличие файла в хранилище.
+    Без очереди (THUMBNAIL_QUEUE_ENABLED = False) генерирует сразу при сохранении.
+    """
+
+    def on_source_saved(self, file):
+        # Сигнал приходит для каждого варианта (у услуги их два десятка):
+        # объект обрабатывается один раз на новый файл источника
+        source = file.generator.source
+        if getattr(source.instance, '_thumbnails_queued_for', None) == source.name:
+            return
+        source.instance._thumbnails_queued_for = source.name
+        if not settings.THUMBNAIL_QUEUE_ENABLED:
+            generate_for(source.instance)
+            return
+        enqueue(source.instance)
+
+    def should_verify_existence(self, file):
+        return False
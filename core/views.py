@@ -1,25 +1,41 @@
 # Path: core/views.py
 
-from django.http import JsonResponse
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Exists, F, OuterRef
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Q
 from django.core.paginator import Paginator
+from django.utils.crypto import constant_time_compare
+from django.views.static import serve
+from . import autocomplete, conditional, metrics, profiling, search, sitemap_files, tag_stats
+from .conditional import conditional_page
+from .page_cache import cache_public_page
+from .pagination import CachedCountPaginator, paginate_by_cursor
+from .single_flight import coalesce_requests
 from .models import Service, Page, Article, Category, Tag 
 
 # --- Основные Views ---
 
+@cache_public_page('services')
+@conditional_page(conditional.services_last_modified, 'services')
 def home_view(request):
     """Отображает главную страницу со списком всех услуг."""
     services = Service.objects.all()
     context = {'services': services}
     return render(request, 'core/home.html', context)
 
+@cache_public_page('services')
+@conditional_page(conditional.service_last_modified, 'services')
 def service_detail_view(request, service_slug):
     """Отображает детальную страницу для одной услуги."""
     service = get_object_or_404(Service, slug=service_slug)
     context = {'service': service}
     return render(request, 'core/service_detail.html', context)
 
+@cache_public_page('pages')
+@conditional_page(conditional.page_last_modified, 'pages')
 def page_view(request, page_slug):
     """Отображает любую статическую страницу, созданную в админке."""
     page = get_object_or_404(Page, slug=page_slug, is_published=True)
@@ -28,41 +44,67 @@ def page_view(request, page_slug):
 
 # --- Views для Статей ---
 
+ARTICLES_PER_PAGE = 5
+
+# Модели, от которых зависят страницы статей (для кеша и ETag)
+ARTICLE_NAMESPACES = ('articles', 'categories', 'tags')
+
+def paginate_articles(request, articles):
+    """
+    По умолчанию списки листаются курсором (?cursor=...), без COUNT(*) и OFFSET.
+    Номерная пагинация (?page=N) остается для поисковых роботов и старых ссылок.
+    """
+    if 'page' in request.GET:
+        return CachedCountPaginator(articles, ARTICLES_PER_PAGE).get_page(request.GET['page'])
+    return paginate_by_cursor(articles, request.GET.get('cursor'), ARTICLES_PER_PAGE)
+
+def render_article_list(request, context, tags):
+    """
+    Рендерит список статей. Облако тегов нужно только полной странице:
+    для htmx-подгрузки запрос tags не выполняется.
+    """
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return render(request, 'core/partials/article_list_partial.html', context)
+    context['all_tags'] = tag_stats.weighted(tags.only('name', 'slug').order_by('name'))
+    return render(request, 'core/article_list.html', context)
+
+@cache_public_page(*ARTICLE_NAMESPACES)
+@conditional_page(conditional.articles_last_modified, *ARTICLE_NAMESPACES)
+@coalesce_requests(*ARTICLE_NAMESPACES)
 def article_list_view(request):
-    all_articles = Article.objects.filter(is_published=True).order_by('-published_date')
+    all_articles = Article.objects.published().for_list().order_by('-published_date')
     page_title = 'Статьи'
 
     query = request.GET.get('q')
     if query:
-        all_articles = all_articles.filter(Q(title__iregex=query) | Q(content__iregex=query))
+        # Полнотекстовый поиск: пагинируем список id по релевантности,
+        # а сами статьи загружаем только для текущей страницы
         page_title = f'Результаты поиска по запросу: "{query}"'
-
-    paginator = Paginator(all_articles, 5)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+        paginator = Paginator(search.search_article_ids(query), ARTICLES_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page', 1))
+        page_obj.object_list = search.articles_in_order(all_articles, page_obj.object_list)
+    else:
+        page_obj = paginate_articles(request, all_articles)
 
     context = {
         'page_obj': page_obj,
         'page_title': page_title,
-        'all_tags': Tag.objects.all(),
     }
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        return render(request, 'core/partials/article_list_partial.html', context)
-    return render(request, 'core/article_list.html', context)
+    tags = Tag.objects.filter(published_count__gt=0).annotate(article_count=F('published_count'))
+    return render_article_list(request, context, tags)
 
+@cache_public_page(*ARTICLE_NAMESPACES)
+@conditional_page(conditional.article_last_modified, *ARTICLE_NAMESPACES)
 def article_detail_view(request, post_slug):
-    post = get_object_or_404(Article, slug=post_slug, is_published=True)
+    post = get_object_or_404(Article.objects.published().for_detail(), slug=post_slug)
     
-    # <<< НАЧАЛО: Логика для похожих статей
-    related_posts = Article.objects.none() # Создаем пустой QuerySet по умолчанию
-    if post.category:
-        related_posts = Article.objects.filter(
-            category=post.category, 
-            is_published=True
-        ).exclude(
-            pk=post.pk
-        )[:4] # Исключаем текущую статью и берем 4 похожих
-    # <<< КОНЕЦ: Логика для похожих статей
+    # Похожие статьи заранее посчитаны по содержанию (core.similarity)
+    related_posts = (
+        Article.objects.published()
+        .filter(related_from__article=post)
+        .order_by('related_from__rank')
+        .only('title', 'slug', 'published_date')
+    )
 
     context = {
         'post': post,
@@ -70,74 +112,113 @@ def article_detail_view(request, post_slug):
     }
     return render(request, 'core/article_detail.html', context)
 
+@cache_public_page(*ARTICLE_NAMESPACES)
+@conditional_page(conditional.category_last_modified, *ARTICLE_NAMESPACES)
+@coalesce_requests(*ARTICLE_NAMESPACES)
 def article_category_view(request, category_slug):
     category = get_object_or_404(Category, slug=category_slug)
-    all_articles = Article.objects.filter(category=category, is_published=True).order_by('-published_date')
-    
-    # Получаем уникальный набор тегов, которые принадлежат ТОЛЬКО статьям из этой категории
-    tags_for_category = Tag.objects.filter(posts__in=all_articles).distinct()
+    all_articles = Article.objects.published().filter(category=category).for_list().order_by('-published_date')
 
-    paginator = Paginator(all_articles, 5)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Теги статей этой категории — из готовых счетчиков (core.tag_stats)
+    tags_for_category = Tag.objects.filter(
+        category_counts__category=category, category_counts__count__gt=0,
+    ).annotate(article_count=F('category_counts__count'))
+
+    page_obj = paginate_articles(request, all_articles)
 
     context = {
         'page_obj': page_obj,
         'page_title': f'Статьи по категории: {category.name}',
-        'all_tags': tags_for_category, # <-- Передаем в контекст отфильтрованный список
     }
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        return render(request, 'core/partials/article_list_partial.html', context)
-    return render(request, 'core/article_list.html', context)
+    return render_article_list(request, context, tags_for_category)
 
+@cache_public_page(*ARTICLE_NAMESPACES)
+@conditional_page(conditional.tag_last_modified, *ARTICLE_NAMESPACES)
+@coalesce_requests(*ARTICLE_NAMESPACES)
 def article_tag_view(request, tag_slug):
     tag = get_object_or_404(Tag, slug=tag_slug)
-    all_articles = Article.objects.filter(tags=tag, is_published=True).order_by('-published_date')
+    # EXISTS вместо JOIN: статьи читаются по индексу ленты уже в нужном порядке,
+    # а принадлежность тегу проверяется точечно — без сортировки всех статей тега
+    has_tag = Article.tags.through.objects.filter(article_id=OuterRef('pk'), tag_id=tag.pk)
+    all_articles = Article.objects.published().filter(Exists(has_tag)).for_list().order_by('-published_date')
 
-    # Получаем уникальный набор тегов, которые принадлежат ТОЛЬКО статьям с текущим тегом
-    tags_for_articles = Tag.objects.filter(posts__in=all_articles).distinct()
-    # -------------------------
+    # Теги, которые встречаются вместе с текущим (включая его самого), — из таблицы TagCooccurrence
+    tags_for_articles = Tag.objects.filter(
+        cooccurrences__tag=tag, cooccurrences__count__gt=0,
+    ).annotate(article_count=F('cooccurrences__count'))
 
-    paginator = Paginator(all_articles, 5)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate_articles(request, all_articles)
 
     context = {
         'page_obj': page_obj,
         'page_title': f'Статьи по тегу: {tag.name}',
-        'all_tags': tags_for_articles, # <-- Передаем в контекст отфильтрованный список
     }
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        return render(request, 'core/partials/article_list_partial.html', context)
-    return render(request, 'core/article_list.html', context)
+    return render_article_list(request, context, tags_for_articles)
 
 # --- API Views ---
 
+@coalesce_requests(*autocomplete.VERSION_NAMESPACES)
 def article_search_api_view(request):
-    """API v1: Поиск по заголовкам статей для "живого" поиска."""
+    """
+    API v1: "Живой" поиск по началу слов в заголовках и тегах статей.
+    Отвечает из индекса в памяти (core.autocomplete), без запросов к базе.
+    """
     query = request.GET.get('q', '')
-    articles_qs = Article.objects.none()
-    
+    results = []
+
     if len(query) > 2:
-        articles_qs = Article.objects.filter(
-            is_published=True,
-            title__iregex=query
-        ).distinct()[:5]
+        results = autocomplete.index.search(query, limit=5)
 
-    results = []
-    for post in articles_qs:
-        content_preview = post.content.replace('##', '').replace('###', '').strip()
-        excerpt = content_preview[:70] + '...' if len(content_preview) > 70 else content_preview
-
-        results.append({
-            'title': post.title,
-            'url': post.get_absolute_url(),
-            'excerpt': excerpt,
-        })
-        
     response_data = {
         'count': len(results),
         'results': results,
     }
             
-    return JsonResponse(response_data)
\ No newline at end of file
+    return JsonResponse(response_data)
+
+# --- Карта сайта ---
+
+def sitemap_file_view(request, filename):
+    """
+    Отдает готовые файлы карты сайта (core.sitemap_files) с Last-Modified по
+    времени записи файла. В продакшене их лучше отдавать веб-сервером напрямую.
+    """
+    sitemap_files.ensure_built()
+    return serve(request, filename, document_root=settings.SITEMAP_DIR)
+
+# --- Метрики ---
+
+def metrics_view(request):
+    """
+    Метрики всех воркеров в текстовом формате Prometheus (core.metrics).
+    Доступны только по заголовку Authorization: Bearer METRICS_TOKEN.
+    """
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        raise Http404
+    authorization = request.headers.get('Authorization', '')
+    if not constant_time_compare(authorization, f'Bearer {settings.METRICS_TOKEN}'):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render_prometheus(metrics.collect_all()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+# --- Профили запросов ---
+
+@staff_member_required
+def profiles_view(request):
+    """Страница админки со списком самых медленных профилированных запросов (core.profiling)."""
+    context = {
+        **admin.site.each_context(request),
+        'title': "Профили запросов",
+        'profiles': profiling.captured(),
+        'profiling_enabled': settings.PROFILING_ENABLED,
+    }
+    return render(request, 'admin/profiles.html', context)
+
+@staff_member_required
+def profile_file_view(request, path):
+    """Отдает файл профиля (collapsed stacks или speedscope) для скачивания."""
+    response = serve(request, path, document_root=settings.PROFILING_DIR)
+    response['Content-Disposition'] = f'attachment; filename="{path.rsplit("/", 1)[-1]}"'
+    return response
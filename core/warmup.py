@@ -0,0 +1,69 @@
+# Path: core/warmup.py
+
+"""
+Прогрев процесса при старте воркера (вызывается из myproject/wsgi.py и asgi.py).
+
+Все шаблоны из TEMPLATES['DIRS'] (core/templates, включая переопределения
+админки) заранее разбираются и попадают в кешируемый загрузчик вместе с
+родительскими шаблонами ({% extends %}) и включениями ({% include %}).
+Создание движка шаблонов заодно импортирует все библиотеки тегов
+(markdown_deux и т.д.). Поэтому первый запрос нового воркера не тратит
+время на чтение и разбор шаблонов.
+"""
+
+import logging
+from pathlib import Path
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.loader_tags import ExtendsNode, IncludeNode
+from django.templatetags.static import static
+
+logger = logging.getLogger(__name__)
+
+
+def _constant_name(expression):
+    """Имя шаблона из {% extends "..." %} / {% include "..." %}, если оно задано строкой."""
+    if expression.filters or not isinstance(expression.var, str):
+        return None
+    return expression.var
+
+
+def _load(engine, name, loaded, skip=None):
+    template, origin = engine.find_template(name, skip=skip)
+    if origin.name in loaded:
+        return
+    loaded.add(origin.name)
+    for node in template.nodelist.get_nodes_by_type(ExtendsNode):
+        parent = _constant_name(node.parent_name)
+        if parent:
+            # Как и ExtendsNode: шаблон может расширять одноименный шаблон
+            # из другого каталога (admin/base_site.html)
+            _load(engine, parent, loaded, skip=[origin])
+    for node in template.nodelist.get_nodes_by_type(IncludeNode):
+        included = _constant_name(node.template)
+        if included:
+            _load(engine, included, loaded)
+
+
+def warm_templates():
+    """Разбирает все шаблоны проекта. Возвращает число загруженных шаблонов."""
+    loaded = set()
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for directory in engine.dirs:
+            for path in sorted(Path(directory).rglob('*.html')):
+                name = path.relative_to(directory).as_posix()
+                try:
+                    _load(engine, name, loaded)
+                except (TemplateDoesNotExist, TemplateSyntaxError):
+                    # Сломанный шаблон не должен мешать запуску: ошибка повторится при рендере
+                    logger.exception("Не удалось разобрать шаблон %s", name)
+    return len(loaded)
+
+
+def warm_up():
+    warm_templates()
+    # Первое обращение к хранилищу статики создает его (и читает манифест, если он есть)
+    static('css/output.css')
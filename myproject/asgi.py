@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+application = get_asgi_application()
+
+# Прогрев воркера: шаблоны разбираются до первого запроса
+if settings.TEMPLATE_WARMUP:
+    from core.warmup import warm_up
+
+    warm_up()
\ No newline at end of file
@@ -0,0 +1,6 @@
+# Path: myproject/asgi_urls.py
+
+# Маршруты для ASGI: публичные страницы и API обслуживают async-views (core.async_views)
+from myproject.urls import build_urlpatterns
+
+urlpatterns = build_urlpatterns('core.async_urls')
@@ -1,7 +1,10 @@
 # Path: myproject/settings.py
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -13,9 +16,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-your-secret-key-here-change-in-production'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# В продакшене задайте DJANGO_DEBUG=0 и DJANGO_ALLOWED_HOSTS (через запятую)
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host.strip()]
 
 
 # Application definition
@@ -41,23 +45,38 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ProfilingMiddleware',
 ]
 
-ROOT_URLCONF = 'myproject.urls'
+# Async-варианты публичных views (core.async_views) для запуска под ASGI.
+# Выключены по умолчанию: на текущем наборе синхронных middleware они
+# медленнее обычных views (см. benchmark_asgi)
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+
+ROOT_URLCONF = 'myproject.asgi_urls' if ASYNC_VIEWS else 'myproject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Движок Django, который замеряет время рендеринга (core.metrics)
+        'BACKEND': 'core.template_backend.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'core/templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Разобранные шаблоны хранятся в памяти процесса. В режиме DEBUG
+            # автоперезагрузка сбрасывает этот кеш при изменении файлов шаблонов.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -72,17 +91,157 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'myproject.wsgi.application'
 
+# Метрики запросов: заголовок Server-Timing и эндпоинт /metrics (core.metrics).
+# METRICS_DIR — общий каталог, через который складываются метрики всех воркеров
+# (пустая строка — только метрики текущего процесса).
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / 'var' / 'metrics'))
+# /metrics отдается только по токену; без METRICS_TOKEN эндпоинт выключен
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Server-Timing показывает время SQL и шаблонов: по умолчанию его видят только
+# сотрудники (в DEBUG — все)
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', '1' if DEBUG else '0') == '1'
+
+# Профилирование запросов (core.profiling), по умолчанию выключено. Профиль
+# снимается с доли PROFILING_SAMPLE_RATE запросов, с запросов дольше
+# PROFILING_SLOW_MS (0 — не отбирать по времени) и с запросов сотрудников
+# с заголовком PROFILING_HEADER. Медленный запрос виден только после ответа,
+# поэтому для отбора по времени профилируется доля PROFILING_SLOW_SAMPLE_RATE
+# запросов: профайлер не работает постоянно. Профили смотрят в админке: /admin/profiles/.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_SLOW_MS = int(os.environ.get('PROFILING_SLOW_MS', '0'))
+PROFILING_SLOW_SAMPLE_RATE = float(os.environ.get('PROFILING_SLOW_SAMPLE_RATE', '0.1'))
+PROFILING_HEADER = 'X-Profile'
+PROFILING_INTERVAL_MS = int(os.environ.get('PROFILING_INTERVAL_MS', '5'))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'var' / 'profiles'))
+PROFILING_KEEP = 50
+
+# Разбирать все шаблоны при старте воркера (core.warmup), а не на первых запросах
+TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP', '1') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Настройки SQLite для продакшена: WAL (читатели не ждут писателя),
+# synchronous=NORMAL (безопасно в режиме WAL), mmap и кеш страниц в памяти.
+# Применяются к каждому новому соединению через init_command.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)),
+    # Отрицательное значение — размер в КиБ
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -32000)),
+    'temp_store': 'memory',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Сколько секунд ждать снятия блокировки записи вместо ошибки "database is locked"
+            'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5)),
+            # Запись берет блокировку сразу в начале транзакции: без взаимных блокировок при апгрейде
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Постоянные соединения: не открывать базу и не выполнять PRAGMA на каждый запрос
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+    }
+}
+
+# Реплика для чтения публичных страниц (core.db_routers). Значения:
+#   ''          — отключена, все запросы идут в основную базу;
+#   'readonly'  — тот же файл базы, открытый только для чтения (mode=ro);
+#   путь к файлу — снимок базы, который обновляет команда snapshot_replica.
+DATABASE_REPLICA = os.environ.get('DATABASE_REPLICA', '')
+# Сколько секунд после сохранения посетитель читает основную базу
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 60))
+
+if DATABASE_REPLICA:
+    replica_path = DATABASES['default']['NAME'] if DATABASE_REPLICA == 'readonly' else Path(DATABASE_REPLICA)
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{replica_path}?mode=ro',
+        'OPTIONS': {
+            # journal_mode меняет файл базы, поэтому для реплики его не задаем
+            'init_command': ';'.join(
+                [f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items() if name != 'journal_mode']
+                + ['PRAGMA query_only=1']
+            ),
+            'timeout': DATABASES['default']['OPTIONS']['timeout'],
+        },
+        # Снимок заменяется новым файлом: открытое соединение продолжало бы читать старый
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'] if DATABASE_REPLICA == 'readonly' else 0,
+        'CONN_HEALTH_CHECKS': DATABASES['default']['CONN_HEALTH_CHECKS'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+    # Сразу после WhiteNoise: все чтения запроса проходят через решение о реплике
+    MIDDLEWARE.insert(MIDDLEWARE.index('core.middleware.StaticFilesMiddleware') + 1, 'core.middleware.ReplicaRoutingMiddleware')
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Бэкенд выбирается переменной окружения CACHE_BACKEND:
+#   locmem - память процесса (по умолчанию в режиме разработки),
+#   file   - общий каталог на диске (по умолчанию в продакшене),
+#   redis  - Redis или совместимый сервер по адресу REDIS_URL.
+# В кеше по умолчанию хранятся версии (core.cache_versions), по которым
+# сбрасываются кеш страниц, фрагменты шаблонов и счетчики пагинации. С locmem
+# их видит только свой процесс, поэтому при нескольких воркерах нужен общий бэкенд.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem' if DEBUG else 'file')
+CACHE_DIR = Path(os.environ.get('CACHE_DIR', BASE_DIR / 'var' / 'cache'))
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1')
+
+if CACHE_BACKEND == 'redis':
+    # Клиент Redis не входит в requirements.txt: он нужен только этому бэкенду
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured("CACHE_BACKEND=redis требует пакет redis: pip install redis") from None
+
+
+def cache_config(name):
+    if CACHE_BACKEND == 'file':
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR / name,
+        }
+    if CACHE_BACKEND == 'redis':
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': name,
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': name,
     }
+
+
+CACHES = {
+    'default': cache_config('default'),
+    # Готовые HTML-ответы публичных страниц (core.page_cache)
+    'pages': cache_config('pages'),
 }
 
+# Кеш целых страниц для анонимных посетителей. По умолчанию выключен
+# в режиме разработки, чтобы правки шаблонов были видны сразу, и с locmem
+# (см. выше; проверка core.E001 не дает включить его там явно).
+PAGE_CACHE_ENABLED = os.environ.get(
+    'PAGE_CACHE_ENABLED', '0' if DEBUG or CACHE_BACKEND == 'locmem' else '1'
+) == '1'
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# Одинаковые одновременные запросы списков и живого поиска выполняются один раз
+# (core.single_flight); готовый ответ еще столько секунд отдается повторам
+SINGLE_FLIGHT_TTL = float(os.environ.get('SINGLE_FLIGHT_TTL', '2'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -138,5 +297,27 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Миниатюры imagekit генерируются заранее фоновым воркером (core.thumbnails),
+# а не при первом запросе; наличие файлов при рендере не проверяется
+IMAGEKIT_DEFAULT_CACHEFILE_STRATEGY = 'core.thumbnails.QueuedOptimistic'
+THUMBNAIL_QUEUE_ENABLED = os.environ.get('THUMBNAIL_QUEUE_ENABLED', '1') == '1'
+
 # Настройки для django.contrib.sites
-SITE_ID = 1
\ No newline at end of file
+SITE_ID = 1
+
+# Карта сайта собирается в файлы (core.sitemap_files) и отдается как статика
+SITEMAP_DIR = Path(os.environ.get('SITEMAP_DIR', BASE_DIR / 'var' / 'sitemaps'))
+SITEMAP_PROTOCOL = os.environ.get('SITEMAP_PROTOCOL', 'https')
+# Пересобирать затронутые файлы фоновым воркером (process_sitemap_jobs);
+# при 0 — сразу после коммита, в процессе, который сохранил объект
+SITEMAP_QUEUE_ENABLED = os.environ.get('SITEMAP_QUEUE_ENABLED', '1') == '1'
+
+# Каталог для статического экспорта публичных страниц (команда prerender)
+PRERENDER_DIR = Path(os.environ.get('PRERENDER_DIR', BASE_DIR / 'var' / 'prerender'))
+
+# Контакты для подвала сайта (core.context_processors.site_info)
+SITE_CONTACTS = {
+    'telegram': os.environ.get('CONTACT_TELEGRAM_URL', '#'),
+    'whatsapp': os.environ.get('CONTACT_WHATSAPP_URL', '#'),
+    'email': os.environ.get('CONTACT_EMAIL_URL', '#'),
+}
\ No newline at end of file
@@ -3,36 +3,37 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
-# 1. Импортируем sitemap view и наши классы Sitemap
-from django.contrib.sitemaps.views import sitemap
-from core.sitemaps import ArticleSitemap, ServiceSitemap, StaticViewSitemap, PageSitemap
+from core.views import metrics_view, profile_file_view, profiles_view, sitemap_file_view
 
-# 2. Собираем все классы Sitemap в один словарь
-sitemaps = {
-    'static': StaticViewSitemap,
-    'pages': PageSitemap, 
-    'services': ServiceSitemap,
-    'articles': ArticleSitemap,
-}
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    
-    # 3. Добавляем маршрут для sitemap.xml
-    # Django будет использовать view 'sitemap' и наш словарь 'sitemaps' для генерации файла
-    path(
-        'sitemap.xml', 
-        sitemap, 
-        {'sitemaps': sitemaps}, 
-        name='django.contrib.sitemaps.views.sitemap'
-    ),
-    
-    # Основные маршруты нашего приложения core
-    path('', include('core.urls')),
-]
+def build_urlpatterns(core_urls):
+    """Маршруты проекта; core_urls — модуль маршрутов приложения core (синхронный или async)."""
+    urlpatterns = [
+        # Профили медленных запросов (core.profiling): до admin/, чтобы не перехватила админка
+        path('admin/profiles/', profiles_view, name='admin_profiles'),
+        path('admin/profiles/<path:path>', profile_file_view, name='admin_profile_file'),
+        path('admin/', admin.site.urls),
+        
+        # Карта сайта: индекс sitemap.xml и сжатые файлы разделов, собранные заранее
+        re_path(
+            r'^(?P<filename>sitemap(?:-[a-z]+-\d+\.xml\.gz|\.xml))$',
+            sitemap_file_view,
+            name='sitemap_file'
+        ),
+        
+        # Метрики производительности для Prometheus (core.metrics)
+        path('metrics', metrics_view, name='metrics'),
+        
+        # Основные маршруты нашего приложения core
+        path('', include(core_urls)),
+    ]
 
-# Этот блок нужен для корректной отдачи медиафайлов в режиме разработки (DEBUG=True)
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    # Этот блок нужен для корректной отдачи медиафайлов в режиме разработки (DEBUG=True)
+    if settings.DEBUG:
+        urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    return urlpatterns
+
+
+urlpatterns = build_urlpatterns('core.urls')
@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Прогрев воркера: шаблоны разбираются до первого запроса
+if settings.TEMPLATE_WARMUP:
+    from core.warmup import warm_up
+
+    warm_up()
\ No newline at end of file